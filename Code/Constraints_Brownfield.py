@@ -15,6 +15,9 @@ Based on the original model by:
     Sylvain Quoilin    - Department of Mechanical Engineering Technology, KU Leuven
 """
 
+from pyomo.environ import Constraint
+from Initialize import Schedule
+
 
 #%% Economic constraints
 
@@ -57,30 +60,16 @@ def Scenario_CO2_emission(model,s):
 
 "Investment cost"
 def Investment_Cost(model):  
-    upgrade_years_list = [1 for i in range(len(model.steps))]
-    s_dur = model.Step_Duration 
-    for i in range(1, len(model.steps)): 
-        upgrade_years_list[i] = upgrade_years_list[i-1] + s_dur  
-    yu_tuples_list = [[] for i in model.years]  
-    for y in model.years:      
-        for i in range(len(upgrade_years_list)-1):
-            if y >= upgrade_years_list[i] and y < upgrade_years_list[i+1]:
-                yu_tuples_list[y-1] = (y, model.steps[i+1])          
-            elif y >= upgrade_years_list[-1]:
-                yu_tuples_list[y-1] = (y, len(model.steps))            
-    tup_list = [[] for i in range(len(model.steps)-1)]  
-    for i in range(0, len(model.steps) - 1):
-        tup_list[i] = yu_tuples_list[model.Step_Duration*i + model.Step_Duration] 
-      
+    sc = Schedule(model)
     Inv_Ren = sum(((model.RES_Units[1,r]-model.RES_units[r])*model.RES_Nominal_Capacity[r]*model.RES_Specific_Investment_Cost[r])
-                    + sum((((model.RES_Units[ut,r] - model.RES_Units[ut-1,r])*model.RES_Nominal_Capacity[r]*model.RES_Specific_Investment_Cost[r]))/((1+model.Discount_Rate)**(yt-1))
-                    for (yt,ut) in tup_list) for r in model.renewable_sources)  
+                    + sum((((model.RES_Units[ut,r] - model.RES_Units[ut-1,r])*model.RES_Nominal_Capacity[r]*model.RES_Specific_Investment_Cost[r]))/sc.Discount[yt-1]
+                    for (yt,ut) in sc.Upgrades) for r in model.renewable_sources)  
     Inv_Gen = sum(((model.Generator_Nominal_Capacity[1,g]-model.Generator_capacity[g])*model.Generator_Specific_Investment_Cost[g])
-                    + sum((((model.Generator_Nominal_Capacity[ut,g] - model.Generator_Nominal_Capacity[ut-1,g])*model.Generator_Specific_Investment_Cost[g]))/((1+model.Discount_Rate)**(yt-1))
-                    for (yt,ut) in tup_list) for g in model.generator_types)
+                    + sum((((model.Generator_Nominal_Capacity[ut,g] - model.Generator_Nominal_Capacity[ut-1,g])*model.Generator_Specific_Investment_Cost[g]))/sc.Discount[yt-1]
+                    for (yt,ut) in sc.Upgrades) for g in model.generator_types)
     Inv_Bat = (((model.Battery_Nominal_Capacity[1]-model.Battery_capacity)*model.Battery_Specific_Investment_Cost)
-                    + sum((((model.Battery_Nominal_Capacity[ut] - model.Battery_Nominal_Capacity[ut-1])*model.Battery_Specific_Investment_Cost))/((1+model.Discount_Rate)**(yt-1))
-                    for (yt,ut) in tup_list))
+                    + sum((((model.Battery_Nominal_Capacity[ut] - model.Battery_Nominal_Capacity[ut-1])*model.Battery_Specific_Investment_Cost))/sc.Discount[yt-1]
+                    for (yt,ut) in sc.Upgrades))
     
     return model.Investment_Cost == Inv_Ren + Inv_Gen + Inv_Bat 
 
@@ -129,153 +118,72 @@ def Scenario_Variable_Cost_NonAct(model, s):
     Electricity_Cost = model.Total_Electricity_Cost_NonAct[s]     
     return model.Total_Scenario_Variable_Cost_NonAct[s] == model.Operation_Maintenance_Cost_NonAct + model.Battery_Replacement_Cost_NonAct[s] + model.Scenario_Lost_Load_Cost_NonAct[s] + Fuel_Cost + Electricity_Cost- model.Total_Revenues_NonAct[s] 
 
+
+"Yearly energy sums"
+def Generator_Yearly_Energy(model,s,y,g):
+    return model.Generator_Yearly_Energy[s,y,g] == sum(model.Generator_Energy_Production[s,y,g,t]*model.Period_Weight[t] for t in model.periods)
+
+def Yearly_Energy_From_Grid(model,s,y):
+    return model.Yearly_Energy_From_Grid[s,y] == sum(model.Energy_From_Grid[s,y,t]*model.Period_Weight[t] for t in model.periods if (s,y,t) in model.grid_hours)
+
+def Yearly_Energy_To_Grid(model,s,y):
+    return model.Yearly_Energy_To_Grid[s,y] == sum(model.Energy_To_Grid[s,y,t]*model.Period_Weight[t] for t in model.periods if (s,y,t) in model.grid_export_hours)
+
+def Battery_Yearly_Flow(model,s,y):
+    return model.Battery_Yearly_Flow[s,y] == sum((model.Battery_Outflow[s,y,t] + model.Battery_Inflow[s,y,t])*model.Period_Weight[t] for t in model.periods)
+
+def Yearly_Lost_Load(model,s,y):
+    return model.Yearly_Lost_Load[s,y] == sum(model.Lost_Load[s,y,t]*model.Period_Weight[t] for t in model.periods)
+
 def Scenario_Lost_Load_Cost_Act(model,s):    
-    Cost_Lost_Load = 0         
-    for y in range(1, model.Years +1):
-        Num = sum(model.Lost_Load[s,y,t]*model.Lost_Load_Specific_Cost for t in model.periods)
-        Cost_Lost_Load += Num/((1+model.Discount_Rate)**y)
-    return  model.Scenario_Lost_Load_Cost_Act[s] == Cost_Lost_Load
+    return  model.Scenario_Lost_Load_Cost_Act[s] == sum(model.Yearly_Lost_Load[s,y]*model.Lost_Load_Specific_Cost*model.Year_Weight_Act[y] for y in model.lost_load_years)
 
 def Scenario_Lost_Load_Cost_NonAct(model,s):
-    Cost_Lost_Load = 0         
-    for y in range(1, model.Years +1):
-        Num = sum(model.Lost_Load[s,y,t]*model.Lost_Load_Specific_Cost for t in model.periods)
-        Cost_Lost_Load += Num
-    return  model.Scenario_Lost_Load_Cost_NonAct[s] == Cost_Lost_Load
+    return  model.Scenario_Lost_Load_Cost_NonAct[s] == sum(model.Yearly_Lost_Load[s,y]*model.Lost_Load_Specific_Cost*model.Year_Weight_NonAct[y] for y in model.lost_load_years)
 
 def Total_Fuel_Cost_Act(model,s,g):
-    Fuel_Cost_Tot = 0
-    for y in range(1, model.Years +1):
-        Num = sum(model.Generator_Energy_Production[s,y,g,t]*model.Generator_Marginal_Cost[s,y,g] for t in model.periods)
-        Fuel_Cost_Tot += Num/((1+model.Discount_Rate)**y)
-    return model.Total_Fuel_Cost_Act[s,g] == Fuel_Cost_Tot
+    return model.Total_Fuel_Cost_Act[s,g] == sum(model.Generator_Yearly_Energy[s,y,g]*model.Generator_Marginal_Cost[s,y,g]*model.Year_Energy_Weight_Act[y] for y in model.modeled_years)
    
 def Total_Fuel_Cost_NonAct(model,s,g):
-    Fuel_Cost_Tot = 0
-    for y in range(1, model.Years +1):
-        Num = sum(model.Generator_Energy_Production[s,y,g,t]*model.Generator_Marginal_Cost[s,y,g] for t in model.periods)
-        Fuel_Cost_Tot += Num
-    return model.Total_Fuel_Cost_NonAct[s,g] == Fuel_Cost_Tot
+    return model.Total_Fuel_Cost_NonAct[s,g] == sum(model.Generator_Yearly_Energy[s,y,g]*model.Generator_Marginal_Cost[s,y,g]*model.Year_Energy_Weight_NonAct[y] for y in model.modeled_years)
 
 def Total_Electricity_Cost_Act(model,s): 
-    Electricity_Cost_Tot = 0
-    for y in range(1, model.Years +1):
-        Num = sum(model.Energy_From_Grid[s,y,t]*model.Grid_Availability[s,y,t]*model.Grid_Purchased_El_Price/1000  for t in model.periods)
-        Electricity_Cost_Tot += Num/((1+model.Discount_Rate)**y)
-    return model.Total_Electricity_Cost_Act[s] == Electricity_Cost_Tot
+    return model.Total_Electricity_Cost_Act[s] == sum(model.Yearly_Energy_From_Grid[s,y]*model.Grid_Purchased_El_Price/1000*model.Year_Energy_Weight_Act[y] for y in model.modeled_years)
    
 def Total_Electricity_Cost_NonAct(model,s): 
-    Electricity_Cost_Tot = 0
-    for y in range(1, model.Years +1):
-        Num = sum(model.Energy_From_Grid[s,y,t]*model.Grid_Availability[s,y,t]*model.Grid_Purchased_El_Price/1000  for t in model.periods)
-        Electricity_Cost_Tot += Num
-    return model.Total_Electricity_Cost_NonAct[s] == Electricity_Cost_Tot
+    return model.Total_Electricity_Cost_NonAct[s] == sum(model.Yearly_Energy_From_Grid[s,y]*model.Grid_Purchased_El_Price/1000*model.Year_Energy_Weight_NonAct[y] for y in model.modeled_years)
 
 
 def Total_Revenues_NonAct(model,s): 
-    Revenues_Yearly = [0 for y in model.years]
-    for y in range(1, model.Years +1):
-        Revenues_Yearly[y-1] = sum(model.Energy_To_Grid[s,y,t]*model.Grid_Availability[s,y,t] * model.Grid_Sold_El_Price/1000 for t in model.periods)
-    return model.Total_Revenues_NonAct [s] == sum(Revenues_Yearly[y-1] for y in model.years)
+    return model.Total_Revenues_NonAct [s] == sum(model.Yearly_Energy_To_Grid[s,y]*model.Grid_Sold_El_Price/1000*model.Year_Energy_Weight_NonAct[y] for y in model.modeled_years)
 
 def Total_Revenues_Act(model,s): 
-    Revenues_Yearly = [0 for y in model.years]
-    for y in range(1,model.Years+1):
-        Revenues_Yearly [y-1] = sum(model.Energy_To_Grid[s,y,t]*model.Grid_Availability[s,y,t] * model.Grid_Sold_El_Price/1000 for t in model.periods)
-    return model.Total_Revenues_Act [s] == sum(Revenues_Yearly[y-1]/((1+model.Discount_Rate)**y)  for y in model.years)
+    return model.Total_Revenues_Act [s] == sum(model.Yearly_Energy_To_Grid[s,y]*model.Grid_Sold_El_Price/1000*model.Year_Energy_Weight_Act[y] for y in model.modeled_years)
 
 def Battery_Replacement_Cost_Act(model,s):
-    Battery_cost_in = [0 for y in model.years]
-    Battery_cost_out = [0 for y in model.years]
-    Battery_Yearly_cost = [0 for y in model.years]    
-    for y in range(1,model.Years+1):    
-        Battery_cost_in[y-1] = sum(model.Battery_Inflow[s,y,t]*model.Unitary_Battery_Replacement_Cost for t in model.periods)
-        Battery_cost_out[y-1] = sum(model.Battery_Outflow[s,y,t]*model.Unitary_Battery_Replacement_Cost for t in model.periods)
-        Battery_Yearly_cost[y-1] = Battery_cost_in[y-1] + Battery_cost_out[y-1]
-    return model.Battery_Replacement_Cost_Act[s] == sum(Battery_Yearly_cost[y-1]/((1+model.Discount_Rate)**y) for y in model.years) 
+    return model.Battery_Replacement_Cost_Act[s] == sum(model.Battery_Yearly_Flow[s,y]*model.Unitary_Battery_Replacement_Cost*model.Year_Weight_Act[y] for y in model.modeled_years) 
     
 def Battery_Replacement_Cost_NonAct(model,s):
-    Battery_cost_in = [0 for y in model.years]
-    Battery_cost_out = [0 for y in model.years]
-    Battery_Yearly_cost = [0 for y in model.years]    
-    for y in range(1,model.Years+1):    
-        Battery_cost_in[y-1] = sum(model.Battery_Inflow[s,y,t]*model.Unitary_Battery_Replacement_Cost for t in model.periods)
-        Battery_cost_out[y-1] = sum(model.Battery_Outflow[s,y,t]*model.Unitary_Battery_Replacement_Cost for t in model.periods)
-        Battery_Yearly_cost[y-1] = Battery_cost_in[y-1] + Battery_cost_out[y-1]
-    return model.Battery_Replacement_Cost_NonAct[s] == sum(Battery_Yearly_cost[y-1] for y in model.years) 
+    return model.Battery_Replacement_Cost_NonAct[s] == sum(model.Battery_Yearly_Flow[s,y]*model.Unitary_Battery_Replacement_Cost*model.Year_Weight_NonAct[y] for y in model.modeled_years) 
 
 
 "Salvage Value"
 def Salvage_Value(model):   
-    upgrade_years_list = [1 for i in range(len(model.steps))]
-    s_dur = model.Step_Duration
-    for i in range(1, len(model.steps)): 
-        upgrade_years_list[i] = upgrade_years_list[i-1] + s_dur
-    yu_tuples_list = [[] for i in model.years]
-    for y in model.years:    
-        for i in range(len(upgrade_years_list)-1):
-            if y >= upgrade_years_list[i] and y < upgrade_years_list[i+1]:
-                yu_tuples_list[y-1] = (y, model.steps[i+1])        
-            elif y >= upgrade_years_list[-1]:
-                yu_tuples_list[y-1] = (y, len(model.steps))          
-    tup_list = [[] for i in range(len(model.steps)-1)]
-    for i in range(0, len(model.steps) - 1):
-        tup_list[i] = yu_tuples_list[s_dur*i + s_dur]
-
-    if model.Steps_Number == 1:    
-        SV_Ren_1 = sum(((model.RES_Units[1,r]-model.RES_units[r])*model.RES_Nominal_Capacity[r])*model.RES_Specific_Investment_Cost[r] * (model.RES_Lifetime[r]-model.Years)/model.RES_Lifetime[r] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for r in model.renewable_sources)+sum((model.RES_units[r]*model.RES_Nominal_Capacity[r])*model.RES_Specific_Investment_Cost[r] * (model.RES_Lifetime[r]-model.RES_years[r]-model.Years)/model.RES_Lifetime[r] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for r in model.renewable_sources)        
-        SV_Ren_2 = 0 
-        SV_Ren_3 = 0    
-        SV_Gen_1 = sum((model.Generator_Nominal_Capacity[1,g]-model.Generator_capacity[g])*model.Generator_Specific_Investment_Cost[g] * (model.Generator_Lifetime[g]-model.Years)/model.Generator_Lifetime[g] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for g in model.generator_types)+sum(model.Generator_capacity[g]*model.Generator_Specific_Investment_Cost[g] * (model.Generator_Lifetime[g]-model.GEN_years[g]-model.Years)/model.Generator_Lifetime[g] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for g in model.generator_types)        
-        SV_Gen_2 = 0
-        SV_Gen_3 = 0
-        SV_Grid = model.Grid_Distance*model.Grid_Connection_Cost*model.Grid_Connection / ((1 + model.Discount_Rate)**(model.Years)) 
-
-    if model.Steps_Number == 2:    
-        yt_last_up = upgrade_years_list[1]       
-        SV_Ren_1 = sum(((model.RES_Units[1,r]-model.RES_units[r])*model.RES_Nominal_Capacity[r])*model.RES_Specific_Investment_Cost[r] * (model.RES_Lifetime[r]-model.Years)/model.RES_Lifetime[r] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for r in model.renewable_sources)+sum((model.RES_units[r]*model.RES_Nominal_Capacity[r])*model.RES_Specific_Investment_Cost[r] * (model.RES_Lifetime[r]-model.RES_years[r]-model.Years)/model.RES_Lifetime[r] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for r in model.renewable_sources)
-        SV_Ren_2 = sum((model.RES_Units[2,r]-model.RES_Units[1,r])*model.RES_Nominal_Capacity[r]*model.RES_Specific_Investment_Cost[r] * (model.RES_Lifetime[r]+(yt_last_up-1)-model.Years)/model.RES_Lifetime[r] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for r in model.renewable_sources)        
-        SV_Ren_3 = 0    
-        SV_Gen_1 = sum((model.Generator_Nominal_Capacity[1,g]-model.Generator_capacity[g])*model.Generator_Specific_Investment_Cost[g] * (model.Generator_Lifetime[g]-model.Years)/model.Generator_Lifetime[g] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for g in model.generator_types)+sum(model.Generator_capacity[g]*model.Generator_Specific_Investment_Cost[g] * (model.Generator_Lifetime[g]-model.GEN_years[g]-model.Years)/model.Generator_Lifetime[g] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for g in model.generator_types)        
-        SV_Gen_2 = sum((model.Generator_Nominal_Capacity[2,g]-model.Generator_Nominal_Capacity[1,g])*model.Generator_Specific_Investment_Cost[g] * (model.Generator_Lifetime[g]+(yt_last_up-1)-model.Years)/model.Generator_Lifetime[g] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for g in model.generator_types)
-        SV_Gen_3 = 0
-        SV_Grid = model.Grid_Distance*model.Grid_Connection_Cost*model.Grid_Connection / ((1 + model.Discount_Rate)**(model.Years)) 
-        
-    if model.Steps_Number > 2:
-        tup_list_2 = [[] for i in range(len(model.steps)-2)]
-        for i in range(len(model.steps) - 2):
-            tup_list_2[i] = yu_tuples_list[s_dur*i + s_dur]
-        yt_last_up = upgrade_years_list[-1]
-        ut_last_up = tup_list[-1][1]    
-        ut_seclast_up = tup_list[-2][1]
-
-        SV_Ren_1 = sum(((model.RES_Units[1,r]-model.RES_units[r])*model.RES_Nominal_Capacity[r])*model.RES_Specific_Investment_Cost[r] * (model.RES_Lifetime[r]-model.Years)/model.RES_Lifetime[r] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for r in model.renewable_sources)+sum((model.RES_units[r]*model.RES_Nominal_Capacity[r])*model.RES_Specific_Investment_Cost[r] * (model.RES_Lifetime[r]-model.RES_years[r]-model.Years)/model.RES_Lifetime[r] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for r in model.renewable_sources)    
-        SV_Ren_2 = sum((model.RES_Units[ut_last_up,r] - model.RES_Units[ut_seclast_up,r])*model.RES_Nominal_Capacity[r]*model.RES_Specific_Investment_Cost[r] * (model.RES_Lifetime[r]+(yt_last_up-1)-model.Years)/model.RES_Lifetime[r] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for r in model.renewable_sources)
-        SV_Ren_3 = sum(sum((model.RES_Units[ut,r] - model.RES_Units[ut-1,r])*model.RES_Nominal_Capacity[r]*model.RES_Specific_Investment_Cost[r] * (model.RES_Lifetime[r]+(yt-1)-model.Years)/model.RES_Lifetime[r] / 
-                        ((1+model.Discount_Rate)**model.Years) for (yt,ut) in tup_list_2) for r in model.renewable_sources)        
-        SV_Gen_1 = sum((model.Generator_Nominal_Capacity[1,g]-model.Generator_capacity[g])*model.Generator_Specific_Investment_Cost[g] * (model.Generator_Lifetime[g]-model.Years)/model.Generator_Lifetime[g] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for g in model.generator_types)+sum(model.Generator_capacity[g]*model.Generator_Specific_Investment_Cost[g] * (model.Generator_Lifetime[g]-model.GEN_years[g]-model.Years)/model.Generator_Lifetime[g] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for g in model.generator_types)
-        SV_Gen_2 = sum((model.Generator_Nominal_Capacity[ut_last_up,g] - model.Generator_Nominal_Capacity[ut_seclast_up,g])*model.Generator_Specific_Investment_Cost[g] * (model.Generator_Lifetime[g]+(yt_last_up-1)-model.Years)/model.Generator_Lifetime[g] / 
-                        ((1 + model.Discount_Rate)**(model.Years)) for g in model.generator_types)
-        SV_Gen_3 = sum(sum((model.Generator_Nominal_Capacity[ut,g] - model.Generator_Nominal_Capacity[ut-1,g])*model.Generator_Specific_Investment_Cost[g] * (model.Generator_Lifetime[g]+(yt-1)-model.Years)/model.Generator_Lifetime[g] / 
-                        ((1+model.Discount_Rate)**model.Years) for (yt,ut) in tup_list_2) for g in model.generator_types)
-        SV_Grid = model.Grid_Distance*model.Grid_Connection_Cost*model.Grid_Connection / ((1 + model.Discount_Rate)**(model.Years)) 
-   
-    return model.Salvage_Value ==  SV_Ren_1 + SV_Gen_1 + SV_Ren_2 + SV_Gen_2 + SV_Ren_3 + SV_Gen_3 + SV_Grid
+    sc = Schedule(model)
+    Discount = sc.Discount[sc.Years]
+    SV_Ren_1 = sum(((model.RES_Units[1,r]-model.RES_units[r])*model.RES_Nominal_Capacity[r])*model.RES_Specific_Investment_Cost[r] * (model.RES_Lifetime[r]-model.Years)/model.RES_Lifetime[r] / 
+                    Discount for r in model.renewable_sources)+sum((model.RES_units[r]*model.RES_Nominal_Capacity[r])*model.RES_Specific_Investment_Cost[r] * (model.RES_Lifetime[r]-model.RES_years[r]-model.Years)/model.RES_Lifetime[r] / 
+                    Discount for r in model.renewable_sources)
+    SV_Ren_2 = sum(sum((model.RES_Units[ut,r] - model.RES_Units[ut-1,r])*model.RES_Nominal_Capacity[r]*model.RES_Specific_Investment_Cost[r] * (model.RES_Lifetime[r]+(yt-1)-model.Years)/model.RES_Lifetime[r] / 
+                    Discount for (yt,ut) in sc.Upgrades) for r in model.renewable_sources)        # Units added at the following steps
+    SV_Gen_1 = sum((model.Generator_Nominal_Capacity[1,g]-model.Generator_capacity[g])*model.Generator_Specific_Investment_Cost[g] * (model.Generator_Lifetime[g]-model.Years)/model.Generator_Lifetime[g] / 
+                    Discount for g in model.generator_types)+sum(model.Generator_capacity[g]*model.Generator_Specific_Investment_Cost[g] * (model.Generator_Lifetime[g]-model.GEN_years[g]-model.Years)/model.Generator_Lifetime[g] / 
+                    Discount for g in model.generator_types)
+    SV_Gen_2 = sum(sum((model.Generator_Nominal_Capacity[ut,g] - model.Generator_Nominal_Capacity[ut-1,g])*model.Generator_Specific_Investment_Cost[g] * (model.Generator_Lifetime[g]+(yt-1)-model.Years)/model.Generator_Lifetime[g] / 
+                    Discount for (yt,ut) in sc.Upgrades) for g in model.generator_types)
+    SV_Grid = model.Grid_Distance*model.Grid_Connection_Cost*model.Grid_Connection / Discount
+
+    return model.Salvage_Value ==  SV_Ren_1 + SV_Gen_1 + SV_Ren_2 + SV_Gen_2 + SV_Grid
 
 
 #%% Electricity balance constraints
@@ -288,6 +196,11 @@ def GEN_Capacity(model,ut,g): #Minimum generator capacity
 def RES_Capacity(model,s,yt,ut,r,t): #Minimum RES energy production
     return model.RES_Energy_Production[s,yt,r,t] >= model.RES_Unit_Energy_Production[s,r,t]*model.RES_Inverter_Efficiency[r]*model.RES_units[r] 
 
+def RES_Capacity_Step(model,ut,r): #Minimum RES units (compact formulation)
+    if model.RES_Inverter_Efficiency[r] > 0 and (model.Inputs.RES_Unit_Energy[:,r-1,:] > 0).any():
+        return model.RES_Units[ut,r] >= model.RES_units[r]
+    return Constraint.Skip
+
 def Energy_balance(model,s,yt,ut,t): # Energy balance
     Foo = []
     for r in model.renewable_sources:
@@ -297,15 +210,16 @@ def Energy_balance(model,s,yt,ut,t): # Energy balance
     for g in model.generator_types:
         foo.append((s,yt,g,t))    
     Total_Generator_Energy = sum(model.Generator_Energy_Production[i] for i in foo)  
-    En_From_Grid = model.Energy_From_Grid[s,yt,t]*model.Grid_Availability[s,yt,t]
-    En_To_Grid = model.Energy_To_Grid[s,yt,t]*model.Grid_Availability[s,yt,t]
+    En_From_Grid = model.Energy_From_Grid[s,yt,t] if (s,yt,t) in model.grid_hours else 0
+    En_To_Grid = model.Energy_To_Grid[s,yt,t] if (s,yt,t) in model.grid_export_hours else 0
+    Lost_Load = model.Lost_Load[s,yt,t] if yt in model.lost_load_years else 0
     return model.Energy_Demand[s,yt,t] == (Total_Renewable_Energy 
                                            + Total_Generator_Energy
                                            + En_From_Grid
                                            - En_To_Grid 
                                            - model.Battery_Inflow[s,yt,t] 
                                            + model.Battery_Outflow[s,yt,t] 
-                                           + model.Lost_Load[s,yt,t]  
+                                           + Lost_Load  
                                            - model.Energy_Curtailment[s,yt,t] )     
 
 
@@ -314,41 +228,11 @@ def Renewable_Energy(model,s,yt,ut,r,t): # Energy output of the solar panels
     return model.RES_Energy_Production[s,yt,r,t] == model.RES_Unit_Energy_Production[s,r,t]*model.RES_Inverter_Efficiency[r]*model.RES_Units[ut,r]
 
 def Renewable_Energy_Penetration(model,ut):    
-    upgrade_years_list = [1 for i in range(len(model.steps))]
-    s_dur = model.Step_Duration
-    for i in range(1, len(model.steps)): 
-        upgrade_years_list[i] = upgrade_years_list[i-1] + s_dur
-    yu_tuples_list = [0 for i in model.years]
-    if model.Steps_Number == 1:
-        for y in model.years:        
-            yu_tuples_list[y-1] = (y, 1)
-    else:    
-        for y in model.years:        
-            for i in range(len(upgrade_years_list)-1):
-                if y >= upgrade_years_list[i] and y < upgrade_years_list[i+1]:
-                    yu_tuples_list[y-1] = (y, model.steps[i+1])            
-                elif y >= upgrade_years_list[-1]:
-                    yu_tuples_list[y-1] = (y, len(model.steps))       
-    years_list = []
-    for i in yu_tuples_list:
-        if i[1]==ut:
-            years_list += [i[0]]            
-    Foo=[]
-    for s in range(1, model.Scenarios + 1):
-        for y in years_list:
-            for g in range(1, model.Generator_Types+1):
-                for t in range(1,model.Periods+1):
-                    Foo.append((s,y,g,t))                        
-    foo=[]
-    for s in range(1, model.Scenarios + 1):
-        for y in years_list:
-            for r in range(1, model.RES_Sources+1):
-                for t in range(1,model.Periods+1):
-                    foo.append((s,y,r,t))        
-    E_gen = sum(model.Generator_Energy_Production[s,y,g,t]*model.Scenario_Weight[s]
-                for s,y,g,t in Foo)    
-    E_ren = sum(model.RES_Energy_Production[s,y,r,t]*model.Scenario_Weight[s]
-                for s,y,r,t in foo)        
+    years_list = [y for y in Schedule(model).Step_Years(ut) if y in model.modeled_years]
+    E_gen = sum(model.Generator_Energy_Production[s,y,g,t]*model.Scenario_Weight[s]*model.Year_Energy_Weight_NonAct[y]*model.Period_Weight[t]
+                for s in model.scenarios for y in years_list for g in model.generator_types for t in model.periods)    
+    E_ren = sum(model.RES_Energy_Production[s,y,r,t]*model.Scenario_Weight[s]*model.Year_Energy_Weight_NonAct[y]*model.Period_Weight[t]
+                for s in model.scenarios for y in years_list for r in model.renewable_sources for t in model.periods)        
     return  (1 - model.Renewable_Penetration)*E_ren >= model.Renewable_Penetration*E_gen   
 
 def Renewables_Min_Step_Units(model,yt,ut,r):
@@ -360,10 +244,12 @@ def Renewables_Min_Step_Units(model,yt,ut,r):
 
 "Battery Energy Storage constraints"
 def State_of_Charge(model,s,yt,ut,t): # State of Charge of the battery
-    if t==1 and yt==1: # The state of charge (State_Of_Charge) for the period 0 is equal to the Battery size.
+    if t==1 and yt==model.modeled_years.first(): # The state of charge (State_Of_Charge) for the period 0 is equal to the Battery size.
         return model.Battery_SOC[s,yt,t] == model.Battery_Nominal_Capacity[ut]*model.Battery_Initial_SOC - model.Battery_Outflow[s,yt,t]/model.Battery_Discharge_Battery_Efficiency + model.Battery_Inflow[s,yt,t]*model.Battery_Charge_Battery_Efficiency
-    if t==1 and yt!=1:
-        return model.Battery_SOC[s,yt,t] == model.Battery_SOC[s,yt-1,model.Periods] - model.Battery_Outflow[s,yt,t]/model.Battery_Discharge_Battery_Efficiency + model.Battery_Inflow[s,yt,t]*model.Battery_Charge_Battery_Efficiency
+    if t==1: # the previous modeled year
+        return model.Battery_SOC[s,yt,t] == (model.Battery_SOC[s,model.modeled_years.prev(yt),model.Periods]
+                                             - model.Battery_Outflow[s,yt,t]/model.Battery_Discharge_Battery_Efficiency
+                                             + model.Battery_Inflow[s,yt,t]*model.Battery_Charge_Battery_Efficiency)
     else:  
         return model.Battery_SOC[s,yt,t] == model.Battery_SOC[s,yt,t-1] - model.Battery_Outflow[s,yt,t]/model.Battery_Discharge_Battery_Efficiency + model.Battery_Inflow[s,yt,t]*model.Battery_Charge_Battery_Efficiency    
 
@@ -373,6 +259,35 @@ def Maximun_Charge(model,s,yt,ut,t): # Maximun state of charge of the Battery
 def Minimun_Charge(model,s,yt,ut,t): # Minimun state of charge
     return model.Battery_SOC[s,yt,t] >= model.Battery_Nominal_Capacity[ut]*model.Battery_Depth_of_Discharge
 
+"Battery constraints with representative periods"
+def Intra_State_of_Charge(model,s,yt,ut,t):
+    aggregation = model.Inputs.Aggregation
+    Flow = - model.Battery_Outflow[s,yt,t]/model.Battery_Discharge_Battery_Efficiency + model.Battery_Inflow[s,yt,t]*model.Battery_Charge_Battery_Efficiency
+    if t in aggregation.First:
+        return model.Battery_SOC[s,yt,t] == Flow
+    return model.Battery_SOC[s,yt,t] == model.Battery_SOC[s,yt,t-1] + Flow
+
+def Intra_Maximun_Charge(model,s,yt,ut,t):
+    return model.Battery_SOC[s,yt,t] <= model.Battery_SOC_Intra_Max[s,yt,model.Inputs.Aggregation.Period(t)]
+
+def Intra_Minimun_Charge(model,s,yt,ut,t):
+    return model.Battery_SOC[s,yt,t] >= model.Battery_SOC_Intra_Min[s,yt,model.Inputs.Aggregation.Period(t)]
+
+def State_of_Charge_Linking(model,s,yt,ut,d): # State of Charge at the start of period d
+    aggregation = model.Inputs.Aggregation
+    if d==1 and yt==model.modeled_years.first():
+        return model.Battery_SOC_Start[s,yt,d] == model.Battery_Nominal_Capacity[ut]*model.Battery_Initial_SOC
+    if d==1:
+        last, previous = len(model.chronological_periods), model.modeled_years.prev(yt)
+        return model.Battery_SOC_Start[s,yt,d] == model.Battery_SOC_Start[s,previous,last] + model.Battery_SOC[s,previous,aggregation.Last[aggregation.Representative(last)-1]]
+    return model.Battery_SOC_Start[s,yt,d] == model.Battery_SOC_Start[s,yt,d-1] + model.Battery_SOC[s,yt,aggregation.Last[aggregation.Representative(d-1)-1]]
+
+def Linked_Maximun_Charge(model,s,yt,ut,d):
+    return model.Battery_SOC_Start[s,yt,d] + model.Battery_SOC_Intra_Max[s,yt,model.Inputs.Aggregation.Representative(d)] <= model.Battery_Nominal_Capacity[ut]
+
+def Linked_Minimun_Charge(model,s,yt,ut,d):
+    return model.Battery_SOC_Start[s,yt,d] + model.Battery_SOC_Intra_Min[s,yt,model.Inputs.Aggregation.Representative(d)] >= model.Battery_Nominal_Capacity[ut]*model.Battery_Depth_of_Discharge
+
 def Max_Power_Battery_Charge(model,ut): 
     return model.Battery_Maximum_Charge_Power[ut] == model.Battery_Nominal_Capacity[ut]/model.Maximum_Battery_Charge_Time
 
@@ -408,100 +323,30 @@ def Generator_Min_Step_Capacity(model,yt,ut,g):
 
 "Lost load constraints"
 def Maximun_Lost_Load(model,s,yt): # Maximum admittable lost load
-    return model.Lost_Load_Fraction >= (sum(model.Lost_Load[s,yt,t] for t in model.periods)/sum(model.Energy_Demand[s,yt,t] for t in model.periods))
+    return model.Lost_Load_Fraction >= (model.Yearly_Lost_Load[s,yt]/sum(model.Energy_Demand[s,yt,t]*model.Period_Weight[t] for t in model.periods))
 
 "Emission constraints"
 def RES_emission(model): #LCA emissions of RES
-    upgrade_years_list = [1 for i in range(len(model.steps))]
-    s_dur = model.Step_Duration 
-    for i in range(1, len(model.steps)): 
-        upgrade_years_list[i] = upgrade_years_list[i-1] + s_dur  
-    yu_tuples_list = [[] for i in model.years]  
-    for y in model.years:      
-        for i in range(len(upgrade_years_list)-1):
-            if y >= upgrade_years_list[i] and y < upgrade_years_list[i+1]:
-                yu_tuples_list[y-1] = (y, model.steps[i+1])          
-            elif y >= upgrade_years_list[-1]:
-                yu_tuples_list[y-1] = (y, len(model.steps))            
-    tup_list = [[] for i in range(len(model.steps)-1)]  
-    for i in range(0, len(model.steps) - 1):
-        tup_list[i] = yu_tuples_list[model.Step_Duration*i + model.Step_Duration]
-        
-    return model.RES_emission == sum(model.RES_unit_CO2_emission[r]*(model.RES_Units[1,r]-model.RES_units[r])*model.RES_Nominal_Capacity[r]/1e3 for r in model.renewable_sources)+sum(sum(model.RES_unit_CO2_emission[r]*(model.RES_Units[ut,r]-model.RES_Units[ut-1,r])*model.RES_Nominal_Capacity[r]/1e3 for (yt,ut) in tup_list) for r in model.renewable_sources)
+    return model.RES_emission == (sum(model.RES_unit_CO2_emission[r]*(model.RES_Units[1,r]-model.RES_units[r])*model.RES_Nominal_Capacity[r]/1e3 for r in model.renewable_sources)
+                                  +sum(sum(model.RES_unit_CO2_emission[r]*(model.RES_Units[ut,r]-model.RES_Units[ut-1,r])*model.RES_Nominal_Capacity[r]/1e3 for (yt,ut) in Schedule(model).Upgrades) for r in model.renewable_sources))
 
 def GEN_emission(model): #LCA emissions of generator
-    upgrade_years_list = [1 for i in range(len(model.steps))]
-    s_dur = model.Step_Duration 
-    for i in range(1, len(model.steps)): 
-        upgrade_years_list[i] = upgrade_years_list[i-1] + s_dur  
-    yu_tuples_list = [[] for i in model.years]  
-    for y in model.years:      
-        for i in range(len(upgrade_years_list)-1):
-            if y >= upgrade_years_list[i] and y < upgrade_years_list[i+1]:
-                yu_tuples_list[y-1] = (y, model.steps[i+1])          
-            elif y >= upgrade_years_list[-1]:
-                yu_tuples_list[y-1] = (y, len(model.steps))            
-    tup_list = [[] for i in range(len(model.steps)-1)]  
-    for i in range(0, len(model.steps) - 1):
-        tup_list[i] = yu_tuples_list[model.Step_Duration*i + model.Step_Duration]
-        
-    return model.GEN_emission == sum((model.Generator_Nominal_Capacity[1,g]-model.Generator_capacity[g])/1e3*model.GEN_unit_CO2_emission[g] for g in model.generator_types)+sum(sum((model.Generator_Nominal_Capacity[ut,g]-model.Generator_Nominal_Capacity[ut-1,g])/1e3*model.GEN_unit_CO2_emission[g] for (yt,ut) in tup_list) for g in model.generator_types)
+    return model.GEN_emission == (sum((model.Generator_Nominal_Capacity[1,g]-model.Generator_capacity[g])/1e3*model.GEN_unit_CO2_emission[g] for g in model.generator_types)
+                                  +sum(sum((model.Generator_Nominal_Capacity[ut,g]-model.Generator_Nominal_Capacity[ut-1,g])/1e3*model.GEN_unit_CO2_emission[g] for (yt,ut) in Schedule(model).Upgrades) for g in model.generator_types))
 
 def FUEL_emission(model,s,yt,ut,g,t): #Emissions from fuel consumption
     return model.FUEL_emission[s,yt,g,t] == model.Generator_Energy_Production[s,yt,g,t]/model.Fuel_LHV[g]/model.Generator_Efficiency[g]*model.FUEL_unit_CO2_emission[g] 
 
-def GRID_emission(model,s,yt,ut,t): #Direct emissions from grid electricity consumption
+def GRID_emission(model,s,yt,t): #Direct emissions from grid electricity consumption
     return model.GRID_emission[s,yt,t] == model.Energy_From_Grid[s,yt,t] * model.National_Grid_Specific_CO2_emissions/1e3
 
 def BESS_emission(model): #LCA emissions of generator
-    upgrade_years_list = [1 for i in range(len(model.steps))]
-    s_dur = model.Step_Duration 
-    for i in range(1, len(model.steps)): 
-        upgrade_years_list[i] = upgrade_years_list[i-1] + s_dur  
-    yu_tuples_list = [[] for i in model.years]  
-    for y in model.years:      
-        for i in range(len(upgrade_years_list)-1):
-            if y >= upgrade_years_list[i] and y < upgrade_years_list[i+1]:
-                yu_tuples_list[y-1] = (y, model.steps[i+1])          
-            elif y >= upgrade_years_list[-1]:
-                yu_tuples_list[y-1] = (y, len(model.steps))            
-    tup_list = [[] for i in range(len(model.steps)-1)]  
-    for i in range(0, len(model.steps) - 1):
-        tup_list[i] = yu_tuples_list[model.Step_Duration*i + model.Step_Duration]
-        
-    return model.BESS_emission == (model.Battery_Nominal_Capacity[1]-model.Battery_capacity)/1e3*model.BESS_unit_CO2_emission+sum((model.Battery_Nominal_Capacity[ut]-model.Battery_Nominal_Capacity[ut-1])/1e3*model.BESS_unit_CO2_emission for (yt,ut) in tup_list)
+    return model.BESS_emission == (model.Battery_Nominal_Capacity[1]-model.Battery_capacity)/1e3*model.BESS_unit_CO2_emission+sum((model.Battery_Nominal_Capacity[ut]-model.Battery_Nominal_Capacity[ut-1])/1e3*model.BESS_unit_CO2_emission for (yt,ut) in Schedule(model).Upgrades)
     
 def Scenario_FUEL_emission(model,s): 
-    return model.Scenario_FUEL_emission[s] == sum(sum(sum(model.Generator_Energy_Production[s,y,g,t]/model.Fuel_LHV[g]/model.Generator_Efficiency[g]*model.FUEL_unit_CO2_emission[g]  for t in model.periods) for y in model.years) for g in model.generator_types) 
+    return model.Scenario_FUEL_emission[s] == sum(sum(model.Generator_Yearly_Energy[s,y,g]/model.Fuel_LHV[g]/model.Generator_Efficiency[g]*model.FUEL_unit_CO2_emission[g]*model.Year_Energy_Weight_NonAct[y]
+                                                      for y in model.modeled_years) for g in model.generator_types)
 
 def Scenario_GRID_emission(model,s): 
-    return model.Scenario_GRID_emission[s] == sum(sum(model.Energy_From_Grid[s,y,t]*model.National_Grid_Specific_CO2_emissions/1e3 for t in model.periods) for y in model.years) 
-
-"Grid constraints" 
-
-def Maximum_Power_From_Grid(model,s,yt,ut,t):
-    if model.Grid_Availability[s,yt,t] == 0:
-        return model.Energy_From_Grid[s,yt,t] == 0
-    else:
-        return model.Energy_From_Grid[s,yt,t] <= model.Maximum_Grid_Power*1000 
-
-def Maximum_Power_To_Grid(model,s,yt,ut,t):    
-    if model.Grid_Connection_Type == 2 and model.Grid_Availability[s,yt,t] == 1:
-        return model.Energy_To_Grid[s,yt,t] <= model.Maximum_Grid_Power*1000  
-    elif model.Grid_Connection_Type == 1 or model.Grid_Availability[s,yt,t] == 0:
-        return model.Energy_To_Grid[s,yt,t] == 0
-
-
-    
-
-                
-
-    
-    
-    
-    
-
-
-
-
+    return model.Scenario_GRID_emission[s] == sum(model.Yearly_Energy_From_Grid[s,y]*model.National_Grid_Specific_CO2_emissions/1e3*model.Year_Energy_Weight_NonAct[y] for y in model.modeled_years) 
 
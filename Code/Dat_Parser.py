@@ -0,0 +1,132 @@
+''' Reads the AMPL-like .dat input files (Model_data.dat, Demand_data.dat, RES_data.dat) in a single pass
+
+Every file is parsed once per run into typed values: numbers become int or float, quoted text becomes str
+and indexed params become {index: value} dictionaries. Read_Dat hands out an independent copy of the
+parsed content, so that a sweep driver can change values in memory without rewriting the file.
+'''
+
+import os, re
+
+_Parsed = {}                                                    # absolute path -> (mtime, size, parsed params)
+
+#%% Parsing
+
+def Typed_Value(token):
+    if len(token) > 1 and token[0] == token[-1] and token[0] in "'\"":
+        return token[1:-1]
+    for cast in (int, float):
+        try:
+            return cast(token)
+        except ValueError:
+            pass
+    return token
+
+def Statements(text):
+    "Splits the text into ';'-terminated statements, dropping '#' comments and ignoring separators inside quotes"
+    statements, current, quote, comment = [], [], None, False
+    for char in text:
+        if comment:
+            if char == '\n':
+                comment = False
+                current.append(char)
+        elif quote:
+            current.append(char)
+            if char == quote:
+                quote = None
+        elif char == '#':
+            comment = True
+        elif char == ';':
+            statements.append(''.join(current).strip())
+            current = []
+        else:
+            if char in "'\"":
+                quote = char
+            current.append(char)
+    return [s for s in statements if s]
+
+Declaration = re.compile(r"param\s*:?\s*(\w+)\s*:?=(.*)", re.S)
+Token = re.compile(r"'[^']*'|\"[^\"]*\"|\S+")
+
+def Parse_Dat(text, path='<text>'):
+    params = {}
+    for statement in Statements(text):
+        match = Declaration.match(statement)
+        if match is None:
+            raise ValueError(path + ': cannot parse "' + statement.splitlines()[0] + '"')
+        name, tokens = match.group(1), Token.findall(match.group(2))
+        if len(tokens) == 1:
+            params[name] = Typed_Value(tokens[0])
+        elif len(tokens) > 1 and len(tokens) % 2 == 0:
+            params[name] = {Typed_Value(tokens[i]): Typed_Value(tokens[i+1]) for i in range(0, len(tokens), 2)}
+        else:
+            raise ValueError(path + ': param ' + name + ' must be a single value or a list of "index value" rows')
+    return params
+
+#%% Parsed file
+
+class DatConfig(dict):
+    "Typed content of one .dat file: param name -> value, or -> {index: value} for indexed params"
+
+    def __init__(self, params, Path='<text>'):
+        dict.__init__(self, params)
+        self.Path = Path
+
+    def copy(self):
+        return DatConfig({name: dict(v) if isinstance(v, dict) else v for name, v in self.items()}, self.Path)
+
+    def Value(self, name, kind):
+        "Value of param name converted to kind (int, float or str); quoted numbers such as '252' are accepted as numbers"
+        if name not in self:
+            raise KeyError(self.Path + ': param ' + name + ' is missing')
+        value = self[name]
+        try:
+            if kind is str:
+                return value if isinstance(value, str) else str(value)
+            if isinstance(value, str) or (kind is float and isinstance(value, int)):
+                return kind(value)
+            if isinstance(value, kind):
+                return value
+        except ValueError:
+            pass
+        raise ValueError(self.Path + ': param ' + name + ' should be of type ' + kind.__name__ + ', found ' + repr(value))
+
+    def Int(self, name):
+        return self.Value(name, int)
+
+    def Float(self, name):
+        return self.Value(name, float)
+
+    def Text(self, name):
+        return self.Value(name, str)
+
+def Read_Dat(path):
+    "Parses path (only the first time, or again after it changed on disk) and returns an independent copy of its params"
+    full_path = os.path.abspath(path)
+    stat = os.stat(full_path)
+    cached = _Parsed.get(full_path)
+    if cached is None or cached[:2] != (stat.st_mtime, stat.st_size):
+        with open(full_path, encoding='utf-8', errors='replace') as f:
+            cached = (stat.st_mtime, stat.st_size, Parse_Dat(f.read(), path))
+        _Parsed[full_path] = cached
+    return DatConfig(cached[2], path).copy()
+
+#%% Validation of Model_data.dat
+
+Model_Data_Counts = ('Periods', 'Years', 'Step_Duration', 'Min_Last_Step_Duration', 'Scenarios', 'RES_Sources', 'Generator_Types')
+
+def Validate_Model_Data(config):
+    "Checks the params the time-series import and the investment steps depend on, raising a ValueError that lists every problem"
+    problems = []
+    for name in Model_Data_Counts:
+        try:
+            if config.Int(name) < 1 and name != 'Min_Last_Step_Duration':
+                problems.append(name + ' must be at least 1')
+        except (KeyError, ValueError) as error:
+            problems.append(str(error.args[0]))
+    weights = config.get('Scenario_Weight')
+    if isinstance(config.get('Scenarios'), int):
+        if not isinstance(weights, dict) or set(weights) != set(range(1, config['Scenarios']+1)):
+            problems.append('Scenario_Weight must have one "scenario weight" row per scenario (1 to ' + str(config['Scenarios']) + ')')
+    if problems:
+        raise ValueError(config.Path + ':\n  ' + '\n  '.join(problems))
+    return config
@@ -1,60 +1,35 @@
-''' Imports input data from "Demand.dat"'''
+''' Imports input data from "Demand_data.dat"'''
 
-import re, time, pandas as pd, numpy as np
+import time, pandas as pd, numpy as np
+from Dat_Parser import Read_Dat
 
 def data_import(data_demand, data):
-    for value in data_demand:
-        if "param: lat" in value:
-            lat = float(value[value.index('=')+1:value.index(';')].replace(' ','').replace("'",""))
-            if  10 <= lat <=20:
-                F = 'F1'
-            elif -10 <= lat < 10:
-                F = 'F2'
-            elif -20 <= lat < -10:
-                F = 'F3'
-            elif -30<= lat < -20:
-                F = 'F4'
-            elif lat < -30:
-                F = 'F5'
-        if "param: cooling_period" in value:
-            cooling_period = value[value.index('=')+1:value.index(';')].replace(' ','').replace("'","")
-        if "param: h_tier1" in value:
-            h_tier1 = float(value[value.index('=')+1:value.index(';')].replace(' ','').replace("'",""))
-        if "param: h_tier2" in value:
-            h_tier2 = float(value[value.index('=')+1:value.index(';')].replace(' ','').replace("'",""))
-        if "param: h_tier3" in value:
-            h_tier3 = float(value[value.index('=')+1:value.index(';')].replace(' ','').replace("'",""))
-        if "param: h_tier4" in value:
-            h_tier4 = float(value[value.index('=')+1:value.index(';')].replace(' ','').replace("'",""))
-        if "param: h_tier5" in value:
-            h_tier5 = float(value[value.index('=')+1:value.index(';')].replace(' ','').replace("'",""))
-        if "param: schools" in value:
-            num_schools = float(value[value.index('=')+1:value.index(';')].replace(' ','').replace("'",""))
-        if "param: hospital_1" in value:
-            num_hosp_1 = float(value[value.index('=')+1:value.index(';')].replace(' ','').replace("'",""))
-        if "param: hospital_2" in value:
-            num_hosp_2 = float(value[value.index('=')+1:value.index(';')].replace(' ','').replace("'",""))
-        if "param: hospital_3" in value:
-            num_hosp_3 = float(value[value.index('=')+1:value.index(';')].replace(' ','').replace("'",""))
-        if "param: hospital_4" in value:
-            num_hosp_4 = float(value[value.index('=')+1:value.index(';')].replace(' ','').replace("'",""))
-        if "param: hospital_5" in value:
-            num_hosp_5 = float(value[value.index('=')+1:value.index(';')].replace(' ','').replace("'",""))
-        if "param: demand_growth" in value:
-            demand_growth = float(value[value.index('=')+1:value.index(';')].replace(' ','').replace("'",""))
-    for value in data:
-        
-        if "param: Years" in value:
-            years = int(value[value.index('=')+1:value.index(';')].replace(' ','').replace("'",""))
+    lat = data_demand.Float('lat')
+    if  10 <= lat <=20:
+        F = 'F1'
+    elif -10 <= lat < 10:
+        F = 'F2'
+    elif -20 <= lat < -10:
+        F = 'F3'
+    elif -30<= lat < -20:
+        F = 'F4'
+    elif lat < -30:
+        F = 'F5'
+    cooling_period = data_demand.Text('cooling_period')
+    h_tier = [data_demand.Float('h_tier' + str(ii)) for ii in range(1,6)]
+    num_services = [data_demand.Float('hospital_' + str(ii)) for ii in range(1,6)] + [data_demand.Float('schools')]
+    demand_growth = data_demand.Float('demand_growth')
+    years = data.Int('Years')
     
-    return F, cooling_period, [h_tier1, h_tier2, h_tier3, h_tier4, h_tier5], [num_hosp_1, num_hosp_2, num_hosp_3, num_hosp_4, num_hosp_5,num_schools], demand_growth, years
+    return F, cooling_period, h_tier, num_services, demand_growth, years
 
 #%% Calculates the load demand given as input the latitude, cooling period and number of households for each wealth tier and number of services (schools and hospitals)
 
-def demand_calculation():
+def demand_calculation(data=None):
     
-    data_demand = open("Inputs/Demand_data.dat").readlines()
-    data = open("Inputs/Model_data.dat").readlines()
+    data_demand = Read_Dat("Inputs/Demand_data.dat")
+    if data is None:
+        data = Read_Dat("Inputs/Model_data.dat")
     
     num_h_tier = []
     
@@ -124,11 +99,11 @@ def excel_export(load, n_years):
 
 #%% Calculates and export the load demand  time series of households and services for 20 years to Demand.xlsx
 
-def demand_generation(n_years):
+def demand_generation(n_years, data=None):
     start = time.time()
         
     print("Load demand calculation started, please remember to close Demand.xlsx... \n")
-    load_tot = demand_calculation()
+    load_tot = demand_calculation(data)
     load_tot = load_tot.set_axis(np.arange(1,n_years+1), axis=1, inplace=False)
     excel_export(load_tot, n_years)
     
@@ -0,0 +1,79 @@
+''' Binary cache of the time series read from the Inputs/*.xlsx workbooks
+
+Each workbook parsed by Read_Excel is stored as <workbook>.cache.npz next to it,
+together with the modification time, size and SHA-256 hash of the workbook it was parsed from.
+The cache is reused as long as the workbook is unchanged and rebuilt automatically otherwise.
+
+Run "python Excel_Cache.py --clear [folder]" to delete the cache files of a folder (default: Inputs).
+'''
+
+import os, sys, glob, json, hashlib, numpy as np, pandas as pd
+
+Cache_Suffix = '.cache.npz'
+
+def File_Hash(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def Cache_Path(path):
+    return path + Cache_Suffix
+
+#%% Reads a workbook through the cache
+
+def Read_Excel(path, Refresh=False, **kwargs):
+    "Same as pd.read_excel(path, **kwargs), served from the binary cache when the workbook has not changed since it was last parsed"
+    stat = os.stat(path)
+    options = json.dumps(kwargs, sort_keys=True, default=str)
+    cache = Cache_Path(path)
+
+    if not Refresh and os.path.exists(cache):
+        try:
+            with np.load(cache, allow_pickle=False) as stored:
+                meta = json.loads(str(stored['meta']))
+                if meta['options'] == options:
+                    if meta['mtime'] == stat.st_mtime and meta['size'] == stat.st_size:
+                        return pd.DataFrame(stored['values'], index=stored['index'], columns=stored['columns'])
+                    if meta['sha256'] == File_Hash(path):             # touched but not modified
+                        frame = pd.DataFrame(stored['values'], index=stored['index'], columns=stored['columns'])
+                        Write_Cache(cache, frame, stat, meta['sha256'], options)
+                        return frame
+        except (OSError, KeyError, ValueError):
+            pass                                                        # unreadable or outdated cache file, parse the workbook again
+
+    frame = pd.read_excel(path, **kwargs)
+    Write_Cache(cache, frame, stat, File_Hash(path), options)
+    return frame
+
+def Write_Cache(cache, frame, stat, sha256, options):
+    arrays = {'values': frame.values, 'index': frame.index.values, 'columns': frame.columns.values}
+    if any(a.dtype == object for a in arrays.values()):
+        return                                                          # text cells are not cached, the workbook is parsed every time
+    meta = json.dumps({'mtime': stat.st_mtime, 'size': stat.st_size, 'sha256': sha256, 'options': options})
+    temp = cache + '.' + str(os.getpid()) + '.tmp.npz'
+    try:
+        np.savez(temp, meta=np.array(meta), **arrays)
+        os.replace(temp, cache)                                         # atomic, so that parallel runs never read a half-written cache
+    except OSError:
+        if os.path.exists(temp):
+            os.remove(temp)
+
+#%% Invalidation
+
+def Clear_Cache(folder='Inputs'):
+    "Deletes the cache files of the workbooks in folder and returns their paths"
+    removed = glob.glob(os.path.join(folder, '*.xlsx' + Cache_Suffix))
+    for cache in removed:
+        os.remove(cache)
+    return removed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--clear':
+        folder = sys.argv[2] if len(sys.argv) > 2 else 'Inputs'
+        for cache in Clear_Cache(folder):
+            print('Removed ' + cache)
+    else:
+        print(__doc__)
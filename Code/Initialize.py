@@ -17,215 +17,338 @@ Based on the original model by:
 
 
 import pandas as pd, numpy as np
-import re
-from RE_calculation import RE_supply
-from Demand import demand_generation
-from Grid_Availability import grid_availability
-
-#%% This section extracts the values of Scenarios, Periods, Years from data.dat and creates ranges for them
-Data_file = "Inputs/Model_data.dat"
-Data_import = open(Data_file).readlines()
-
-for i in range(len(Data_import)):
-    if "param: Scenarios" in Data_import[i]:
-        n_scenarios = int((re.findall('\d+',Data_import[i])[0]))
-    if "param: Years" in Data_import[i]:
-        n_years = int((re.findall('\d+',Data_import[i])[0]))
-    if "param: Periods" in Data_import[i]:
-        n_periods = int((re.findall('\d+',Data_import[i])[0]))
-    if "param: Generator_Types" in Data_import[i]:      
-        n_generators = int((re.findall('\d+',Data_import[i])[0]))
-    if "param: RE_Supply_Calculation" in Data_import[i]:      
-        RE_Supply_Calculation = int((re.findall('\d+',Data_import[i])[0]))
-    if "param: Demand_Profile_Generation" in Data_import[i]:      
-        Demand_Profile_Generation = int((re.findall('\d+',Data_import[i])[0]))
-    if "param: Grid_Average_Number_Outages " in Data_import[i]:      
-        average_n_outages = int((re.findall('\d+',Data_import[i])[0]))
-    if "param: Grid_Average_Outage_Duration" in Data_import[i]:       
-        average_outage_duration = int((re.findall('\d+',Data_import[i])[0]))
-    if "param: Grid_Connection " in Data_import[i]:      
-        grid_connection = int((re.findall('\d+',Data_import[i])[0]))
-    if "param: Grid_Availability_Simulation" in Data_import[i]:      
-        grid_availability_simulation = int((re.findall('\d+',Data_import[i])[0]))
-    if "param: Year_Grid_Connection " in Data_import[i]:      
-        year_grid_connection = int((re.findall('\d+',Data_import[i])[0]))
-    if "param: Grid_Connection_Type" in Data_import[i]:      
-        grid_connection_type = ((Data_import[i][Data_import[i].index('=')+1:Data_import[i].index(';')]).replace(' ','')).replace("'","")
-
-scenario = [i for i in range(1,n_scenarios+1)]
-year = [i for i in range(1,n_years+1)]
-period = [i for i in range(1,n_periods+1)]
-generator = [i for i in range(1,n_generators+1)]
+import os, itertools
+from collections import namedtuple
+from functools import lru_cache
+from pyomo.environ import value
+from Excel_Cache import Read_Excel
+from Dat_Parser import Read_Dat, Validate_Model_Data
+from Time_Series_Store import Store_Array, Open_Array
 
-#%% This section is useful to define the number of investment steps as well as to assign each year to its corresponding step
-def Initialize_Upgrades_Number(model):
-    Data_file = "Inputs/Model_data.dat"
-    Data_import = open(Data_file).readlines()
+
+#%% This section defines the InputBundle, which reads and keeps the inputs of one case
+
+def Memoized(method):
+    "Property computed on first access and then kept"
+    key = '_' + method.__name__
+    def getter(self):
+        if key not in self.__dict__:
+            self.__dict__[key] = method(self)
+        return self.__dict__[key]
+    getter.__doc__ = method.__doc__
+    return property(getter)
+
+def Stored(method):
+    "Memoized time series, kept as a memory map of the store (Time_Series_Store.py)"
+    name = method.__name__
+    def compute(self):
+        stored = Store_Array(self.Path('Time_Series'), name, self.Time_Series[name] if name in self.Time_Series else method(self))
+        if name in self.Time_Series:
+            self.Time_Series[name] = stored                                 # memory map in place of the given array
+        return stored
+    compute.__name__, compute.__doc__ = name, method.__doc__
+    return Memoized(compute)
+
+Time_Series_Names = ('Energy_Demand', 'RES_Unit_Energy', 'Grid_Availability')
+
+class InputBundle:
+    "Inputs of one model case, each read when first needed"
+    Aggregation = None                  # representative periods (Time_Aggregation.py)
     
-    for i in range(len(Data_import)):
-        if "param: Years" in Data_import[i]:
-            n_years = int((re.findall('\d+',Data_import[i])[0]))
-        if "param: Step_Duration" in Data_import[i]:
-            step_duration = int((re.findall('\d+',Data_import[i])[0]))
-        if "param: Min_Last_Step_Duration" in Data_import[i]:
-            min_last_step_duration = int((re.findall('\d+',Data_import[i])[0]))
+    def __init__(self, Data_Path="Inputs/Model_data.dat", Refresh_Cache=False, Model_Data=None, Time_Series=None):
+        self.Data_Path     = Data_Path
+        self.Inputs_Path   = os.path.dirname(Data_Path)
+        self.Refresh_Cache = Refresh_Cache  # True to re-parse the workbooks (Excel_Cache.py)
+        if Model_Data is not None:
+            self._Model_Data = Validate_Model_Data(Model_Data)  # Model_data.dat content already read
+        self.Time_Series   = dict(Time_Series or {})             # arrays given in memory
+        for name in self.Time_Series:
+            if name not in Time_Series_Names:
+                raise KeyError('Unknown time series ' + name)
+
+    def __deepcopy__(self, memo):
+        return self                     # shared when Pyomo clones the model
+
+    def __getstate__(self):
+        "Pickles the memory-mapped time series, also those held in Time_Series, as their file paths"
+        state = dict(self.__dict__)
+        state['_Mapped'] = {key: value.filename for key, value in self.__dict__.items() if isinstance(value, np.memmap)}
+        for key in state['_Mapped']:
+            del state[key]
+        state['_Mapped_Series'] = {name: value.filename for name, value in self.Time_Series.items() if isinstance(value, np.memmap)}
+        state['Time_Series'] = {name: value for name, value in self.Time_Series.items() if name not in state['_Mapped_Series']}
+        return state
+
+    def __setstate__(self, state):
+        mapped, mapped_series = state.pop('_Mapped', {}), state.pop('_Mapped_Series', {})
+        self.__dict__.update(state)
+        opened = {path: Open_Array(path) for path in set(mapped.values()) | set(mapped_series.values())}   # each file mapped once, as before pickling
+        for key, path in mapped.items():
+            self.__dict__[key] = opened[path]
+        for name, path in mapped_series.items():
+            self.Time_Series[name] = opened[path]
+
+    def Path(self, file_name):
+        return os.path.join(self.Inputs_Path, file_name)
+
+    def With_Data(self, Model_Data):
+        "Same bundle with another Model_data.dat content"
+        for name in Time_Series_Names:
+            getattr(self, name)                                             # stored once, then shared
+        bundle = object.__new__(type(self))
+        bundle.__dict__.update(self.__dict__)
+        bundle.Time_Series, bundle._Model_Data = dict(self.Time_Series), Validate_Model_Data(Model_Data)
+        return bundle
+
+    @Memoized
+    def Model_Data(self):
+        "Typed and validated content of Model_data.dat (see Dat_Parser.py)"
+        return Validate_Model_Data(Read_Dat(self.Data_Path))
+
+    #%% Multi-year Demand and Renewable-Energy output, reshaped into (scenario, year, period) arrays
+    @Stored
+    def Energy_Demand(self):
+        "Load demand [Wh] as a (scenarios, years, periods) float32 array"
+        md = self.Model_Data
+        n_scenarios, n_years, n_periods = md.Int('Scenarios'), md.Int('Years'), md.Int('Periods')
+        if md.Int('Demand_Profile_Generation'):
+            from Demand import demand_generation
+            Demand = demand_generation(n_years, md) 
+        else:
+            Demand = Read_Excel(self.Path('Demand.xlsx'), Refresh=self.Refresh_Cache, index_col=0)
+        # Column (s-1)*n_years + y of Demand.xlsx holds year y of scenario s
+        columns = [i for i in range(1,n_years*n_scenarios+1)]
+        return Demand[columns].values[:n_periods].T.reshape(n_scenarios, n_years, n_periods)
+
+    @Memoized
+    def Cumulative_Demand(self):
+        "Running total of the load demand, (scenarios, years*periods+1) array"
+        n_scenarios, n_years, n_periods = self.Energy_Demand.shape
+        cumulative = np.zeros((n_scenarios, n_years*n_periods+1))
+        np.cumsum(self.Energy_Demand.reshape(n_scenarios, n_years*n_periods), axis=1, out=cumulative[:,1:])
+        return cumulative
+
+    def Average_Block_Demand(self, block_length, first, last):
+        "Average demand of the blocks of block_length hours overlapping hours first..last"
+        blocks, key = self.__dict__.setdefault('_Block_Demand', {}), (block_length, first, last)
+        if key not in blocks:
+            cumulative = self.Cumulative_Demand
+            last = min(last, (cumulative.shape[1]-1)//block_length*block_length)   # no incomplete last block
+            if first > last:
+                average = np.full(cumulative.shape[0], np.nan)
+            else:
+                n_blocks = (last-1)//block_length - (first-1)//block_length + 1    # blocks cut by the edges count whole
+                average = (cumulative[:,last] - cumulative[:,first-1])/n_blocks
+            blocks[key] = average
+        return blocks[key]
+
+    @Stored
+    def RES_Unit_Energy(self):
+        "Energy production of one unit of each RES [Wh]"
+        md = self.Model_Data
+        n_scenarios, n_res, n_periods = md.Int('Scenarios'), md.Int('RES_Sources'), md.Int('Periods')
+        if md.Int('RE_Supply_Calculation'):
+            from RE_calculation import RE_supply
+            Renewable_Energy = RE_supply().drop([None], axis=1).set_index([pd.Index([ii for ii in range(1,8761)])], inplace = False)
+        else:
+            Renewable_Energy = Read_Excel(self.Path('Renewable_Energy.xlsx'), Refresh=self.Refresh_Cache, index_col=0)
+        # Column (s-1)*n_res + r of Renewable_Energy.xlsx holds source r of scenario s
+        columns = [i for i in range(1,n_res*n_scenarios+1)]
+        return Renewable_Energy[columns].values[:n_periods].T.reshape(n_scenarios, n_res, n_periods)
+
+    @Stored
+    def Grid_Availability(self):
+        "Availability (1) or outage (0) of the national grid"
+        md = self.Model_Data
+        n_scenarios, n_years, n_periods = md.Int('Scenarios'), md.Int('Years'), md.Int('Periods')
+        if md.Int('Grid_Availability_Simulation') == 1:
+            from Grid_Availability import grid_availability
+            grid_availability(md.Float('Grid_Average_Number_Outages'), md.Float('Grid_Average_Outage_Duration'), n_years, md.Int('Year_Grid_Connection'))
+        if md.Int('Grid_Connection'):  
+            availability = Read_Excel(self.Path('Grid_availability.xlsx'), Refresh=self.Refresh_Cache, index_col=0) 
+            columns = [i for i in range(1,n_years*n_scenarios+1)]
+            return availability[columns].values[:n_periods].T.reshape(n_scenarios, n_years, n_periods)
+        else:
+            return np.zeros((n_scenarios, n_years, n_periods), dtype=np.uint8)
+
+def Param_Dict(array):
+    "{(i,j,...): value} dictionary of an array, with 1-based indices"
+    index = itertools.product(*[range(1, n+1) for n in array.shape])
+    return dict(zip(index, array.ravel().tolist()))
+
+def Checked_Time_Series(array, name, shape, binary=False):
+    "Validates a whole time series at once"
+    if array.shape != shape:
+        raise ValueError(name + ' has shape ' + str(array.shape) + ', expected ' + str(shape) + ' from Model_data.dat')
+    invalid = ~np.isin(array, (0, 1)) if binary else ~(array >= 0)         # also catches NaN
+    if invalid.any():
+        index = tuple(int(i)+1 for i in np.argwhere(invalid)[0])
+        raise ValueError(name + str(list(index)) + ' = ' + str(array[tuple(i-1 for i in index)])
+                         + (' is not 0 or 1' if binary else ' is not a non-negative number'))
+    return array
+
+def Initialize_Demand(model):
+    shape = (len(model.scenarios), len(model.years), len(model.periods))
+    return Param_Dict(Checked_Time_Series(model.Inputs.Energy_Demand, 'Energy_Demand', shape))
+
+def Initialize_RES_Energy(model):
+    shape = (len(model.scenarios), len(model.renewable_sources), len(model.periods))
+    return Param_Dict(Checked_Time_Series(model.Inputs.RES_Unit_Energy, 'RES_Unit_Energy_Production', shape))
+
+def Initialize_Period_Weight(model):
+    "Number of hours of the year each period stands for"
+    if model.Inputs.Aggregation is None:
+        return {t: 1 for t in model.periods}
+    return dict(enumerate(model.Inputs.Aggregation.Hour_Weights(), 1))
+
+def Initialize_Grid_Availability(model):
+    shape = (len(model.scenarios), len(model.years), len(model.periods))
+    return Param_Dict(Checked_Time_Series(model.Inputs.Grid_Availability, 'Grid_Availability', shape, binary=True))
+
+def Pyomo_Data(model, Model_Data):
+    "Model_data.dat content as a create_instance dictionary"
+    unknown = [name for name in Model_Data if model.component(name) is None]
+    if unknown:
+        raise KeyError(Model_Data.Path + ': no model component for param ' + ', '.join(unknown))
+    return {None: {name: value if isinstance(value, dict) else {None: value} for name, value in Model_Data.items()}}
+
+#%% This section is useful to define the number of investment steps as well as to assign each year to its corresponding step
+
+class StepSchedule(namedtuple('StepSchedule', 'Years Steps Step_Duration Start_Years Years_Steps Upgrades Discount')):
+    "Investment-step schedule of a project"
+    __slots__ = ()
 
+    def Step(self, y):
+        "Investment step of year y"
+        return self.Years_Steps[y-1][1]
+
+    def Step_Years(self, ut):
+        "Years covered by investment step ut"
+        last = self.Start_Years[ut]-1 if ut < self.Steps else self.Years
+        return range(self.Start_Years[ut-1], last+1)
+
+@lru_cache(maxsize=None)
+def Step_Schedule(n_years, step_duration, min_last_step_duration, discount_rate):
+    "Splits the years of the project in investment steps"
     if n_years % step_duration == 0:
-        n_upgrades = n_years/step_duration
-        return n_upgrades
-    
+        n_steps = n_years//step_duration
     else:
-        n_upgrades = 1
-        for y in  range(1, n_years + 1):
-            if y % step_duration == 0 and n_years - y > min_last_step_duration:
-                n_upgrades += 1
-        return int(n_upgrades)
+        n_steps = 1 + sum(1 for y in range(step_duration, n_years+1, step_duration) if n_years - y > min_last_step_duration)
+    start_years = tuple(1 + step_duration*i for i in range(n_steps))                              # First year of each step
+    years_steps = tuple((y, min(n_steps, (y-1)//step_duration + 1)) for y in range(1, n_years+1)) # (year, step) of each year
+    upgrades = tuple(zip(start_years[1:], range(2, n_steps+1)))                                   # (first year, step) of the later steps
+    discount = tuple((1+discount_rate)**y for y in range(n_years+1))                              # Discount[y] = (1+Discount_Rate)**y
+    return StepSchedule(n_years, n_steps, step_duration, start_years, years_steps, upgrades, discount)
 
-def Initialize_YearUpgrade_Tuples(model):
-    upgrade_years_list = [1 for i in range(len(model.steps))]
-    s_dur = model.Step_Duration   
-    for i in range(1, len(model.steps)): 
-        upgrade_years_list[i] = upgrade_years_list[i-1] + s_dur    
-    yu_tuples_list = [0 for i in model.years]    
-    if model.Steps_Number == 1:    
-        for y in model.years:            
-            yu_tuples_list[y-1] = (y, 1)    
-    else:        
-        for y in model.years:            
-            for i in range(len(upgrade_years_list)-1):
-                if y >= upgrade_years_list[i] and y < upgrade_years_list[i+1]:
-                    yu_tuples_list[y-1] = (y, model.steps[i+1])                
-                elif y >= upgrade_years_list[-1]:
-                    yu_tuples_list[y-1] = (y, len(model.steps))   
-    print('\nTime horizon (year,investment-step): ' + str(yu_tuples_list))
-    return yu_tuples_list
+def Schedule(model):
+    "StepSchedule of a model or solved instance"
+    return Step_Schedule(int(value(model.Years)), int(value(model.Step_Duration)),
+                         int(value(model.Min_Last_Step_Duration)), float(value(model.Discount_Rate)))
+
+#%% Representative years: only some years of each investment step are modeled hour by hour
+
+Representative_Year_Rules = {'first': lambda n: [0], 'middle': lambda n: [(n-1)//2], 'last': lambda n: [n-1],
+                             'first-last': lambda n: [0, n-1], 'first-middle-last': lambda n: [0, (n-1)//2, n-1]}
 
+def Per_Model(function):
+    "function(model) computed once for each model (or instance) and kept on it"
+    key = '_' + function.__name__
+    def memoized(model):
+        if key not in model.__dict__:
+            setattr(model, key, function(model))
+        return model.__dict__[key]
+    memoized.__name__, memoized.__doc__ = function.__name__, function.__doc__
+    return memoized
 
-#%% This section imports the multi-year Demand and Renewable-Energy output and creates a Multi-indexed DataFrame for it
+@Per_Model
+def Year_Representatives(model):
+    "Modeled year standing for each year of the project"
+    sc = Schedule(model)
+    choice = model.Representative_Years
+    if choice is None:
+        return {y: y for y in range(1, sc.Years+1)}
+    if isinstance(choice, str) and choice not in Representative_Year_Rules:
+        raise ValueError('Representative_Years must be a list of years or one of ' + ', '.join(Representative_Year_Rules))
+    representatives = {}
+    for ut in range(1, sc.Steps+1):
+        step_years = list(sc.Step_Years(ut))
+        if isinstance(choice, str):
+            modeled = [step_years[i] for i in Representative_Year_Rules[choice](len(step_years))]
+        else:
+            modeled = [y for y in step_years if y in set(choice)]
+            if not modeled:
+                raise ValueError('Representative_Years has no year of investment step ' + str(ut)
+                                 + ' (years ' + str(step_years[0]) + '-' + str(step_years[-1]) + ')')
+        for y in step_years:
+            representatives[y] = min(modeled, key=lambda m: (abs(m-y), m))
+    return representatives
+
+def Initialize_Modeled_Years(model):
+    return sorted(set(Year_Representatives(model).values()))
+
+def Initialize_Modeled_Years_Steps(model):
+    return [(y,ut) for (y,ut) in model.years_steps if y in model.modeled_years]
+
+@Per_Model
+def Demand_Ratios(model):
+    "Demand of each year over the demand of the modeled year standing for it"
+    Inputs = model.Inputs
+    hours = np.ones(Inputs.Energy_Demand.shape[2]) if Inputs.Aggregation is None else np.asarray(Inputs.Aggregation.Hour_Weights(), dtype=float)
+    Demand = np.tensordot(Inputs.Energy_Demand, hours, axes=([2], [0])).sum(axis=0)
+    return {x: Demand[x-1]/Demand[m-1] if Demand[m-1] > 0 else 1 for x, m in Year_Representatives(model).items()}
 
-if RE_Supply_Calculation:
-   Renewable_Energy = RE_supply().drop([None], axis=1).set_index([pd.Index([ii for ii in range(1,8761)])], inplace = False)
-else:
-   Renewable_Energy = pd.read_excel('Inputs/Renewable_Energy.xlsx')   
-if Demand_Profile_Generation:
-   Demand = demand_generation(n_years) 
-else:
-   Demand = pd.read_excel('Inputs/Demand.xlsx')
-       
+def Year_Weights(model, y, actualized, energy):
+    "Number of years (actualized or not) modeled year y stands for"
+    Discount = Schedule(model).Discount
+    ratio = Demand_Ratios(model) if energy else None
+    return sum((ratio[x] if energy else 1)/(Discount[x] if actualized else 1) for x, m in Year_Representatives(model).items() if m == y)
 
-Energy_Demand_Series = pd.Series()
-for i in range(1,n_years*n_scenarios+1):
-    dum = Demand[i][:]
-    Energy_Demand_Series = pd.concat([Energy_Demand_Series,dum])
-Energy_Demand = pd.DataFrame(Energy_Demand_Series) 
-frame = [scenario,year,period]
-index = pd.MultiIndex.from_product(frame, names=['scenario','year','period'])
-Energy_Demand.index = index
-Energy_Demand_2 = pd.DataFrame()    
-for s in scenario:
-    Energy_Demand_Series_2 = pd.Series()
-    for y in year:
-        dum_2 = Demand[(s-1)*n_years + y][:]
-        Energy_Demand_Series_2 = pd.concat([Energy_Demand_Series_2,dum_2])
-    Energy_Demand_2.loc[:,s] = Energy_Demand_Series_2
-index_2 = pd.RangeIndex(1,n_years*n_periods+1)
-Energy_Demand_2.index = index_2
+def Initialize_Year_Weight_Act(model, y):
+    return Year_Weights(model, y, True, False)
 
-def Initialize_Demand(model, s, y, t):
-    return float(Energy_Demand[0][(s,y,t)])
+def Initialize_Year_Weight_NonAct(model, y):
+    return Year_Weights(model, y, False, False)
 
+def Initialize_Year_Energy_Weight_Act(model, y):
+    return Year_Weights(model, y, True, True)
 
-def Initialize_RES_Energy(model,s,r,t):
-    column = (s-1)*model.RES_Sources + r 
-    return float(Renewable_Energy[column][t])   
+def Initialize_Year_Energy_Weight_NonAct(model, y):
+    return Year_Weights(model, y, False, True)
 
+def Initialize_Upgrades_Number(model):
+    return Schedule(model).Steps
+
+def Initialize_YearUpgrade_Tuples(model):
+    yu_tuples_list = list(Schedule(model).Years_Steps)
+    print('\nTime horizon (year,investment-step): ' + str(yu_tuples_list))
+    return yu_tuples_list
 
 
-  
 def Initialize_Battery_Unit_Repl_Cost(model):
     Unitary_Battery_Cost = model.Battery_Specific_Investment_Cost - model.Battery_Specific_Electronic_Investment_Cost
-    return Unitary_Battery_Cost/(model.Battery_Cycles*2*(1-model.Battery_Depth_of_Discharge))
+    return value(Unitary_Battery_Cost/(model.Battery_Cycles*2*(1-model.Battery_Depth_of_Discharge)))           # a number even with mutable costs
     
     
 
 
 def Initialize_Battery_Minimum_Capacity(model,ut):   
-    Periods = model.Battery_Independence*24
-    Len =  int(model.Periods*model.Years/Periods)
-    Grouper = 1
-    index = 1
-    for i in range(1, Len+1):
-        for j in range(1,Periods+1):      
-            Energy_Demand_2.loc[index, 'Grouper'] = Grouper
-            index += 1      
-        Grouper += 1
-
-    upgrade_years_list = [1 for i in range(len(model.steps))]
-    
-    for u in range(1, len(model.steps)):
-        upgrade_years_list[u] =upgrade_years_list[u-1] + model.Step_Duration
-    if model.Steps_Number ==1:
-        Energy_Demand_Upgrade = Energy_Demand_2    
-    else:
-        if ut==1:
-            start = 0
-            Energy_Demand_Upgrade = Energy_Demand_2.loc[start : model.Periods*(upgrade_years_list[ut]-1), :]       
-        elif ut == len(model.steps):
-            start = model.Periods*(upgrade_years_list[ut-1] -1)+1
-            Energy_Demand_Upgrade = Energy_Demand_2.loc[start :, :]       
-        else:
-            start = model.Periods*(upgrade_years_list[ut-1] -1)+1
-            Energy_Demand_Upgrade = Energy_Demand_2.loc[start : model.Periods*(upgrade_years_list[ut]-1), :]
+    start_years = Schedule(model).Start_Years
+    periods = model.Periods if model.Inputs.Aggregation is None else model.Inputs.Aggregation.Year_Periods   # the real sequence of days
+    # First and last hour of the lifetime covered by step ut
+    first, last = 1, periods*model.Years
+    if ut > 1:
+        first = periods*(start_years[ut-1] -1)+1
+    if ut < len(start_years):
+        last = periods*(start_years[ut]-1)
     
-    Period_Energy = Energy_Demand_Upgrade.groupby(['Grouper']).sum()        
-    Period_Average_Energy = Period_Energy.mean()
-    Available_Energy = sum(Period_Average_Energy[s]*model.Scenario_Weight[s] for s in model.scenarios) 
+    Period_Average_Energy = model.Inputs.Average_Block_Demand(model.Battery_Independence*24, int(first), int(last))
+    Available_Energy = sum(Period_Average_Energy[s-1]*model.Scenario_Weight[s] for s in model.scenarios) 
     
     return  Available_Energy/(1-model.Battery_Depth_of_Discharge)
 
 #%% 
 def Initialize_Generator_Marginal_Cost(model,s,y,g):
-    return model.Fuel_Specific_Cost[g]/(model.Fuel_LHV[g]*model.Generator_Efficiency[g])
-
-if grid_availability_simulation == 1:
-    grid_availability(average_n_outages, average_outage_duration, n_years, year_grid_connection)
-
-#initialize grid availability
-if grid_connection:  
-    availability = pd.read_excel('Inputs/Grid_availability.xlsx') 
-else:
-    availability = pd.concat([pd.DataFrame(np.zeros(n_years)).T for ii in range(8760)])
-    availability.set_axis([ii for ii in range(8760)], axis='index')
-    availability.set_axis([ii for ii in range(1,n_years+1)], axis='columns')
-
-grid_availability_Series = pd.Series()
-for i in range(1,n_years*n_scenarios+1):
-    dum = availability[i][:]
-    grid_availability_Series = pd.concat([grid_availability_Series,dum])
-grid_availability = pd.DataFrame(grid_availability_Series) 
-frame = [scenario,year,period]
-index = pd.MultiIndex.from_product(frame, names=['scenario','year','period'])
-grid_availability.index = index
-grid_availability_2 = pd.DataFrame()    
-for s in scenario:
-   grid_availability_Series_2 = pd.Series()
-   for y in year:
-      dum_2 = availability[(s-1)*n_years + y][:]
-      grid_availability_Series_2 = pd.concat([grid_availability_Series_2,dum_2])
-   grid_availability_2.loc[:,s] = grid_availability_Series_2
-index_2 = pd.RangeIndex(1,n_years*n_periods+1)
-grid_availability_2.index = index_2
-
-def Initialize_Grid_Availability(model, s, y, t):  
-    return float(grid_availability[0][(s,y,t)])
-
-if grid_connection_type == "Bidirectional":
-    grid_connection_type = 2
-elif grid_connection_type == "Purchase":
-    grid_connection_type = 1
-
-def Initialize_Grid_Connection_Type(model):
-    return grid_connection_type
+    return value(model.Fuel_Specific_Cost[g]/(model.Fuel_LHV[g]*model.Generator_Efficiency[g]))
 
 def Initialize_National_Grid_Inv_Cost(model):
     Grid_Connection_Specific_Cost = model.Grid_Connection_Cost  
@@ -239,7 +362,7 @@ def Initialize_National_Grid_OM_Cost(model):
     Grid_OM_Cost=(Grid_Connection_Specific_Cost * model.Grid_Connection * Grid_Distance)* Grid_Maintenance_Cost
     Grid_Fixed_Cost = pd.DataFrame()
     g_fc = 0
-    for y in year:
+    for y in model.years:
         if y < model.Year_Grid_Connection[None]:
             g_fc += (0)/((1+model.Discount_Rate)**(y))
         else:
@@ -249,4 +372,43 @@ def Initialize_National_Grid_OM_Cost(model):
     grid_fc.index.names = ['Cost item', 'Component', 'Scenario', 'Unit']
     Grid_Fixed_Cost = pd.concat([Grid_Fixed_Cost, grid_fc], axis=1).fillna(0) 
     Grid_Fixed_Cost = Grid_Fixed_Cost.groupby(level=[0], axis=1, sort=False).sum()
-    return Grid_Fixed_Cost.iloc[0]['Total']
\ No newline at end of file
+    return Grid_Fixed_Cost.iloc[0]['Total']
+
+
+#%% Sparse index sets of the hourly grid and lost load variables
+
+def Initialize_Grid_Hours(model):
+    "(s,y,t) hours in which energy can be bought from the national grid"
+    if value(model.Grid_Connection) == 0:
+        return []
+    availability = np.asarray(model.Inputs.Grid_Availability)
+    s, y, t = np.nonzero(availability)
+    keep = (y+1 >= value(model.Year_Grid_Connection)) & np.isin(y+1, list(model.modeled_years))
+    return list(zip((s[keep]+1).tolist(), (y[keep]+1).tolist(), (t[keep]+1).tolist()))
+
+def Initialize_Grid_Export_Hours(model):
+    "(s,y,t) hours in which energy can be sold to the national grid"
+    if value(model.Grid_Connection_Type) == 1:
+        return []
+    if value(model.Grid_Connection_Type) == 2:
+        return list(model.grid_hours)
+    raise ValueError('Grid_Connection_Type must be 1 or 2')
+
+def Initialize_Lost_Load_Years(model):
+    "Years with a Lost_Load variable, none when Lost_Load_Fraction is 0"
+    return list(model.modeled_years) if value(model.Lost_Load_Fraction) > 0 else []
+
+def Grid_Power_Bounds(model,s,y,t):
+    return (0, value(model.Maximum_Grid_Power)*1000)                           # Maximum_Grid_Power in kW, grid energy in Wh
+
+
+#%% Compact formulation: hourly quantities written as expressions
+
+def RES_Energy_Production_Expression(model,s,y,r,t):
+    return model.RES_Unit_Energy_Production[s,r,t]*model.RES_Inverter_Efficiency[r]*model.RES_Units[Schedule(model).Step(y),r]
+
+def FUEL_emission_Expression(model,s,y,g,t):
+    return model.Generator_Energy_Production[s,y,g,t]/model.Fuel_LHV[g]/model.Generator_Efficiency[g]*model.FUEL_unit_CO2_emission[g]
+
+def GRID_emission_Expression(model,s,y,t):
+    return model.Energy_From_Grid[s,y,t]/1e3*model.National_Grid_Specific_CO2_emissions
@@ -0,0 +1,455 @@
+''' Optional matrix backend for the hourly constraint families
+
+With Model_Resolution_Greenfield/Brownfield(..., Matrix_Backend=True) the hourly families listed in Greenfield_Families
+(Brownfield_Families) are not declared as Pyomo constraints. Matrix_Solver, used in place of SolverFactory, assembles them
+directly as sparse COO blocks from numpy index arithmetic, adds the remaining (yearly and scalar) Pyomo constraints and
+the objective through their linear representation, solves the LP with HiGHS (highspy, or scipy's linprog when highspy is
+missing, as in the Python 3.6 environments of mgp_mac.yml and mgp_win.yml) and loads the primal values back into the
+instance. Matrix_Solver(..., Persistent=True) keeps the HiGHS model of the last instance it solved: solving the same
+instance again only updates the costs, the column bounds and the rows of the Pyomo constraints that changed (mutable
+parameters, activated or deactivated constraints), and re-optimizes from the previous basis.
+
+The rules of Constraints_Greenfield/Brownfield.py remain the reference formulation: every family below reproduces one of them.
+Run "python Matrix_LP.py --check [days]" (default 3) to solve the first scenario and days of the shipped Inputs with both
+the Pyomo constraints and the matrix families, greenfield and brownfield, and compare the two objectives (the brownfield
+check counts the existing units as new at the start of the project, since the shipped generator would otherwise have a
+negative salvage value).
+'''
+
+import operator, time, numpy as np
+from pyomo.environ import Var, Constraint, Objective, minimize, value
+try:
+    from pyomo.common.collections import ComponentMap
+except ImportError:
+    from pyomo.core.kernel.component_map import ComponentMap                       # Pyomo 5.5 and 5.6
+from pyomo.repn.standard_repn import generate_standard_repn
+from pyomo.opt import SolverResults, SolverStatus, TerminationCondition
+
+Greenfield_Families = ('EnergyBalance', 'RenewableEnergy', 'StateOfCharge', 'MaximunCharge', 'MinimunCharge', 'MaxBatIn', 'Maxbatout',
+                       'MaximunFuelEnergy', 'FUELemission', 'GRIDemission')
+Brownfield_Families = Greenfield_Families + ('REScapacity',)
+Compact_Families = ('RenewableEnergy', 'FUELemission', 'GRIDemission', 'REScapacity')      # not built for a compact model (Model_Creation(..., Compact=True))
+Aggregated_Families = ('StateOfCharge', 'MaximunCharge', 'MinimunCharge')                # declared as Pyomo constraints for representative periods (Time_Aggregation.py)
+
+
+#%% Columns of the LP
+
+class Columns:
+    "Column of every variable of the instance; integer-indexed variables are also mapped as arrays shaped like their index (-1 where absent)"
+
+    def __init__(self, instance):
+        self.Vars, self.Maps = [], {}
+        for var in instance.component_objects(Var, active=True, descend_into=True):
+            first = len(self.Vars)
+            self.Vars += list(var.values())
+            if var.is_indexed() and len(var) > 0:
+                try:
+                    keys = np.array(list(var.keys()), dtype=int).reshape(len(var), -1) - 1
+                except (TypeError, ValueError):
+                    continue                                                # not indexed by integers, only reachable through Id
+                columns = np.full(tuple(keys.max(axis=0)+1), -1, dtype=np.int64)
+                columns[tuple(keys.T)] = np.arange(first, len(self.Vars))
+                self.Maps[var.local_name] = columns
+        self.Id = {id(v): i for i, v in enumerate(self.Vars)}
+        self.Lower = np.array([v.value if v.fixed else (-np.inf if v.lb is None else v.lb) for v in self.Vars], dtype=float)
+        self.Upper = np.array([v.value if v.fixed else (np.inf if v.ub is None else v.ub) for v in self.Vars], dtype=float)
+
+    def __len__(self):
+        return len(self.Vars)
+
+    def Load(self, x):
+        "Stores the solution x in the variables, clipped to their bounds to drop the solver's round-off"
+        for v, x_v in zip(self.Vars, np.clip(x, self.Lower, self.Upper).tolist()):
+            if not v.fixed:
+                v.value = x_v
+
+
+#%% Rows built from the Pyomo components
+
+def Pyomo_Rows(instance, columns):
+    "Rows of the active Pyomo constraints (the non-hourly ones when the hourly families are built as matrices)"
+    rows, cols, vals, lower, upper = [], [], [], [], []
+    for i, c in enumerate(instance.component_data_objects(Constraint, active=True, descend_into=True)):
+        repn = generate_standard_repn(c.body, compute_values=True)
+        if not repn.is_linear():
+            raise ValueError('Constraint ' + c.name + ' is not linear and cannot be written in the matrix LP')
+        constant = value(repn.constant)
+        lower.append(value(c.lower) - constant if c.has_lb() else -np.inf)
+        upper.append(value(c.upper) - constant if c.has_ub() else np.inf)
+        for v, coef in zip(repn.linear_vars, repn.linear_coefs):
+            rows.append(i)
+            cols.append(columns.Id[id(v)])
+            vals.append(value(coef))
+    return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64), np.array(vals, dtype=float), np.array(lower, dtype=float), np.array(upper, dtype=float)
+
+def Constraint_Rows(instance, columns):
+    "ComponentMap {constraint: (columns, coefficients, lower, upper)} of the active Pyomo constraints, in the order of Pyomo_Rows, with the coefficients of a repeated variable summed"
+    rows = ComponentMap()
+    for c in instance.component_data_objects(Constraint, active=True, descend_into=True):
+        repn = generate_standard_repn(c.body, compute_values=True)
+        if not repn.is_linear():
+            raise ValueError('Constraint ' + c.name + ' is not linear and cannot be written in the matrix LP')
+        constant = value(repn.constant)
+        cols, inverse = np.unique(np.array([columns.Id[id(v)] for v in repn.linear_vars], dtype=np.int64), return_inverse=True)
+        vals = np.bincount(inverse, weights=[value(coef) for coef in repn.linear_coefs], minlength=len(cols)) if len(cols) else np.zeros(0)
+        rows[c] = (cols, vals, value(c.lower) - constant if c.has_lb() else -np.inf, value(c.upper) - constant if c.has_ub() else np.inf)
+    return rows
+
+def Objective_Vector(instance, columns):
+    "Cost vector, constant and sense (1 minimize, -1 maximize) of the single active objective"
+    objectives = list(instance.component_data_objects(Objective, active=True, descend_into=True))
+    if len(objectives) != 1:
+        raise ValueError('The matrix LP needs exactly one active objective, found ' + str(len(objectives)))
+    repn = generate_standard_repn(objectives[0].expr, compute_values=True)
+    if not repn.is_linear():
+        raise ValueError('Objective ' + objectives[0].name + ' is not linear')
+    sense = 1 if objectives[0].sense == minimize else -1
+    cost = np.zeros(len(columns))
+    np.add.at(cost, [columns.Id[id(v)] for v in repn.linear_vars], [sense*value(coef) for coef in repn.linear_coefs])
+    return cost, value(repn.constant), sense
+
+
+#%% Hourly families built from numpy index arithmetic
+
+def Rows(shape, terms, lower, upper):
+    "One row per element of an array of the given shape: sum of coef*column over the (columns, coefs) terms, between lower and upper (all broadcast to shape)"
+    n = int(np.prod(shape))
+    index = np.arange(n, dtype=np.int64)
+    rows, cols, vals = [], [], []
+    for columns, coefs in terms:
+        columns = np.broadcast_to(columns, shape).ravel()
+        coefs = np.broadcast_to(np.asarray(coefs, dtype=float), shape).ravel()
+        keep = coefs != 0
+        if (columns[keep] < 0).any():
+            raise ValueError('Matrix LP term refers to a variable that is not in the instance')
+        rows.append(index[keep])
+        cols.append(columns[keep])
+        vals.append(coefs[keep])
+    lower = np.broadcast_to(np.asarray(lower, dtype=float), shape).ravel()
+    upper = np.broadcast_to(np.asarray(upper, dtype=float), shape).ravel()
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(vals), lower, upper
+
+class Hourly_Data:
+    "Time series, scalar parameters and column maps shared by the hourly families"
+
+    def __init__(self, instance, columns):
+        m = instance
+        self.Years        = np.array(sorted(m.modeled_years), dtype=np.int64) - 1             # 0-based modeled years (all of them unless Representative_Years)
+        self.Demand       = np.asarray(m.Inputs.Energy_Demand, dtype=float)[:,self.Years]    # (s,y,t)
+        self.RES_Unit     = np.asarray(m.Inputs.RES_Unit_Energy, dtype=float)                # (s,r,t)
+        self.Shape = self.Demand.shape
+        step = {y: ut for (y, ut) in m.modeled_years_steps}
+        self.Step = np.array([step[y+1] - 1 for y in self.Years], dtype=np.int64)            # 0-based investment step of each modeled year
+        self.Map = {name: self.Modeled_Years(columns, len(m.years)) if columns.ndim >= 3 else columns
+                    for name, columns in columns.Maps.items()}
+        self.Instance = m
+
+    def Modeled_Years(self, columns, n_years):
+        "Columns of an (s,y,...) variable at the modeled years only, -1 where it is not declared"
+        padded = np.full((columns.shape[0], n_years) + columns.shape[2:], -1, dtype=np.int64)
+        padded[:, :columns.shape[1]] = columns
+        return padded[:, self.Years]
+
+    def Vector(self, param, index_set):
+        return np.array([value(param[i]) for i in index_set], dtype=float)
+
+    def Step_Columns(self, name):
+        "Columns of a step-indexed variable taken at the step of each modeled year, shaped (1, years, ..., 1) to broadcast over (s, y, ..., t)"
+        columns = self.Map[name][self.Step]
+        return columns.reshape((1,) + columns.shape + (1,))
+
+    def Sparse_Columns(self, name):
+        "Columns of an hourly (s,y,t) variable declared over a sparse set (grid hours, lost load years), -1 where it is not declared"
+        columns = np.full(self.Shape, -1, dtype=np.int64)
+        if name in self.Map:
+            declared = self.Map[name]
+            columns[tuple(slice(0, n) for n in declared.shape)] = declared
+        return columns
+
+def RES_Production_Terms(d):
+    "Terms of RES_Energy_Production[s,y,r,t] for each r: its column, or in a compact model RES_Unit_Energy_Production*RES_Inverter_Efficiency times the RES_Units of the step"
+    m = d.Instance
+    if not m.Compact:
+        RES = d.Map['RES_Energy_Production']
+        return [(RES[:,:,r,:], 1) for r in range(RES.shape[2])]
+    units = d.Step_Columns('RES_Units')
+    efficiency = d.Vector(m.RES_Inverter_Efficiency, m.renewable_sources)
+    return [(units[:,:,r,:], d.RES_Unit[:,None,r,:]*efficiency[r]) for r in range(len(efficiency))]
+
+def Energy_Balance(d):
+    GEN = d.Map['Generator_Energy_Production']
+    FROM, TO, LOST = d.Sparse_Columns('Energy_From_Grid'), d.Sparse_Columns('Energy_To_Grid'), d.Sparse_Columns('Lost_Load')
+    terms = (RES_Production_Terms(d) + [(GEN[:,:,g,:], 1) for g in range(GEN.shape[2])] +
+             [(FROM, FROM >= 0), (TO, np.where(TO >= 0, -1, 0)),
+              (d.Map['Battery_Outflow'], 1), (d.Map['Battery_Inflow'], -1), (LOST, LOST >= 0), (d.Map['Energy_Curtailment'], -1)])
+    return Rows(d.Shape, terms, d.Demand, d.Demand)
+
+def Renewable_Energy(d):
+    m = d.Instance
+    RES = d.Map['RES_Energy_Production']
+    efficiency = d.Vector(m.RES_Inverter_Efficiency, m.renewable_sources)
+    production = d.RES_Unit[:,None,:,:]*efficiency[None,None,:,None]                          # (s,1,r,t)
+    return Rows(RES.shape, [(RES, 1), (d.Step_Columns('RES_Units'), -production)], 0, 0)
+
+def RES_Capacity(d):
+    m = d.Instance
+    RES = d.Map['RES_Energy_Production']
+    efficiency = d.Vector(m.RES_Inverter_Efficiency, m.renewable_sources)
+    existing = d.Vector(m.RES_units, m.renewable_sources)
+    return Rows(RES.shape, [(RES, 1)], d.RES_Unit[:,None,:,:]*(efficiency*existing)[None,None,:,None], np.inf)
+
+def State_Of_Charge(d):
+    m = d.Instance
+    SOC = d.Map['Battery_SOC']
+    previous = np.empty_like(SOC)                                                               # SOC of the previous hour, across years
+    previous[:,:,1:] = SOC[:,:,:-1]
+    previous[:,1:,0] = SOC[:,:-1,-1]
+    previous[:,0,0] = -1
+    previous_coef = np.full(d.Shape, -1.0)
+    previous_coef[:,0,0] = 0
+    initial_coef = np.zeros(d.Shape)                                                            # first hour starts from the initial SOC
+    initial_coef[:,0,0] = -value(m.Battery_Initial_SOC)
+    return Rows(d.Shape, [(SOC, 1), (previous, previous_coef), (d.Step_Columns('Battery_Nominal_Capacity'), initial_coef),
+                          (d.Map['Battery_Outflow'], 1/value(m.Battery_Discharge_Battery_Efficiency)),
+                          (d.Map['Battery_Inflow'], -value(m.Battery_Charge_Battery_Efficiency))], 0, 0)
+
+def Maximun_Charge(d):
+    return Rows(d.Shape, [(d.Map['Battery_SOC'], 1), (d.Step_Columns('Battery_Nominal_Capacity'), -1)], -np.inf, 0)
+
+def Minimun_Charge(d):
+    DoD = value(d.Instance.Battery_Depth_of_Discharge)
+    return Rows(d.Shape, [(d.Map['Battery_SOC'], 1), (d.Step_Columns('Battery_Nominal_Capacity'), -DoD)], 0, np.inf)
+
+def Max_Bat_In(d):
+    Delta_Time = value(d.Instance.Delta_Time)
+    return Rows(d.Shape, [(d.Map['Battery_Inflow'], 1), (d.Step_Columns('Battery_Maximum_Charge_Power'), -Delta_Time)], -np.inf, 0)
+
+def Max_Bat_Out(d):
+    Delta_Time = value(d.Instance.Delta_Time)
+    return Rows(d.Shape, [(d.Map['Battery_Outflow'], 1), (d.Step_Columns('Battery_Maximum_Discharge_Power'), -Delta_Time)], -np.inf, 0)
+
+def Maximun_Fuel_Energy(d):
+    GEN = d.Map['Generator_Energy_Production']
+    return Rows(GEN.shape, [(GEN, 1), (d.Step_Columns('Generator_Nominal_Capacity'), -value(d.Instance.Delta_Time))], -np.inf, 0)
+
+def FUEL_Emission(d):
+    m = d.Instance
+    GEN = d.Map['Generator_Energy_Production']
+    factor = (1/d.Vector(m.Fuel_LHV, m.generator_types)/d.Vector(m.Generator_Efficiency, m.generator_types)*
+              d.Vector(m.FUEL_unit_CO2_emission, m.generator_types))
+    return Rows(GEN.shape, [(d.Map['FUEL_emission'], 1), (GEN, -factor[None,None,:,None])], 0, 0)
+
+def GRID_Emission(d):
+    factor = value(d.Instance.National_Grid_Specific_CO2_emissions)/1e3
+    FROM = d.Sparse_Columns('Energy_From_Grid')
+    declared = FROM >= 0                                                                        # one row per grid hour
+    return Rows((int(declared.sum()),), [(d.Sparse_Columns('GRID_emission')[declared], 1), (FROM[declared], -factor)], 0, 0)
+
+Family_Rules = {'EnergyBalance': Energy_Balance, 'RenewableEnergy': Renewable_Energy, 'REScapacity': RES_Capacity,
+                'StateOfCharge': State_Of_Charge, 'MaximunCharge': Maximun_Charge, 'MinimunCharge': Minimun_Charge,
+                'MaxBatIn': Max_Bat_In, 'Maxbatout': Max_Bat_Out, 'MaximunFuelEnergy': Maximun_Fuel_Energy,
+                'FUELemission': FUEL_Emission, 'GRIDemission': GRID_Emission}
+
+
+#%% Assembly and solution
+
+def Matrix_LP(instance, Families=Greenfield_Families):
+    "Columns, cost vector, objective constant and sense, and COO constraint rows (rows, cols, vals, lower, upper) of the whole LP"
+    if instance.Compact:
+        Families = [name for name in Families if name not in Compact_Families]
+    if instance.Inputs.Aggregation is not None:
+        Families = [name for name in Families if name not in Aggregated_Families]
+    declared = [name for name in Families if instance.component(name) is not None]
+    if declared:
+        raise ValueError('Families built as matrices are also declared as Pyomo constraints: ' + ', '.join(declared))
+    columns = Columns(instance)
+    cost, constant, sense = Objective_Vector(instance, columns)
+    data = Hourly_Data(instance, columns)
+    blocks = [Pyomo_Rows(instance, columns)] + [Family_Rules[name](data) for name in Families]
+    offsets = np.cumsum([0] + [len(b[3]) for b in blocks])
+    rows = np.concatenate([b[0] + offset for b, offset in zip(blocks, offsets)])
+    return columns, cost, constant, sense, (rows,) + tuple(np.concatenate([b[i] for b in blocks]) for i in range(1, 5))
+
+def CSC(rows, cols, vals, n_rows, n_cols):
+    "Column-wise compressed form of a COO matrix, summing duplicated entries"
+    key = cols*n_rows + rows
+    order = np.argsort(key, kind='stable')
+    key, vals = key[order], vals[order]
+    unique, first = np.unique(key, return_index=True)
+    start = np.searchsorted(unique//n_rows, np.arange(n_cols+1))
+    return start, unique % n_rows, np.add.reduceat(vals, first) if len(vals) else vals
+
+def HiGHS_Model(cost, col_lower, col_upper, matrix, options, tee):
+    "highspy.Highs holding the LP"
+    import highspy
+    rows, cols, vals, row_lower, row_upper = matrix
+    lp = highspy.HighsLp()
+    lp.num_col_, lp.num_row_ = len(cost), len(row_lower)
+    lp.col_cost_, lp.col_lower_, lp.col_upper_ = cost, col_lower, col_upper
+    lp.row_lower_, lp.row_upper_ = row_lower, row_upper
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.start_, lp.a_matrix_.index_, lp.a_matrix_.value_ = CSC(rows, cols, vals, len(row_lower), len(cost))
+    highs = highspy.Highs()
+    highs.setOptionValue('output_flag', bool(tee))
+    for name, option in options.items():
+        highs.setOptionValue(name, option)
+    highs.passModel(lp)
+    return highs
+
+def Run_HiGHS(highs):
+    import highspy
+    highs.run()
+    status = highs.getModelStatus()
+    return status == highspy.HighsModelStatus.kOptimal, highs.modelStatusToString(status), np.array(highs.getSolution().col_value)
+
+def Solve_HiGHS(cost, col_lower, col_upper, matrix, options, tee):
+    return Run_HiGHS(HiGHS_Model(cost, col_lower, col_upper, matrix, options, tee))
+
+Scipy_Methods = {'ipm': ('highs-ipm',), 'simplex': ('highs-ds', 'highs-simplex')}         # linprog methods of the HiGHS solver option
+Scipy_Options = ('time_limit', 'presolve', 'primal_feasibility_tolerance', 'dual_feasibility_tolerance', 'ipm_optimality_tolerance')
+
+def Solve_Scipy(cost, col_lower, col_upper, matrix, options, tee):
+    from scipy.optimize import linprog
+    from scipy.sparse import coo_matrix, vstack
+    rows, cols, vals, row_lower, row_upper = matrix
+    A = coo_matrix((vals, (rows, cols)), shape=(len(row_lower), len(cost))).tocsr()
+    equal = row_lower == row_upper
+    below = ~equal & np.isfinite(row_upper)
+    above = ~equal & np.isfinite(row_lower)
+    methods = Scipy_Methods.get(options.get('solver'), ('highs', 'highs-simplex'))
+    options = {name: option for name, option in options.items() if name in Scipy_Options}
+    for method in methods:                                                                  # the names of scipy 1.6 and later first, then of 1.5 (Python 3.6)
+        try:
+            result = linprog(cost, A_ub=vstack([A[below], -A[above]]), b_ub=np.concatenate([row_upper[below], -row_lower[above]]),
+                             A_eq=A[equal], b_eq=row_lower[equal], bounds=np.column_stack([col_lower, col_upper]),
+                             method=method, options=dict(options, disp=bool(tee)))
+            break
+        except ValueError:
+            if method == methods[-1]:
+                raise
+    return result.status == 0, result.message, result.x if result.x is not None else np.full(len(cost), np.nan)
+
+class Matrix_Solver:
+    "Used in place of SolverFactory(...) by Model_Resolution_*: solve(instance) builds the matrix LP, solves it and loads the solution into the instance"
+
+    def __init__(self, Families=Greenfield_Families, Options=None, Persistent=False):
+        self.Families   = Families
+        self.Options    = dict(Options or {})           # HiGHS options, e.g. {'threads': 4, 'solver': 'ipm'}
+        self.Persistent = Persistent                    # keep the HiGHS model of the last instance to re-optimize it
+        self.Model      = None                          # (instance, columns, highspy.Highs, {constraint: (row, columns, coefficients)}) of the last solve when Persistent
+
+    def set_options(self, *args, **kwargs):
+        pass                                            # the Gurobi option strings of Model_Resolution_* do not apply to HiGHS
+
+    def Update(self, instance, tee):
+        "Brings the HiGHS model of the last solve up to date with instance, or returns None when its columns changed"
+        start = time.time()
+        columns, highs, rows = self.Model[1:]
+        current = Columns(instance)
+        if len(current) != len(columns) or not all(map(operator.is_, current.Vars, columns.Vars)):
+            return None
+        cost, constant, sense = Objective_Vector(instance, current)
+        every = np.arange(len(current), dtype=np.int32)
+        highs.changeColsCost(len(every), every, cost)
+        highs.changeColsBounds(len(every), every, current.Lower, current.Upper)
+        bounds, added = {}, []
+        for c, (cols, vals, lower, upper) in Constraint_Rows(instance, current).items():
+            if c not in rows:
+                added.append((c, cols, vals, lower, upper))
+                continue
+            row, old_cols, old_vals = rows[c]
+            if not (np.array_equal(cols, old_cols) and np.array_equal(vals, old_vals)):
+                changed = dict(zip(old_cols.tolist(), [0.0]*len(old_cols)))
+                changed.update(zip(cols.tolist(), vals.tolist()))
+                for col, val in changed.items():
+                    highs.changeCoeff(row, col, val)
+                rows[c] = (row, cols, vals)
+            bounds[row] = (lower, upper)
+        for c, (row, cols, vals) in rows.items():
+            bounds.setdefault(row, (-np.inf, np.inf))                                   # deactivated: kept as a free row
+        if bounds:
+            index = np.array(list(bounds), dtype=np.int32)
+            highs.changeRowsBounds(len(index), index, np.array([b[0] for b in bounds.values()]), np.array([b[1] for b in bounds.values()]))
+        if added:
+            first = highs.getNumRow()
+            starts = np.cumsum([0] + [len(a[1]) for a in added[:-1]]).astype(np.int32)
+            highs.addRows(len(added), np.array([a[3] for a in added]), np.array([a[4] for a in added]), int(sum(len(a[1]) for a in added)),
+                          starts, np.concatenate([a[1] for a in added]).astype(np.int32), np.concatenate([a[2] for a in added]))
+            for row, (c, cols, vals, lower, upper) in enumerate(added, first):
+                rows[c] = (row, cols, vals)
+        if tee:
+            print('Matrix LP: costs, bounds and ' + str(len(bounds)) + ' Pyomo rows updated, ' + str(len(added)) + ' rows added in ' +
+                  str(round(time.time()-start, 1)) + ' s, re-optimizing from the previous basis')
+        highs.setOptionValue('output_flag', bool(tee))
+        return (current, cost, constant, sense) + Run_HiGHS(highs)
+
+    def solve(self, instance, tee=False):
+        start = time.time()
+        update = self.Update(instance, tee) if self.Persistent and self.Model is not None and self.Model[0] is instance else None
+        if update is not None:
+            columns, cost, constant, sense, optimal, message, x = update
+        else:
+            columns, cost, constant, sense, matrix = Matrix_LP(instance, self.Families)
+            if tee:
+                print('Matrix LP: ' + str(len(cost)) + ' columns, ' + str(len(matrix[3])) + ' rows, ' + str(len(matrix[2])) +
+                      ' nonzeros built in ' + str(round(time.time()-start, 1)) + ' s')
+            try:
+                highs = HiGHS_Model(cost, columns.Lower, columns.Upper, matrix, self.Options, tee)
+                if self.Persistent:
+                    self.Model = (instance, columns, highs, ComponentMap((c, (row, cols, vals)) for row, (c, (cols, vals, lower, upper))
+                                                                         in enumerate(Constraint_Rows(instance, columns).items())))
+                optimal, message, x = Run_HiGHS(highs)
+            except ImportError:
+                optimal, message, x = Solve_Scipy(cost, columns.Lower, columns.Upper, matrix, self.Options, tee)
+        results = SolverResults()
+        results.solver.status = SolverStatus.ok if optimal else SolverStatus.warning
+        results.solver.termination_condition = TerminationCondition.optimal if optimal else TerminationCondition.other
+        results.solver.message = str(message)
+        if optimal:
+            columns.Load(x)
+            results.problem.lower_bound = results.problem.upper_bound = sense*float(cost @ x) + constant
+        return results
+
+
+#%% Regression check against the Pyomo formulation
+
+def Check_Backend(Inputs=None, Days=3, Brownfield=False, Solver=None, Tolerance=1e-6):
+    "Objectives of the first scenario and Days days of Inputs solved with the Pyomo constraints and with Matrix_Solver; raises AssertionError when they differ by more than Tolerance (relative)"
+    from pyomo.environ import AbstractModel
+    from Initialize import InputBundle
+    from Model_Creation import Model_Creation
+    from Solvers import Solver_Config
+    if Brownfield:
+        from Model_Resolution_Brownfield import Model_Resolution_Brownfield as Model_Resolution
+    else:
+        from Model_Resolution_Greenfield import Model_Resolution_Greenfield as Model_Resolution
+    Full = Inputs if Inputs is not None else InputBundle()
+    hours = 24*Days
+    Model_Data = Full.Model_Data.copy()
+    Model_Data.update({'Scenarios': 1, 'Scenario_Weight': {1: 1}, 'Periods': hours})
+    if Brownfield:                                                                          # existing units older than the project end have a negative salvage value,
+        Model_Data.update({name: {k: 0 for k in Model_Data[name]} for name in ('RES_years', 'GEN_years')})   # infeasible with Salvage_Value >= 0
+    Time_Series = {name: np.asarray(getattr(Full, name))[:1,:,:hours] for name in ('Energy_Demand', 'RES_Unit_Energy', 'Grid_Availability')}
+    Solver = Solver or Solver_Config('highs', 'simplex')                                   # the same HiGHS simplex on both sides
+    objectives = []
+    for Matrix_Backend in (False, True):
+        model = AbstractModel()
+        Model_Creation(model, 0, 0, InputBundle(Full.Data_Path, Full.Refresh_Cache, Model_Data, Time_Series))
+        instance = Model_Resolution(model, 'NPC', 'no', 0, 0, 0, Matrix_Backend=Matrix_Backend, Solver=Solver)
+        objectives.append(value(instance.ObjectiveFuntion))
+    pyomo, matrix = objectives
+    difference = abs(matrix - pyomo)/max(abs(pyomo), 1)
+    print(('Brownfield' if Brownfield else 'Greenfield') + ' objective: Pyomo constraints ' + str(pyomo) + ', matrix backend ' + str(matrix) +
+          ' (relative difference ' + str(difference) + ')')
+    assert difference <= Tolerance, 'The matrix backend does not reproduce the Pyomo formulation'
+    return pyomo, matrix
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == '--check':
+        days = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+        for Brownfield in (False, True):
+            Check_Backend(Days=days, Brownfield=Brownfield)
+    else:
+        print(__doc__)
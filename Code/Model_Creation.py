@@ -16,11 +16,33 @@ Based on the original model by:
 """
 
 
-from pyomo.environ import Param, RangeSet, NonNegativeReals, Var, Set, Reals 
+from pyomo.environ import Param, RangeSet, NonNegativeReals, NonPositiveReals, Var, Set, Reals, Expression, value
 from Initialize import * # Import library with initialitation funtions for the parameters
 
 
-def Model_Creation(model, Renewable_Penetration,Battery_Independence):
+Sensitive_Parameters = ('RES_Specific_Investment_Cost', 'RES_Specific_OM_Cost', 'Battery_Specific_Investment_Cost',
+                        'Battery_Specific_Electronic_Investment_Cost', 'Battery_Specific_OM_Cost', 'Generator_Specific_Investment_Cost',
+                        'Generator_Specific_OM_Cost', 'Fuel_Specific_Cost', 'Grid_Sold_El_Price', 'Grid_Purchased_El_Price',
+                        'Lost_Load_Specific_Cost')                                  # parameters that may be mutable
+Derived_Parameters = {'Unitary_Battery_Replacement_Cost': (Initialize_Battery_Unit_Repl_Cost,
+                                                           ('Battery_Specific_Investment_Cost', 'Battery_Specific_Electronic_Investment_Cost')),
+                      'Generator_Marginal_Cost': (Initialize_Generator_Marginal_Cost, ('Fuel_Specific_Cost',))}   # {parameter: (rule, sources)}
+
+
+def Model_Creation(model, Renewable_Penetration,Battery_Independence, Inputs=None, Compact=False, Representative_Years=None, Mutable=()):
+
+    unknown = [name for name in Mutable if name not in Sensitive_Parameters]
+    if unknown:
+        raise ValueError('Only ' + ', '.join(Sensitive_Parameters) + ' can be mutable, not ' + ', '.join(unknown))
+    Mutable = tuple(Mutable) + tuple(name for name, (rule, sources) in Derived_Parameters.items() if set(sources) & set(Mutable))
+    model.Mutable = Mutable                                                         # parameters changed by Set_Parameters
+
+    if Inputs is None:
+        Inputs = InputBundle()                                                      # Inputs/Model_data.dat and the Inputs/*.xlsx time series
+    model.Inputs = Inputs
+    model.Compact = Compact                                                         # hourly expressions instead of variables
+    Aggregation = Inputs.Aggregation                                                # representative periods, None for the full year
+    model.Representative_Years = Representative_Years                               # None models every year
 
 #%% PARAMETERS  
 
@@ -52,8 +74,25 @@ def Model_Creation(model, Renewable_Penetration,Battery_Independence):
     model.steps = RangeSet(1, model.Steps_Number)                                   # Creation of a set from 1 to the number of investment decision steps
     model.years_steps = Set(dimen = 2, initialize=Initialize_YearUpgrade_Tuples)    # 2D set of tuples: it associates each year to the corresponding investment decision step
     model.years_grid_connection = RangeSet(model.Year_Grid_Connection,model.Years)  # Creation of a set from year of grid connection to last year
+    model.modeled_years = Set(within=model.years, 
+                              initialize=Initialize_Modeled_Years)                  # Years with hourly variables
+    model.modeled_years_steps = Set(dimen = 2, 
+                                    initialize=Initialize_Modeled_Years_Steps)      # (year, step) tuples of the modeled years
+    model.Year_Weight_Act = Param(model.modeled_years, 
+                                  initialize=Initialize_Year_Weight_Act)            # Actualized number of years each modeled year stands for
+    model.Year_Weight_NonAct = Param(model.modeled_years, 
+                                     initialize=Initialize_Year_Weight_NonAct)      # Number of years each modeled year stands for
+    model.Year_Energy_Weight_Act = Param(model.modeled_years, 
+                                         initialize=Initialize_Year_Energy_Weight_Act)      # Same, scaled by the demand of each year
+    model.Year_Energy_Weight_NonAct = Param(model.modeled_years, 
+                                            initialize=Initialize_Year_Energy_Weight_NonAct)
     model.Scenario_Weight = Param(model.scenarios, 
                                   within=NonNegativeReals) 
+    model.Period_Weight = Param(model.periods, 
+                                initialize=Initialize_Period_Weight)                # Number of hours of the year each period stands for
+    if Aggregation is not None:
+        model.representative_periods = RangeSet(1, len(Aggregation.Medoids))        # Creation of a set from 1 to the number of representative periods
+        model.chronological_periods  = RangeSet(1, len(Aggregation.Sequence))       # Creation of a set from 1 to the number of periods of a year
     
     "Parameters of RES" 
     model.RES_Names                    = Param(model.renewable_sources)               # RES names
@@ -61,9 +100,11 @@ def Model_Creation(model, Renewable_Penetration,Battery_Independence):
                                                within=NonNegativeReals)               # Nominal capacity of the RES in W/unit
     model.RES_Inverter_Efficiency      = Param(model.renewable_sources)               # Efficiency of the inverter in %
     model.RES_Specific_Investment_Cost = Param(model.renewable_sources,
-                                               within=NonNegativeReals)               # Cost of RES in USD/W
+                                               within=NonNegativeReals,
+                                               mutable='RES_Specific_Investment_Cost' in Mutable)   # Cost of RES in USD/W
     model.RES_Specific_OM_Cost         = Param(model.renewable_sources,
-                                               within=NonNegativeReals)               # Percentage of the total investment spend in operation and management of solar panels in each period in %                                             
+                                               within=NonNegativeReals,
+                                               mutable='RES_Specific_OM_Cost' in Mutable)   # Percentage of the total investment spend in operation and management of solar panels in each period in %
     model.RES_Lifetime                 = Param(model.renewable_sources,
                                                within=NonNegativeReals)
     model.RES_units                    = Param(model.renewable_sources,
@@ -75,15 +116,17 @@ def Model_Creation(model, Renewable_Penetration,Battery_Independence):
     model.RES_Unit_Energy_Production   = Param(model.scenarios,
                                               model.renewable_sources,
                                               model.periods, 
-                                              within=NonNegativeReals, 
                                               initialize=Initialize_RES_Energy)      # Energy production of a RES in Wh
     if Renewable_Penetration > 0:
         model.Renewable_Penetration = Renewable_Penetration
     
     "Parameters of the battery bank"
-    model.Battery_Specific_Investment_Cost = Param(within=NonNegativeReals)                                     # Specific investment cost of the battery bank [USD/Wh]
-    model.Battery_Specific_Electronic_Investment_Cost = Param(within=NonNegativeReals)   # Specific investment cost of non-replaceable parts (electronics) of the battery bank [USD/Wh]
-    model.Battery_Specific_OM_Cost = Param(within=NonNegativeReals)                      # Percentage of the total investment spend in operation and management of batteries in each period in %
+    model.Battery_Specific_Investment_Cost = Param(within=NonNegativeReals,
+                                                   mutable='Battery_Specific_Investment_Cost' in Mutable)   # Specific investment cost of the battery bank [USD/Wh]
+    model.Battery_Specific_Electronic_Investment_Cost = Param(within=NonNegativeReals,
+                                                              mutable='Battery_Specific_Electronic_Investment_Cost' in Mutable)   # Specific investment cost of non-replaceable parts (electronics) of the battery bank [USD/Wh]
+    model.Battery_Specific_OM_Cost = Param(within=NonNegativeReals,
+                                           mutable='Battery_Specific_OM_Cost' in Mutable)   # Percentage of the total investment spend in operation and management of batteries in each period in %
     model.Battery_Discharge_Battery_Efficiency = Param(within=NonNegativeReals)                                 # Efficiency of the discharge of the battery in %
     model.Battery_Charge_Battery_Efficiency    = Param(within=NonNegativeReals)                                 # Efficiency of the charge of the battery in  %
     model.Battery_Depth_of_Discharge       = Param()                                     # Depth of discharge of the battery (Depth_of_Discharge) in %
@@ -91,7 +134,8 @@ def Model_Creation(model, Renewable_Penetration,Battery_Independence):
     model.Maximum_Battery_Charge_Time      = Param(within=NonNegativeReals)              # Maximum time of discharge of the battery in hours                     
     model.Battery_Cycles                   = Param(within=NonNegativeReals)
     model.Unitary_Battery_Replacement_Cost = Param(within=NonNegativeReals, 
-                                                   initialize=Initialize_Battery_Unit_Repl_Cost)
+                                                   initialize=Initialize_Battery_Unit_Repl_Cost,
+                                                   mutable='Unitary_Battery_Replacement_Cost' in Mutable)
     model.Battery_Initial_SOC = Param(within=NonNegativeReals)
     model.Battery_capacity    = Param(within=NonNegativeReals)
     model.BESS_unit_CO2_emission = Param(within=NonNegativeReals)
@@ -105,9 +149,11 @@ def Model_Creation(model, Renewable_Penetration,Battery_Independence):
     model.Generator_Efficiency        = Param(model.generator_types,
                                               within=NonNegativeReals)              # Generator efficiency to trasform heat into electricity %
     model.Generator_Specific_Investment_Cost = Param(model.generator_types,
-                                                     within=NonNegativeReals)       # Cost of the diesel generator
+                                                     within=NonNegativeReals,
+                                                     mutable='Generator_Specific_Investment_Cost' in Mutable)   # Cost of the diesel generator
     model.Generator_Specific_OM_Cost  = Param(model.generator_types,
-                                              within=NonNegativeReals)              # Cost of the diesel generator
+                                              within=NonNegativeReals,
+                                              mutable='Generator_Specific_OM_Cost' in Mutable)   # Cost of the diesel generator
     model.Generator_Lifetime          = Param(model.generator_types,
                                               within=NonNegativeReals)    
     model.Fuel_Names                  = Param(model.generator_types)                # Fuel names
@@ -122,14 +168,18 @@ def Model_Creation(model, Renewable_Penetration,Battery_Independence):
     model.FUEL_unit_CO2_emission      = Param(model.generator_types,
                                               within=NonNegativeReals)
     model.Fuel_Specific_Cost          = Param(model.generator_types, 
-                                              within=NonNegativeReals)
+                                              within=NonNegativeReals,
+                                              mutable='Fuel_Specific_Cost' in Mutable)
     model.Generator_Marginal_Cost     = Param(model.scenarios, 
                                               model.years, 
                                               model.generator_types,
-                                              initialize=Initialize_Generator_Marginal_Cost)   
+                                              initialize=Initialize_Generator_Marginal_Cost,
+                                              mutable='Generator_Marginal_Cost' in Mutable)   
     "Parameters of the National Grid" ####
-    model.Grid_Sold_El_Price           = Param(within=NonNegativeReals)
-    model.Grid_Purchased_El_Price      = Param(within=NonNegativeReals)
+    model.Grid_Sold_El_Price           = Param(within=NonNegativeReals,
+                                               mutable='Grid_Sold_El_Price' in Mutable)
+    model.Grid_Purchased_El_Price      = Param(within=NonNegativeReals,
+                                               mutable='Grid_Purchased_El_Price' in Mutable)
     model.Grid_Lifetime                = Param(within=NonNegativeReals)
     model.Grid_Distance                = Param(within=NonNegativeReals)
     model.Grid_Connection_Cost         = Param(within=NonNegativeReals)
@@ -153,7 +203,14 @@ def Model_Creation(model, Renewable_Penetration,Battery_Independence):
                                           model.periods, 
                                           initialize=Initialize_Demand)             # Energy Energy_Demand in W 
     model.Lost_Load_Fraction      = Param(within=NonNegativeReals)                  # Lost load maxiumum admittable fraction in %
-    model.Lost_Load_Specific_Cost = Param(within=NonNegativeReals)                  # Value of lost load in USD/Wh 
+    model.Lost_Load_Specific_Cost = Param(within=NonNegativeReals,
+                                          mutable='Lost_Load_Specific_Cost' in Mutable)   # Value of lost load in USD/Wh
+
+    "Sparse sets"
+    model.grid_hours        = Set(dimen=3, initialize=Initialize_Grid_Hours)        # (s,y,t) hours with exchange of energy with the national grid
+    model.grid_export_hours = Set(dimen=3, initialize=Initialize_Grid_Export_Hours) # (s,y,t) hours in which energy can be sold to the national grid
+    model.lost_load_years   = Set(within=model.years, 
+                                  initialize=Initialize_Lost_Load_Years)            # years with lost load, empty when Lost_Load_Fraction is 0
 
     "Parameters of the plot"
     model.RES_Colors        = Param(model.renewable_sources)                        # HEX color codes for RES
@@ -170,29 +227,49 @@ def Model_Creation(model, Renewable_Penetration,Battery_Independence):
     model.RES_Units             = Var(model.steps, 
                                       model.renewable_sources,
                                       within=NonNegativeReals)                      # Number of units of RES
-    model.RES_Energy_Production = Var(model.scenarios, 
-                                      model.years,
-                                      model.renewable_sources,
-                                      model.periods,
-                                      within=NonNegativeReals)                      # Energy generated by the RES sistem in Wh
+    if Compact:
+        model.RES_Energy_Production = Expression(model.scenarios, 
+                                                 model.modeled_years,
+                                                 model.renewable_sources,
+                                                 model.periods,
+                                                 rule=RES_Energy_Production_Expression)
+    else:
+        model.RES_Energy_Production = Var(model.scenarios, 
+                                          model.modeled_years,
+                                          model.renewable_sources,
+                                          model.periods,
+                                          within=NonNegativeReals)                  # Energy generated by the RES sistem in Wh
     model.RES_emission          = Var(within=NonNegativeReals)
 
     "Variables associated to the battery bank"
     model.Battery_Nominal_Capacity        = Var(model.steps, 
                                                 within=NonNegativeReals)            # Capacity of the battery bank in Wh
     model.Battery_Outflow                 = Var(model.scenarios, 
-                                                model.years, 
+                                                model.modeled_years, 
                                                 model.periods,
                                                 within=NonNegativeReals)            # Battery discharge energy in Wh
     model.Battery_Inflow                  = Var(model.scenarios,
-                                                model.years, 
+                                                model.modeled_years, 
                                                 model.periods, 
                                                 within=NonNegativeReals)            # Battery charge energy in Wh
     
     model.Battery_SOC                     = Var(model.scenarios, 
-                                                model.years, 
+                                                model.modeled_years, 
                                                 model.periods, 
-                                                within=NonNegativeReals)            # State of Charge of the Battery in Wh
+                                                within=NonNegativeReals if Aggregation is None else Reals)  # State of Charge of the Battery in Wh
+    if Aggregation is not None:
+        model.Battery_SOC_Start           = Var(model.scenarios,
+                                                model.modeled_years,
+                                                model.chronological_periods,
+                                                within=NonNegativeReals)            # State of Charge at the start of each period of the year in Wh
+        model.Battery_SOC_Intra_Max       = Var(model.scenarios,
+                                                model.modeled_years,
+                                                model.representative_periods,
+                                                within=NonNegativeReals)            # Highest Battery_SOC within each representative period
+        model.Battery_SOC_Intra_Min       = Var(model.scenarios,
+                                                model.modeled_years,
+                                                model.representative_periods,
+                                                within=NonPositiveReals)            # Lowest Battery_SOC within each representative period
     model.Battery_Maximum_Charge_Power    = Var(model.steps, 
                                                 within=NonNegativeReals)
     model.Battery_Maximum_Discharge_Power = Var(model.steps,
@@ -201,6 +278,9 @@ def Model_Creation(model, Renewable_Penetration,Battery_Independence):
                                                 within=NonNegativeReals)
     model.Battery_Replacement_Cost_NonAct = Var(model.scenarios,
                                                 within=NonNegativeReals)
+    model.Battery_Yearly_Flow             = Var(model.scenarios,
+                                                model.modeled_years,
+                                                within=NonNegativeReals)            # Energy charged plus discharged in a year
     model.BESS_emission                   = Var(within=NonNegativeReals)
 
     "Variables associated to the diesel generator"
@@ -208,10 +288,14 @@ def Model_Creation(model, Renewable_Penetration,Battery_Independence):
                                             model.generator_types,
                                             within=NonNegativeReals)                # Capacity  of the diesel generator in Wh
     model.Generator_Energy_Production = Var(model.scenarios, 
-                                            model.years,
+                                            model.modeled_years,
                                             model.generator_types,
                                             model.periods, 
                                             within=NonNegativeReals)                # Energy generated by the Diesel generator
+    model.Generator_Yearly_Energy     = Var(model.scenarios,
+                                            model.modeled_years,
+                                            model.generator_types,
+                                            within=NonNegativeReals)                # Energy generated in a year
     model.Total_Fuel_Cost_Act         = Var(model.scenarios,
                                             model.generator_types,
                                             within=NonNegativeReals)
@@ -219,8 +303,15 @@ def Model_Creation(model, Renewable_Penetration,Battery_Independence):
                                             model.generator_types,
                                             within=NonNegativeReals)
     model.GEN_emission                = Var(within=NonNegativeReals)
-    model.FUEL_emission               = Var(model.scenarios, 
-                                            model.years,
+    if Compact:
+        model.FUEL_emission           = Expression(model.scenarios, 
+                                                   model.modeled_years,
+                                                   model.generator_types,
+                                                   model.periods, 
+                                                   rule=FUEL_emission_Expression)
+    else:
+        model.FUEL_emission           = Var(model.scenarios, 
+                                            model.modeled_years,
                                             model.generator_types,
                                             model.periods, 
                                             within=NonNegativeReals)
@@ -236,27 +327,36 @@ def Model_Creation(model, Renewable_Penetration,Battery_Independence):
                                               within=NonNegativeReals)
     model.Total_Electricity_Cost_NonAct     = Var(model.scenarios,
                                               within=NonNegativeReals)
-    model.Energy_To_Grid                 = Var(model.scenarios, 
-                                               model.years,
-                                               model.periods, 
-                                               within=NonNegativeReals)
-    model.Energy_From_Grid               = Var(model.scenarios, 
-                                               model.years,
-                                               model.periods, 
-                                               within=NonNegativeReals)
-    model.GRID_emission                  = Var(model.scenarios, 
-                                                model.years,
-                                                model.periods, 
-                                                within=NonNegativeReals)    
+    model.Energy_To_Grid                 = Var(model.grid_export_hours,
+                                               within=NonNegativeReals,
+                                               bounds=Grid_Power_Bounds)
+    model.Energy_From_Grid               = Var(model.grid_hours,
+                                               within=NonNegativeReals,
+                                               bounds=Grid_Power_Bounds)
+    model.Yearly_Energy_To_Grid          = Var(model.scenarios,
+                                               model.modeled_years,
+                                               within=NonNegativeReals)             # Energy sold to the grid in a year
+    model.Yearly_Energy_From_Grid        = Var(model.scenarios,
+                                               model.modeled_years,
+                                               within=NonNegativeReals)             # Energy bought from the grid in a year
+    if Compact:
+        model.GRID_emission              = Expression(model.grid_hours,
+                                                      rule=GRID_emission_Expression)
+    else:
+        model.GRID_emission              = Var(model.grid_hours,
+                                               within=NonNegativeReals)    
     model.Scenario_GRID_emission      = Var(model.scenarios,
                                             within=NonNegativeReals)
     "Variables associated to the energy balance"
     model.Lost_Load             = Var(model.scenarios, 
-                                      model.years, 
+                                      model.lost_load_years, 
                                       model.periods, 
                                       within=NonNegativeReals)                      # Energy not supplied by the system kWh
+    model.Yearly_Lost_Load      = Var(model.scenarios,
+                                      model.lost_load_years,
+                                      within=NonNegativeReals)                      # Energy not supplied in a year
     model.Energy_Curtailment    = Var(model.scenarios,
-                                      model.years,
+                                      model.modeled_years,
                                       model.periods, 
                                       within=NonNegativeReals)                      # Curtailment of RES in kWh
     model.Scenario_Lost_Load_Cost_Act    = Var(model.scenarios, 
@@ -286,3 +386,48 @@ def Model_Creation(model, Renewable_Penetration,Battery_Independence):
     #model.CO2                                 = Var()
         
 
+
+def Create_Instance(model, datapath=None):
+    "Concrete instance of the model"
+    if datapath is None:
+        Model_Data = model.Inputs.Model_Data
+    else:
+        Model_Data = Validate_Model_Data(Read_Dat(datapath))
+    return model.create_instance(data=Pyomo_Data(model, Model_Data))
+
+def Set_Parameters(instance, values):
+    "Sets mutable parameters of instance and the parameters derived from them"
+    for name, new in values.items():
+        if name not in instance.Mutable:
+            raise ValueError(name + ' is not mutable in this instance (Model_Creation(..., Mutable=...))')
+        param = getattr(instance, name)
+        if isinstance(new, dict):
+            for index, x in new.items():
+                param[index] = x
+        elif param.is_indexed():
+            for index in param:
+                param[index] = new                                                  # the same value for every index
+        else:
+            param.value = new
+    for name, (rule, sources) in Derived_Parameters.items():
+        if set(sources) & set(values):
+            param = getattr(instance, name)
+            if param.is_indexed():
+                for index in param:
+                    param[index] = value(rule(instance, *index))
+            else:
+                param.value = value(rule(instance))
+
+
+Capacity_Variables = ('RES_Units', 'Battery_Nominal_Capacity', 'Generator_Nominal_Capacity')
+
+def Capacities(instance):
+    "Sizes of a solved instance as {variable: {step: value}}"
+    return {name: getattr(instance, name).extract_values() for name in Capacity_Variables}
+
+def Fix_Capacities(instance, capacities):
+    "Fixes the capacity variables of instance to the given sizes"
+    for name, values in capacities.items():
+        var = getattr(instance, name)
+        for index, size in values.items():
+            var[index].fix(size)
@@ -17,12 +17,15 @@ Based on the original model by:
 
 
 from pyomo.environ import *
-from pyomo.opt import SolverFactory
+from Model_Creation import Create_Instance, Fix_Capacities
+from Matrix_LP import Brownfield_Families
+from Solvers import Create_Solver, Solve
+from Multi_Objective import Multi_Objectives, Epsilon_Constraint
+from Solution_Cache import Solve_Cached
 from Constraints_Brownfield import *
-from matplotlib import pyplot as plt
 
-def Model_Resolution_Brownfield(model, Optimization_Goal, MultiObjective_Optimization, Plot_maxCost, Renewable_Penetration, Battery_Independence,datapath="Inputs/Model_data.dat"):      
-    
+def Model_Constraints_Brownfield(model, Optimization_Goal, Renewable_Penetration, Battery_Independence, Matrix_Backend=False):
+    "Constraints of the model, without its objective"
 #%% Economic constraints
     model.NetPresentCost = Constraint(rule=Net_Present_Cost)
     model.CO2emission = Constraint(rule=CO2_emission)
@@ -43,6 +46,22 @@ def Model_Resolution_Brownfield(model, Optimization_Goal, MultiObjective_Optimiz
     model.OperationMaintenanceCostNonAct = Constraint(rule=Operation_Maintenance_Cost_NonAct)
 
     "Variable costs"
+    model.GeneratorYearlyEnergy        = Constraint(model.scenarios,
+                                                    model.modeled_years,
+                                                    model.generator_types,
+                                                    rule=Generator_Yearly_Energy)
+    model.YearlyEnergyFromGrid         = Constraint(model.scenarios,
+                                                    model.modeled_years,
+                                                    rule=Yearly_Energy_From_Grid)
+    model.YearlyEnergyToGrid           = Constraint(model.scenarios,
+                                                    model.modeled_years,
+                                                    rule=Yearly_Energy_To_Grid)
+    model.BatteryYearlyFlow            = Constraint(model.scenarios,
+                                                    model.modeled_years,
+                                                    rule=Battery_Yearly_Flow)
+    model.YearlyLostLoad               = Constraint(model.scenarios,
+                                                    model.lost_load_years,
+                                                    rule=Yearly_Lost_Load)
     model.TotalVariableCostAct         = Constraint(rule=Total_Variable_Cost_Act)
     model.FuelCostTotalAct             = Constraint(model.scenarios, 
                                             model.generator_types,
@@ -64,7 +83,7 @@ def Model_Resolution_Brownfield(model, Optimization_Goal, MultiObjective_Optimiz
                                                     model.generator_types, 
                                                     rule=Total_Fuel_Cost_NonAct)
     model.TotalElectricityCostNonAct   = Constraint(model.scenarios,
-                                                    rule=Total_Revenues_NonAct)     
+                                                    rule=Total_Electricity_Cost_NonAct)     
     model.BatteryReplacementCostNonAct = Constraint(model.scenarios,
                                                     rule=Battery_Replacement_Cost_NonAct) 
     model.ScenarioLostLoadCostNonAct   = Constraint(model.scenarios, 
@@ -77,22 +96,29 @@ def Model_Resolution_Brownfield(model, Optimization_Goal, MultiObjective_Optimiz
 
 
 #%% Electricity generation system constraints 
-    model.EnergyBalance = Constraint(model.scenarios, 
-                                     model.years_steps, 
-                                     model.periods, 
-                                     rule=Energy_balance)
+    if not Matrix_Backend:
+        model.EnergyBalance = Constraint(model.scenarios, 
+                                         model.modeled_years_steps, 
+                                         model.periods, 
+                                         rule=Energy_balance)
 
     "Renewable Energy Sources constraints"  
     
-    model.REScapacity     = Constraint(model.scenarios, model.years_steps, 
-                                       model.renewable_sources,
-                                       model.periods, 
-                                       rule=RES_Capacity)
+    if model.Compact:
+        model.REScapacity     = Constraint(model.steps, 
+                                           model.renewable_sources,
+                                           rule=RES_Capacity_Step)
+    elif not Matrix_Backend:
+        model.REScapacity     = Constraint(model.scenarios, model.modeled_years_steps, 
+                                           model.renewable_sources,
+                                           model.periods, 
+                                           rule=RES_Capacity)
             
-    model.RenewableEnergy = Constraint(model.scenarios, model.years_steps, 
-                                       model.renewable_sources,
-                                       model.periods, 
-                                       rule=Renewable_Energy)  # Energy output of the solar panels
+    if not (Matrix_Backend or model.Compact):
+        model.RenewableEnergy = Constraint(model.scenarios, model.modeled_years_steps, 
+                                           model.renewable_sources,
+                                           model.periods, 
+                                           rule=Renewable_Energy)  # Energy output of the solar panels
     model.ResMinStepUnits = Constraint(model.years_steps,
                                        model.renewable_sources, 
                                        rule=Renewables_Min_Step_Units)
@@ -104,30 +130,57 @@ def Model_Resolution_Brownfield(model, Optimization_Goal, MultiObjective_Optimiz
     
     model.BESScapacity             = Constraint(model.steps,
                                                 rule=BESS_Capacity)
-    model.StateOfCharge            = Constraint(model.scenarios, 
-                                                model.years_steps,
-                                                model.periods, 
-                                                rule=State_of_Charge) # State of Charge of the battery
-    model.MaximunCharge            = Constraint(model.scenarios,
-                                                model.years_steps, 
-                                                model.periods, 
-                                                rule=Maximun_Charge) # Maximun state of charge of the Battery
-    model.MinimunCharge            = Constraint(model.scenarios, 
-                                                model.years_steps,
-                                                model.periods,
-                                                rule=Minimun_Charge) # Minimun state of charge
+    if model.Inputs.Aggregation is not None:                   # representative periods
+        model.StateOfCharge            = Constraint(model.scenarios, 
+                                                    model.modeled_years_steps,
+                                                    model.periods, 
+                                                    rule=Intra_State_of_Charge) # Change of the State of Charge within each representative period
+        model.MaximunCharge            = Constraint(model.scenarios,
+                                                    model.modeled_years_steps, 
+                                                    model.periods, 
+                                                    rule=Intra_Maximun_Charge) # Highest change within the representative period
+        model.MinimunCharge            = Constraint(model.scenarios, 
+                                                    model.modeled_years_steps,
+                                                    model.periods,
+                                                    rule=Intra_Minimun_Charge) # Lowest change within the representative period
+        model.StateOfChargeLinking     = Constraint(model.scenarios, 
+                                                    model.modeled_years_steps,
+                                                    model.chronological_periods, 
+                                                    rule=State_of_Charge_Linking) # State of Charge at the start of each period of the year
+        model.LinkedMaximunCharge      = Constraint(model.scenarios,
+                                                    model.modeled_years_steps, 
+                                                    model.chronological_periods, 
+                                                    rule=Linked_Maximun_Charge) # Maximun state of charge of the Battery
+        model.LinkedMinimunCharge      = Constraint(model.scenarios, 
+                                                    model.modeled_years_steps,
+                                                    model.chronological_periods,
+                                                    rule=Linked_Minimun_Charge) # Minimun state of charge
+    elif not Matrix_Backend:
+        model.StateOfCharge            = Constraint(model.scenarios, 
+                                                    model.modeled_years_steps,
+                                                    model.periods, 
+                                                    rule=State_of_Charge) # State of Charge of the battery
+        model.MaximunCharge            = Constraint(model.scenarios,
+                                                    model.modeled_years_steps, 
+                                                    model.periods, 
+                                                    rule=Maximun_Charge) # Maximun state of charge of the Battery
+        model.MinimunCharge            = Constraint(model.scenarios, 
+                                                    model.modeled_years_steps,
+                                                    model.periods,
+                                                    rule=Minimun_Charge) # Minimun state of charge
     model.MaxPowerBatteryCharge    = Constraint(model.steps, 
                                                 rule=Max_Power_Battery_Charge)  # Max power battery charge constraint
     model.MaxPowerBatteryDischarge = Constraint(model.steps,
                                                 rule=Max_Power_Battery_Discharge)    # Max power battery discharge constraint
-    model.MaxBatIn                 = Constraint(model.scenarios,
-                                                model.years_steps,
-                                                model.periods, 
-                                                rule=Max_Bat_in) # Minimun flow of energy for the charge fase
-    model.Maxbatout                = Constraint(model.scenarios, 
-                                                model.years_steps, 
-                                                model.periods,
-                                                rule=Max_Bat_out) #minimun flow of energy for the discharge fase
+    if not Matrix_Backend:
+        model.MaxBatIn                 = Constraint(model.scenarios,
+                                                    model.modeled_years_steps,
+                                                    model.periods, 
+                                                    rule=Max_Bat_in) # Minimun flow of energy for the charge fase
+        model.Maxbatout                = Constraint(model.scenarios, 
+                                                    model.modeled_years_steps, 
+                                                    model.periods,
+                                                    rule=Max_Bat_out) #minimun flow of energy for the discharge fase
     model.BatteryMinStepCapacity   = Constraint(model.years_steps, 
                                                 rule=Battery_Min_Step_Capacity)
     if Battery_Independence > 0:
@@ -138,49 +191,45 @@ def Model_Resolution_Brownfield(model, Optimization_Goal, MultiObjective_Optimiz
     model.GENcapacity              = Constraint(model.steps,                                                 
                                                 model.generator_types,
                                                 rule=GEN_Capacity)
-    model.MaximunFuelEnergy        = Constraint(model.scenarios, 
-                                                model.years_steps, 
-                                                model.generator_types,
-                                                model.periods, 
-                                                rule=Maximun_Generator_Energy) # Maximun energy output of the diesel generator
+    if not Matrix_Backend:
+        model.MaximunFuelEnergy        = Constraint(model.scenarios, 
+                                                    model.modeled_years_steps, 
+                                                    model.generator_types,
+                                                    model.periods, 
+                                                    rule=Maximun_Generator_Energy) # Maximun energy output of the diesel generator
     model.GeneratorMinStepCapacity = Constraint(model.years_steps, 
                                                 model.generator_types, 
                                                 rule=Generator_Min_Step_Capacity)
-    "Grid constraints"  
-    
-    model.MaximumPowerFromGrid     = Constraint(model.scenarios,
-                                                model.years_steps,
-                                                model.periods,
-                                                rule=Maximum_Power_From_Grid)
-    model.MaximumPowerToGrid       = Constraint(model.scenarios,
-                                                model.years_steps,
-                                                model.periods,
-                                                rule=Maximum_Power_To_Grid) 
+    "Grid constraints"
     
     "Lost load constraints"
-    model.MaximunLostLoad = Constraint(model.scenarios, model.years, 
+    model.MaximunLostLoad = Constraint(model.scenarios, model.lost_load_years, 
                                        rule=Maximun_Lost_Load) # Maximum permissible lost load
     
     "Emission constrains"
     model.RESemission    = Constraint(rule = RES_emission)
     model.GENemission    = Constraint(rule = GEN_emission)
-    model.FUELemission   = Constraint(model.scenarios, 
-                                      model.years_steps, 
-                                      model.generator_types,
-                                      model.periods,
-                                      rule = FUEL_emission)
+    if not (Matrix_Backend or model.Compact):
+        model.FUELemission   = Constraint(model.scenarios, 
+                                          model.modeled_years_steps, 
+                                          model.generator_types,
+                                          model.periods,
+                                          rule = FUEL_emission)
     model.BESSemission   = Constraint(rule = BESS_emission)
     model.ScenarioFUELemission = Constraint(model.scenarios,
                                             rule=Scenario_FUEL_emission)    
-    model.GRIDemission = Constraint(model.scenarios, 
-                                      model.years_steps,
-                                      model.periods,
-                                      rule=GRID_emission)
+    if not (Matrix_Backend or model.Compact):
+        model.GRIDemission = Constraint(model.grid_hours,
+                                          rule=GRID_emission)
     model.ScenarioGRIDemission = Constraint(model.scenarios,
                                             rule=Scenario_GRID_emission)
     
 
       
+
+def Model_Resolution_Brownfield(model, Optimization_Goal, MultiObjective_Optimization, Plot_maxCost, Renewable_Penetration, Battery_Independence,datapath=None, Matrix_Backend=False, Capacities=None, Solver=None, Workers=None, Pareto=None, Cache=None):
+    Model_Constraints_Brownfield(model, Optimization_Goal, Renewable_Penetration, Battery_Independence, Matrix_Backend)
+
     if MultiObjective_Optimization == 'no':
         if Optimization_Goal == 'NPC':
             model.ObjectiveFuntion = Objective(rule = Net_Present_Cost_Obj, 
@@ -188,221 +237,25 @@ def Model_Resolution_Brownfield(model, Optimization_Goal, MultiObjective_Optimiz
         elif Optimization_Goal == 'Operation cost':
             model.ObjectiveFuntion = Objective(rule = Total_Variable_Cost_Obj, 
                                                sense = minimize)
-        instance = model.create_instance(datapath) # load parameters
+        instance = Create_Instance(model, datapath) # load parameters
+        if Capacities is not None:
+            Fix_Capacities(instance, Capacities) # dispatch only, with given sizes
     
         print('\nInstance created')
     
-        opt = SolverFactory('gurobi') # Solver use during the optimization
-
-        opt.set_options('Method=2 Crossover=0 BarConvTol=1e-4 OptimalityTol=1e-4 FeasibilityTol=1e-4 IterationLimit=1000') # !! only works with GUROBI solver   
-        # opt.set_options('Method=2 BarHomogeneous=1 Crossover=0 BarConvTol=1e-4 OptimalityTol=1e-4 FeasibilityTol=1e-4 IterationLimit=1000') # !! only works with GUROBI solver   
+        opt = Create_Solver(Solver, Brownfield_Families, Matrix_Backend) # Solver use during the optimization
+        if Cache is not None:
+            return Solve_Cached(model, instance, opt, Cache, Optimization_Goal, Capacities, datapath=datapath,
+                                Matrix_Backend=Matrix_Backend, Solver=Solver)
 
         print('Calling solver...')
-        results = opt.solve(instance, tee=True) # Solving a model instance 
+        results = Solve(opt, instance) # Solving a model instance and loading the solution
         print('Instance solved')
-
-        instance.solutions.load_from(results)  # Loading solution into instance
         return instance
         
     elif MultiObjective_Optimization == 'yes':
-        if Optimization_Goal == 'NPC':
-            model.f1 = Var()
-            model.C_f1 = Constraint(expr = model.f1 == model.Net_Present_Cost)
-            model.ObjectiveFuntion = Objective(expr = model.f1, 
-                                                  sense=minimize)
-            model.f2 = Var()
-            model.C_f2 = Constraint(expr = model.f2 == model.CO2_emission)
-            model.ObjectiveFuntion1 = Objective(expr = model.f2, 
-                                                   sense=minimize)
-           
-            n = int(input("please indicate how many points (n) you want to analyse: "))
-            
-            #NPC min and CO2 emission max calculation
-            model.ObjectiveFuntion1.deactivate()
-            instance = model.create_instance(datapath)
-            opt = SolverFactory('gurobi')
-            opt.set_options('Method=2 BarHomogeneous=1 Crossover=0 BarConvTol=1e-4 OptimalityTol=1e-4 FeasibilityTol=1e-4 IterationLimit=1000')
-            print('Calling solver...')
-            opt.solve(instance, tee=True)
-            print('Instance solved') 
-            NPC_min = value(instance.ObjectiveFuntion)+value(instance.National_Grid_Investment_Cost)+value(instance.National_Grid_OM_Cost)
-            CO2emission_max = value(instance.ObjectiveFuntion1)
-            print('NPC_min [kUSD] =' +str(NPC_min/1e3),'CO2emission_max [ton] =' +str(CO2emission_max/1e3))
-           
-        
-            #NPC max and CO2 emission min calculation
-            model.ObjectiveFuntion.deactivate()
-            model.ObjectiveFuntion1.activate()
-            instance = model.create_instance(datapath)
-            print('Calling solver...')
-            opt.solve(instance, tee=True)
-            print('Instance solved') 
-            NPC_max = value(instance.ObjectiveFuntion)+value(instance.National_Grid_Investment_Cost)+value(instance.National_Grid_OM_Cost)
-            CO2emission_min = value(instance.ObjectiveFuntion1)
-            print('NPC_max [kUSD] =' +str(NPC_max/1e3),'CO2emission_min [ton] =' +str(CO2emission_min/1e3))
-            r=CO2emission_max-CO2emission_min
-            
-            #normal eps method
-            model.ObjectiveFuntion.activate()
-            model.ObjectiveFuntion1.deactivate()
-
-            instance = model.create_instance(datapath)
-            instance.e = Param(initialize=0, mutable=True)
-            instance.C_e = Constraint(expr = instance.f2 == instance.e)
-
-            if Plot_maxCost:
-                step = int((CO2emission_max - CO2emission_min)/(n-1))
-                steps = list(range(int(CO2emission_min),int(CO2emission_max),step)) 
-            else:
-                step = int((CO2emission_max - CO2emission_min)/n)
-                steps = list(range(int(CO2emission_min),int(CO2emission_max),step)) 
-                steps.pop(0)   
-            f1_l,f2_l = [],[]
-            for i in steps:  
-               instance.e = i
-               #print(value(instance.e))
-               print('Calling solver...')
-               opt.set_options('Method=2 BarHomogeneous=1 Crossover=0 BarConvTol=1e-4 OptimalityTol=1e-4 FeasibilityTol=1e-4 IterationLimit=1000')
-               results = opt.solve(instance, tee=True) # Solving a model instance
-               print('Instance solved')  # Loading solution into instance
-               f1_l.append((value(instance.f1)+value(instance.National_Grid_Investment_Cost)+value(instance.National_Grid_OM_Cost))/1e3)
-               f2_l.append(value(instance.f2)/1e3)
-               instance.solutions.load_from(results)
-               print('NPC [kUSD] = ' +str((value(instance.f1)+value(instance.National_Grid_Investment_Cost)+value(instance.National_Grid_OM_Cost))/1e3),'CO2 emission [ton] = ' +str(value(instance.f2)/1e3))
-
-            if len(f1_l)<n:
-                f1_l.append(NPC_min/1e3)
-                f2_l.append(CO2emission_max/1e3)
-
-            print ('\nNPC [kUSD] =' +str(f1_l))
-            print ('\nCO2 emission [ton] =' +str(f2_l))
-            CO2=(CO2emission_max-CO2emission_min)/1e3
-            NPC=f1_l[0]*1000-NPC_min 
-            print('Cost CO2 avoided [USD/ton] =' +str(round(NPC/CO2,3))) 
-            plt.plot(f1_l, f2_l, 'o-', c='r', label='Pareto optimal front')
-            plt.legend(loc='best')
-            plt.xlabel('NPC(kUSD)')
-            plt.ylabel('CO2 emission(ton)')
-            plt.grid(True)
-            plt.tight_layout()
-            plt.show()
-            
-            steps = list(range(int(CO2emission_min),int(CO2emission_max),step)) 
-            
-            if len(steps)<=n:
-                steps.append(CO2emission_max)
-            
-            if Plot_maxCost:
-                steps.insert(0,0)  
-                
-            i = int(input("please indicate which solution you prefer (starting from 1 to n in CO2 emission): ")) #asks the user how many profiles (i.e. code runs) he wants
-               
-            instance.e = steps[i] 
-            print('Calling solver...')
-            results = opt.solve(instance, tee=True) # Solving a model instance
-            print('Instance solved')  # Loading solution into instance
-            instance.solutions.load_from(results)
-            print('NPC [kUSD] = ' +str((value(instance.f1)+value(instance.National_Grid_Investment_Cost)+value(instance.National_Grid_OM_Cost))/1e3),'CO2 emission [ton] = ' +str(value(instance.f2)/1e3))
-            return instance
-        
-        elif Optimization_Goal == 'Operation cost':
-            model.f1 = Var()
-            model.C_f1 = Constraint(expr = model.f1 == model.Total_Variable_Cost)
-            model.ObjectiveFuntion = Objective(expr = model.f1, 
-                                                  sense=minimize)
-            model.f2 = Var()
-            model.C_f2 = Constraint(expr = model.f2 == model.CO2_emission)
-            model.ObjectiveFuntion1 = Objective(expr = model.f2, 
-                                                   sense=minimize)
-
-            n = int(input("please indicate how many points (n) you want to analyse: "))
-                        
-            #NPC min and CO2 emission max calculation
-            model.ObjectiveFuntion1.deactivate()
-            instance = model.create_instance(datapath)
-            opt = SolverFactory('gurobi')
-            opt.set_options('Method=2 BarHomogeneous=1 Crossover=0 BarConvTol=1e-4 OptimalityTol=1e-4 FeasibilityTol=1e-4 IterationLimit=1000')
-            print('Calling solver...')
-            opt.solve(instance, tee=True)
-            print('Instance solved') 
-            OperationCost_min = value(instance.ObjectiveFuntion)
-            CO2emission_max = value(instance.ObjectiveFuntion1)
-            print('OperationCost_min [kUSD] =' +str(OperationCost_min/1e3),'CO2emission_max [ton] =' +str(CO2emission_max/1e3))
-           
-        
-            #NPC max and CO2 emission min calculation
-            model.ObjectiveFuntion.deactivate()
-            model.ObjectiveFuntion1.activate()
-            instance = model.create_instance(datapath)
-            print('Calling solver...')
-            opt.solve(instance, tee=True)
-            print('Instance solved') 
-            OperationCost_max = value(instance.ObjectiveFuntion)
-            CO2emission_min = value(instance.ObjectiveFuntion1)
-            print('OperationCost_max [kUSD] =' +str(OperationCost_max/1e3),'CO2emission_min [ton] =' +str(CO2emission_min/1e3))
-            r=CO2emission_max-CO2emission_min
-            
-            #normal eps method
-            model.ObjectiveFuntion.activate()
-            model.ObjectiveFuntion1.deactivate()
-
-            instance = model.create_instance(datapath)
-            instance.e = Param(initialize=0, mutable=True)
-            instance.C_e = Constraint(expr = instance.f2 == instance.e)
-        
-            if Plot_maxCost:
-                step = int((CO2emission_max - CO2emission_min)/(n-1))
-                steps = list(range(int(CO2emission_min),int(CO2emission_max),step)) 
-            else:
-                step = int((CO2emission_max - CO2emission_min)/n)
-                steps = list(range(int(CO2emission_min),int(CO2emission_max),step)) 
-                steps.pop(0)     
-
-            f1_l,f2_l = [],[]
-            for i in steps:  
-               instance.e = i
-               #print(value(instance.e))
-               print('Calling solver...')
-               opt.set_options('Method=2 BarHomogeneous=1 Crossover=0 BarConvTol=1e-4 OptimalityTol=1e-4 FeasibilityTol=1e-4 IterationLimit=1000')
-               results = opt.solve(instance, tee=True) # Solving a model instance
-               print('Instance solved')  # Loading solution into instance
-               f1_l.append(value(instance.f1)/1e3)
-               f2_l.append(value(instance.f2)/1e3)
-               instance.solutions.load_from(results)
-               print('Operation Cost [kUSD] = ' +str(value(instance.f1)/1e3),'CO2 emission [ton] = ' +str(value(instance.f2)/1e3))
-
-            if len(f1_l)<n:
-                f1_l.append(OperationCost_min/1e3)
-                f2_l.append(CO2emission_max/1e3)
-            
-            print ('\nOperation Cost [kUSD] =' +str(f1_l))
-            print ('\nCO2 emission [ton] =' +str(f2_l))
-            plt.plot(f1_l, f2_l, 'o-', c='r', label='Pareto optimal front')
-            plt.legend(loc='best')
-            plt.xlabel('Operation Cost(kUSD)')
-            plt.ylabel('CO2 emission(ton)')
-            plt.grid(True)
-            plt.tight_layout()
-            plt.show()
-
-            steps = list(range(int(CO2emission_min),int(CO2emission_max),step))
-                        
-            if len(steps)<=n:
-                steps.append(CO2emission_max)
-
-            if Plot_maxCost:
-                steps.insert(0,0) 
-                
-            i = int(input("please indicate which solution you prefer (starting from 1 to n in CO2 emission): ")) #asks the user how many profiles (i.e. code runs) he wants
-
-            instance.e = steps[i] 
-            #print(value(instance.e))
-            print('Calling solver...')
-            results = opt.solve(instance, tee=True) # Solving a model instance
-            print('Instance solved')  # Loading solution into instance
-            instance.solutions.load_from(results)
-            print('Operation Cost [kUSD] = ' +str(value(instance.f1)/1e3),'CO2 emission [ton] = ' +str(value(instance.f2)/1e3))
-            return instance
+        Multi_Objectives(model, Optimization_Goal)
+        return Epsilon_Constraint(model, Optimization_Goal, Plot_maxCost, Brownfield_Families, datapath, Matrix_Backend, Solver, Workers, Pareto, Model_Constraints_Brownfield)
             
        
       
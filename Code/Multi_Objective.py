@@ -0,0 +1,381 @@
+''' Epsilon-constraint Pareto front of cost and CO2 emission
+
+Model_Resolution_Greenfield/Brownfield(..., MultiObjective_Optimization='yes') declare the cost f1 (NPC or operation
+cost) and the CO2 emission f2 with their objectives, and Epsilon_Constraint builds the front: the cheapest and the
+cleanest solutions bound it, and the points in between minimize f1 with f2 == e (constraint C_e) for e on a uniform grid.
+
+The instance is created once and kept by a persistent solver (gurobi_persistent, appsi_highs for Solver_Config('highs'),
+or Matrix_Solver(..., Persistent=True) with Matrix_Backend): between two solves only the active objective or the
+right-hand side of C_e changes, and the solver re-optimizes from the basis of the previous point (primal simplex after a
+change of objective, dual simplex after a change of e) instead of writing, reading and solving the whole LP again.
+The other solvers of Solvers.py solve the same instance again from scratch.
+
+With Workers > 1 the points between the two bounds are solved in parallel processes. Each process builds its own model
+and instance once from the InputBundle of the model (pickled as the paths of its stored time series) and solves a
+contiguous run of e values on it with its own persistent solver, so that every point still starts from the basis of its
+neighbour; the points are returned in the order of e.
+
+With Pareto_Options(Adaptive=True) the e values are not placed on a uniform grid: C_e becomes the cap f2 <= e, and each new
+e is put halfway along the CO2 axis of the pair of neighbouring points that are furthest apart on the front (with cost and
+CO2 scaled by their ranges), where the front bends or changes fastest. The search stops when no two neighbours are further
+apart than Resolution, or after n solves. A cap that is not binding (f2 < e, a positive slack) shows that every cap
+between f2 and e gives the same solution: those caps are never tried again.
+
+Pareto_Options(Points=n, Selection=rule, Plot=False) runs without any input() or plot window, for batch jobs: Select_Point
+chooses the returned solution by its position, the lowest cost or CO2, the knee of the front, or the cheapest point
+within a CO2 cap. With Cache=folder the front (cost, CO2, e and sizes of every point) is written to
+folder/<case>/front.json and the solution of every point next to it (Solution_Cache.py), <case> being the hash of the
+inputs and the options of the front: running the same case again with another Selection reads the front and loads the
+chosen solution into a new instance without solving anything.
+'''
+
+import os, json, contextlib, io, math
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pyomo.environ import AbstractModel, Constraint, Objective, Param, Var, minimize, value
+from pyomo.opt import SolverFactory
+from matplotlib import pyplot as plt
+from Model_Creation import Create_Instance, Capacities
+from Solution_Cache import Case_Key, Save_Solution, Load_Solution
+from Solvers import Solver_Config, Solver_Name, Solver_Options, Create_Solver, Solve
+
+
+Gurobi_Options = {'Method': 2, 'BarHomogeneous': 1, 'BarConvTol': 1e-4, 'OptimalityTol': 1e-4, 'FeasibilityTol': 1e-4}   # first solve: barrier with crossover, for a basis to start the next ones from
+Pareto_Options = namedtuple('Pareto_Options', 'Adaptive Resolution Points Selection Plot Cache')
+Pareto_Options.__new__.__defaults__ = (False, 0.02, None, None, True, None)
+# Resolution: largest distance between neighbouring points, as a fraction of the cost and CO2 ranges
+# Points: n (asked when None); Selection: rule of Select_Point (asked when None); Plot: shows the front; Cache: folder of the stored fronts (None stores nothing)
+Persistent_Excluded = ('Crossover', 'IterationLimit')                                   # options of the Gurobi profiles that would prevent the warm starts, unless given as raw options
+
+
+class Epsilon_Solver:
+    "Persistent solver of the instance of the epsilon-constraint method"
+
+    def __init__(self, instance, Families, Matrix_Backend=False, Solver=None):
+        self.instance = instance
+        instance.ObjectiveFuntion1.deactivate()                                         # a persistent solver takes one active objective
+        instance.ObjectiveFuntion.activate()
+        instance.C_e.deactivate()                                                       # added to the solver's model when e is first set
+        self.Gurobi = not Matrix_Backend and not hasattr(Solver, 'solve') and Solver_Name(Solver or Solver_Config()) == 'gurobi'   # a solver already created is used as it is
+        if self.Gurobi:
+            options = dict(Gurobi_Options)
+            if Solver is not None:
+                options.update((name, option) for name, option in Solver_Options(Solver).items()
+                               if name not in Persistent_Excluded or name in (Solver.Options or {}))
+            self.opt = SolverFactory('gurobi_persistent')
+            self.opt.set_instance(instance)
+            for name, option in options.items():
+                self.opt.set_gurobi_param(name, option)
+        else:
+            self.opt = Create_Solver(Solver, Families, Matrix_Backend, Persistent=True)
+        self.Objective, self.Bound, self.Solved = instance.ObjectiveFuntion, False, False   # objective and epsilon constraint in the solver's model
+
+    def solve(self, objective, e=None, tee=True):
+        "Minimizes objective (with f2 == e when e is given) and loads the solution into the instance"
+        instance = self.instance
+        for o in (instance.ObjectiveFuntion, instance.ObjectiveFuntion1):
+            o.deactivate()
+        objective.activate()
+        if e is None:
+            instance.C_e.deactivate()
+        else:
+            instance.e = e
+            instance.C_e.activate()
+        if not self.Gurobi:
+            results = Solve(self.opt, instance, tee)
+        else:
+            if self.Solved:
+                self.opt.set_gurobi_param('Method', 0 if objective is not self.Objective else 1)
+            if objective is not self.Objective:
+                self.opt.set_objective(objective)
+            if e is not None and not self.Bound:
+                self.opt.add_constraint(instance.C_e)
+            elif e is None and self.Bound:
+                self.opt.remove_constraint(instance.C_e)
+            elif e is not None:
+                self.opt.set_linear_constraint_attr(instance.C_e, 'RHS', value(instance.C_e.upper))
+            self.Bound = e is not None
+            results = self.opt.solve(tee=tee)
+        self.Objective, self.Solved = objective, True
+        return results
+
+
+def Multi_Objectives(model, Optimization_Goal):
+    "Declares the cost f1, the CO2 emission f2 and their objectives"
+    if Optimization_Goal == 'NPC':
+        model.f1 = Var()
+        model.C_f1 = Constraint(expr = model.f1 == model.Net_Present_Cost)
+    elif Optimization_Goal == 'Operation cost':
+        model.f1 = Var()
+        model.C_f1 = Constraint(expr = model.f1 == model.Total_Variable_Cost)
+    model.ObjectiveFuntion = Objective(expr = model.f1, 
+                                          sense=minimize)
+    model.f2 = Var()
+    model.C_f2 = Constraint(expr = model.f2 == model.CO2_emission)
+    model.ObjectiveFuntion1 = Objective(expr = model.f2, 
+                                           sense=minimize)
+
+def Epsilon_Instance(model, datapath=None, Cap=False):
+    "Instance of model with the epsilon constraint C_e (f2 == e, or f2 <= e with Cap) declared and deactivated"
+    instance = Create_Instance(model, datapath) # load parameters
+    instance.e = Param(initialize=0, mutable=True)
+    instance.C_e = Constraint(expr = instance.f2 <= instance.e if Cap else instance.f2 == instance.e)
+    instance.C_e.deactivate()
+    return instance
+
+def Front_Cost(instance, NPC):
+    "f1, with the national grid costs in the NPC [USD]"
+    if NPC:
+        return value(instance.f1)+value(instance.National_Grid_Investment_Cost)+value(instance.National_Grid_OM_Cost)
+    return value(instance.f1)
+
+def Front_Point(instance, NPC, e):
+    "Point of the front held by the solved instance: e of C_e to find it again, cost [USD], CO2 emission [kg] and sizes as {variable: [[index, size]]}"
+    capacities = {name: [[list(index) if isinstance(index, tuple) else index, size] for index, size in values.items()]
+                  for name, values in Capacities(instance).items()}
+    return {'e': e, 'Cost': Front_Cost(instance, NPC), 'CO2': value(instance.f2), 'Capacities': capacities}
+
+#%% Front on disk and choice of a point
+
+def Point_Path(folder, k):
+    return os.path.join(folder, 'point-' + str(k) + '.npz')
+
+def Write_Front(folder, front):
+    "Writes the points of the front (with the file names of their solutions) to folder/front.json"
+    points = [dict(point, Solution=os.path.basename(point['Solution']) if point.get('Solution') else None) for point in front]
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, 'front.json'), 'w') as f:
+        json.dump(points, f, indent=1)
+
+def Read_Front(folder):
+    "Points of the front stored in folder, None when there is none"
+    path = os.path.join(folder, 'front.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        front = json.load(f)
+    for point in front:
+        point['Solution'] = os.path.join(folder, point['Solution']) if point.get('Solution') else None
+    return front
+
+def Select_Point(front, Selection):
+    """0-based position in front (sorted by CO2) of the point chosen by Selection: its 1-based position, 'min cost', 'min CO2',
+    'knee' (the point furthest from the line between the two ends of the front, with cost and CO2 scaled by their ranges),
+    ('CO2 cap', ton) for the cheapest point within the cap or ('cost cap', kUSD) for the cleanest point within the budget"""
+    cost = [point['Cost'] for point in front]
+    co2 = [point['CO2'] for point in front]
+    if isinstance(Selection, int):
+        if not 1 <= Selection <= len(front):
+            raise ValueError('Selection must be between 1 and ' + str(len(front)))
+        return Selection - 1
+    if Selection == 'min cost':
+        return min(range(len(front)), key=lambda k: cost[k])
+    if Selection == 'min CO2':
+        return min(range(len(front)), key=lambda k: co2[k])
+    if Selection == 'knee':
+        R1, R2 = max(max(cost) - min(cost), 1e-9), max(max(co2) - min(co2), 1e-9)
+        x = [(c - min(cost))/R1 for c in cost]
+        y = [(e - min(co2))/R2 for e in co2]
+        dx, dy = x[-1] - x[0], y[-1] - y[0]
+        return max(range(len(front)), key=lambda k: abs(dy*(x[k] - x[0]) - dx*(y[k] - y[0])))
+    if isinstance(Selection, tuple) and Selection[0] in ('CO2 cap', 'cost cap'):
+        within = [k for k in range(len(front)) if (co2[k]/1e3 if Selection[0] == 'CO2 cap' else cost[k]/1e3) <= Selection[1]]
+        if not within:
+            raise ValueError('No point of the front meets the ' + Selection[0] + ' of ' + str(Selection[1]))
+        return min(within, key=lambda k: cost[k] if Selection[0] == 'CO2 cap' else co2[k])
+    raise ValueError("Unknown Selection " + repr(Selection) + ", the options are a point number, 'min cost', 'min CO2', 'knee', ('CO2 cap', ton) and ('cost cap', kUSD)")
+
+def Select_Solution(model, datapath, Families, Matrix_Backend, Solver, Pareto, front, folder, Name, Cost, instance=None, opt=None):
+    "Instance holding the solution of the chosen point of front: read from its stored solution when there is one, solved again otherwise"
+    if Pareto.Selection is None:
+        k = int(input("please indicate which solution you prefer (starting from 1 to " + str(len(front)) + " in CO2 emission): ")) - 1
+    else:
+        k = Select_Point(front, Pareto.Selection)
+    point = front[k]
+    if point.get('Solution') and os.path.exists(point['Solution']):
+        instance = instance or Epsilon_Instance(model, datapath, Cap=Pareto.Adaptive)
+        Load_Solution(instance, point['Solution'])
+        instance.C_e.deactivate()
+        instance.ObjectiveFuntion.activate()
+        instance.ObjectiveFuntion1.deactivate()
+        print('Solution of point ' + str(k+1) + ' read from ' + point['Solution'])
+    else:
+        if opt is None:
+            instance = Epsilon_Instance(model, datapath, Cap=Pareto.Adaptive)
+            opt = Epsilon_Solver(instance, Families, Matrix_Backend, Solver)
+        print('Calling solver...')
+        opt.solve(instance.ObjectiveFuntion, e=point['e'])
+        print('Instance solved')
+    print(Name + ' [kUSD] = ' +str(Cost(instance)/1e3),'CO2 emission [ton] = ' +str(value(instance.f2)/1e3))
+    return instance
+
+#%% Adaptive placement of the points
+
+def Adaptive_Front(opt, NPC, lowest, cheapest, n, Resolution, Record, Tolerance=1e-6):
+    """Points (Front_Point) of the front between the lowest and the cheapest ones, found by at most n solves with the cap C_e (f2 <= e), sorted by f2.
+    Record(instance, e, k) returns the k-th point found"""
+    instance = opt.instance
+    points = [[lowest['CO2'], lowest['Cost'], lowest['CO2'], lowest], [cheapest['CO2'], cheapest['Cost'], cheapest['CO2'], cheapest]]   # [f2, cost, largest cap known to give the point, point]
+    R1 = max(abs(lowest['Cost'] - cheapest['Cost']), 1e-9)
+    R2 = max(abs(cheapest['CO2'] - lowest['CO2']), 1e-9)
+    for solve in range(n):
+        gaps = [(math.hypot((q[1] - p[1])/R1, (q[0] - p[0])/R2), k) for k, (p, q) in enumerate(zip(points, points[1:]))
+                if q[0] - p[2] > Tolerance*R2]                                         # caps between p and q still untried
+        if not gaps or max(gaps)[0] < Resolution:
+            break
+        k = max(gaps)[1]
+        p, q = points[k], points[k+1]
+        e = (p[2] + q[0])/2
+        print('Calling solver...')
+        opt.solve(instance.ObjectiveFuntion, e=e)
+        print('Instance solved')
+        f2 = value(instance.f2)
+        if f2 <= p[2] + Tolerance*R2:
+            p[2] = e                                                                   # the cap is not binding: the caps up to e give the point p again
+        else:
+            points.insert(k+1, [f2, Front_Cost(instance, NPC), e, Record(instance, e, solve)])
+        print('CO2 cap [ton] = ' + str(e/1e3), 'CO2 emission [ton] = ' + str(f2/1e3), '(' + str(len(points)) + ' points)')
+    return [point for f2, cost, cap, point in points]
+
+#%% Points of the front in parallel processes
+
+Worker_Solver = None                                                                    # Epsilon_Solver of the instance of a worker process
+
+def Start_Worker(Full, options):
+    "Builds the model of the front from the InputBundle Full (pickled as the paths of its stored time series) and its persistent solver"
+    global Worker_Solver
+    from Model_Creation import Model_Creation
+    model = AbstractModel()
+    with contextlib.redirect_stdout(io.StringIO()):
+        Model_Creation(model, options['Renewable_Penetration'], options['Battery_Independence'], Full, options['Compact'], options['Representative_Years'])
+        options['Constraints'](model, options['Optimization_Goal'], options['Renewable_Penetration'], options['Battery_Independence'], options['Matrix_Backend'])
+        Multi_Objectives(model, options['Optimization_Goal'])
+        Worker_Solver = Epsilon_Solver(Epsilon_Instance(model, options['datapath']), options['Families'], options['Matrix_Backend'], options['Solver'])
+
+def Solve_Point(task):
+    "Front_Point at e, solved on the instance of the worker (built by its first task), its solution saved to path (unless None)"
+    Full, options, e, NPC, path = task
+    if Worker_Solver is None:
+        Start_Worker(Full, options)
+    instance = Worker_Solver.instance
+    with contextlib.redirect_stdout(io.StringIO()):                                    # the solver log of every point is not printed
+        Worker_Solver.solve(instance.ObjectiveFuntion, e=e, tee=False)
+    if path is not None:
+        Save_Solution(instance, path)
+    return Front_Point(instance, NPC, e)
+
+def Parallel_Points(model, Optimization_Goal, Constraints, datapath, Families, Matrix_Backend, Solver, steps, NPC, Workers, paths):
+    "Front_Point of the points at the e values of steps, solved in Workers processes, in the order of steps"
+    Workers = min(Workers, len(steps))
+    options = {'Renewable_Penetration': getattr(model, 'Renewable_Penetration', 0), 'Battery_Independence': getattr(model, 'Battery_Independence', 0),
+               'Compact': model.Compact, 'Representative_Years': model.Representative_Years, 'Optimization_Goal': Optimization_Goal,
+               'Constraints': Constraints, 'datapath': datapath, 'Families': Families, 'Matrix_Backend': Matrix_Backend, 'Solver': Solver}
+    with ProcessPoolExecutor(max_workers=Workers) as executor:
+        return list(executor.map(Solve_Point, [(model.Inputs, options, e, NPC, path) for e, path in zip(steps, paths)],
+                                 chunksize=math.ceil(len(steps)/Workers)))                # contiguous e values in each worker
+
+
+def Plot_Front(f1_l, f2_l, Name):
+    plt.plot(f1_l, f2_l, 'o-', c='r', label='Pareto optimal front')
+    plt.legend(loc='best')
+    plt.xlabel(Name + '(kUSD)')
+    plt.ylabel('CO2 emission(ton)')
+    plt.grid(True)
+    plt.tight_layout()
+    plt.show()
+
+
+def Epsilon_Constraint(model, Optimization_Goal, Plot_maxCost, Families, datapath=None, Matrix_Backend=False, Solver=None, Workers=None, Pareto=None, Constraints=None):
+    """Builds the cost-CO2 Pareto front of model (declared by Constraints and Multi_Objectives), its inner points in Workers processes or placed adaptively (Pareto_Options),
+    and returns the instance solved at the point chosen by the user (or by Pareto.Selection)"""
+    Pareto = Pareto or Pareto_Options()
+    NPC = Optimization_Goal == 'NPC'
+    Name, Min_Name = ('NPC', 'NPC') if NPC else ('Operation Cost', 'OperationCost')
+    Cost = lambda instance: Front_Cost(instance, NPC)
+
+    n = Pareto.Points or int(input("please indicate how many points (n) you want to analyse: "))
+    folder = None
+    if Pareto.Cache is not None:
+        folder = os.path.join(Pareto.Cache, Case_Key(model, Optimization_Goal, Plot_maxCost, n, Pareto.Adaptive, Pareto.Resolution, datapath=datapath,
+                                                          Matrix_Backend=Matrix_Backend, Solver=Solver))
+        front = Read_Front(folder)
+        if front is not None:
+            print('Pareto front of ' + str(len(front)) + ' points read from ' + folder)
+            return Select_Solution(model, datapath, Families, Matrix_Backend, Solver, Pareto, front, folder, Name, Cost)
+    Save = lambda instance, k: Save_Solution(instance, Point_Path(folder, k)) if folder is not None else None
+
+    instance = Epsilon_Instance(model, datapath, Cap=Pareto.Adaptive)
+    opt = Epsilon_Solver(instance, Families, Matrix_Backend, Solver)
+
+    #NPC min and CO2 emission max calculation
+    print('Calling solver...')
+    opt.solve(instance.ObjectiveFuntion)
+    print('Instance solved')
+    Cost_min = Cost(instance)
+    CO2emission_max = value(instance.f2)
+    cheapest = Front_Point(instance, NPC, CO2emission_max)
+    Save(instance, 'cheapest')
+    print(Min_Name + '_min [kUSD] =' +str(Cost_min/1e3),'CO2emission_max [ton] =' +str(CO2emission_max/1e3))
+
+    #NPC max and CO2 emission min calculation
+    print('Calling solver...')
+    opt.solve(instance.ObjectiveFuntion1)
+    print('Instance solved')
+    Cost_max = Cost(instance)
+    CO2emission_min = value(instance.f2)
+    print(Min_Name + '_max [kUSD] =' +str(Cost_max/1e3),'CO2emission_min [ton] =' +str(CO2emission_min/1e3))
+
+    if Pareto.Adaptive:
+        lowest = Front_Point(instance, NPC, CO2emission_min)
+        Save(instance, 'lowest')
+        def Record(instance, e, k):
+            Save(instance, k)
+            return dict(Front_Point(instance, NPC, e), Solution=Point_Path(folder, k) if folder is not None else None)
+        lowest['Solution'], cheapest['Solution'] = (Point_Path(folder, 'lowest'), Point_Path(folder, 'cheapest')) if folder is not None else (None, None)
+        front = Adaptive_Front(opt, NPC, lowest, cheapest, n, Pareto.Resolution, Record)
+        if not Plot_maxCost:
+            front.pop(0)
+    else:
+        #normal eps method
+        if Plot_maxCost:
+            step = int((CO2emission_max - CO2emission_min)/(n-1))
+            steps = list(range(int(CO2emission_min),int(CO2emission_max),step))
+        else:
+            step = int((CO2emission_max - CO2emission_min)/n)
+            steps = list(range(int(CO2emission_min),int(CO2emission_max),step))
+            steps.pop(0)
+
+        paths = [Point_Path(folder, k) if folder is not None else None for k in range(len(steps))]
+        front = []
+        if Workers and Workers > 1 and len(steps) > 1 and Constraints is not None:
+            print('Solving ' + str(len(steps)) + ' points in ' + str(min(Workers, len(steps))) + ' processes...')
+            front = Parallel_Points(model, Optimization_Goal, Constraints, datapath, Families, Matrix_Backend, Solver, steps, NPC, Workers, paths)
+        else:
+            for e, path in zip(steps, paths):
+                print('Calling solver...')
+                opt.solve(instance.ObjectiveFuntion, e=e) # only the right-hand side of C_e changes
+                print('Instance solved')
+                front.append(Front_Point(instance, NPC, e))
+                if path is not None:
+                    Save_Solution(instance, path)
+        for point in front:
+            print(Name + ' [kUSD] = ' +str(point['Cost']/1e3),'CO2 emission [ton] = ' +str(point['CO2']/1e3))
+        for point, path in zip(front, paths):
+            point['Solution'] = path
+        if len(front)<n:
+            cheapest['Solution'] = Point_Path(folder, 'cheapest') if folder is not None else None
+            front.append(cheapest)
+
+    f1_l = [point['Cost']/1e3 for point in front]
+    f2_l = [point['CO2']/1e3 for point in front]
+    print ('\n' + Name + ' [kUSD] =' +str(f1_l))
+    print ('\nCO2 emission [ton] =' +str(f2_l))
+    if NPC and not Pareto.Adaptive:
+        CO2=(CO2emission_max-CO2emission_min)/1e3
+        print('Cost CO2 avoided [USD/ton] =' +str(round((f1_l[0]*1000-Cost_min)/CO2,3)))
+    if folder is not None:
+        Write_Front(folder, front)
+        print('Pareto front written to ' + folder)
+    if Pareto.Plot:
+        Plot_Front(f1_l, f2_l, Name)
+    return Select_Solution(model, datapath, Families, Matrix_Backend, Solver, Pareto, front, folder, Name, Cost, instance, opt)
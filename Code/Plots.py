@@ -20,6 +20,7 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib import pyplot
+from Initialize import Schedule
 
 #%%
 def DispatchPlot(instance,TimeSeries,PlotScenario,PlotDate,PlotTime,PlotResolution,PlotFormat):
@@ -50,28 +51,9 @@ def DispatchPlot(instance,TimeSeries,PlotScenario,PlotDate,PlotTime,PlotResoluti
     # PlotDate_text = str(pd.to_datetime(PlotDate).day) + '/' + str(pd.to_datetime(PlotDate).month) + '/' + str(pd.to_datetime(PlotDate).year)
     
     Series = TimeSeries[PlotScenario][PlotYear].copy()
-
-    #%% Generating years-steps tuples list
-    steps = [i for i in range(1, ST+1)]
-    years_steps_list = [1 for i in range(1, ST+1)]
-    s_dur = instance.Step_Duration.value
-    for i in range(1, ST): 
-        years_steps_list[i] = years_steps_list[i-1] + s_dur
-    ys_tuples_list = [[] for i in range(1, Y+1)]
-    for y in range(1, Y+1):  
-        if len(years_steps_list) == 1:
-            ys_tuples_list[y-1] = (y,1)
-        else:
-            for i in range(len(years_steps_list)-1):
-                if y >= years_steps_list[i] and y < years_steps_list[i+1]:
-                    ys_tuples_list[y-1] = (y, steps[i])       
-                elif y >= years_steps_list[-1]:
-                    ys_tuples_list[y-1] = (y, len(steps)) 
     
     #%% Identifying in which investment step the selected year is
-    for (y,st) in ys_tuples_list:
-        if y==PlotYear:
-            PlotStep = st
+    PlotStep = Schedule(instance).Step(PlotYear)
     
     #%% Series preparation
     pDay = 24/instance.Delta_Time()                       # Periods in a day
@@ -238,28 +220,9 @@ def DispatchPlot1(instance,TimeSeries,PlotScenario1,PlotDate1,PlotTime1,PlotReso
     # PlotDate_text = str(pd.to_datetime(PlotDate).day) + '/' + str(pd.to_datetime(PlotDate).month) + '/' + str(pd.to_datetime(PlotDate).year)
     
     Series = TimeSeries[PlotScenario1][PlotYear].copy()
-
-    #%% Generating years-steps tuples list
-    steps = [i for i in range(1, ST+1)]
-    years_steps_list = [1 for i in range(1, ST+1)]
-    s_dur = instance.Step_Duration.value
-    for i in range(1, ST): 
-        years_steps_list[i] = years_steps_list[i-1] + s_dur
-    ys_tuples_list = [[] for i in range(1, Y+1)]
-    for y in range(1, Y+1):  
-        if len(years_steps_list) == 1:
-            ys_tuples_list[y-1] = (y,1)
-        else:
-            for i in range(len(years_steps_list)-1):
-                if y >= years_steps_list[i] and y < years_steps_list[i+1]:
-                    ys_tuples_list[y-1] = (y, steps[i])       
-                elif y >= years_steps_list[-1]:
-                    ys_tuples_list[y-1] = (y, len(steps)) 
     
     #%% Identifying in which investment step the selected year is
-    for (y,st) in ys_tuples_list:
-        if y==PlotYear:
-            PlotStep = st
+    PlotStep = Schedule(instance).Step(PlotYear)
     
     #%% Series preparation
     pDay = 24/instance.Delta_Time()                       # Periods in a day
@@ -426,28 +389,9 @@ def DispatchPlot2(instance,TimeSeries,PlotScenario2,PlotDate2,PlotTime2,PlotReso
     # PlotDate_text = str(pd.to_datetime(PlotDate).day) + '/' + str(pd.to_datetime(PlotDate).month) + '/' + str(pd.to_datetime(PlotDate).year)
     
     Series = TimeSeries[PlotScenario2][PlotYear].copy()
-
-    #%% Generating years-steps tuples list
-    steps = [i for i in range(1, ST+1)]
-    years_steps_list = [1 for i in range(1, ST+1)]
-    s_dur = instance.Step_Duration.value
-    for i in range(1, ST): 
-        years_steps_list[i] = years_steps_list[i-1] + s_dur
-    ys_tuples_list = [[] for i in range(1, Y+1)]
-    for y in range(1, Y+1):  
-        if len(years_steps_list) == 1:
-            ys_tuples_list[y-1] = (y,1)
-        else:
-            for i in range(len(years_steps_list)-1):
-                if y >= years_steps_list[i] and y < years_steps_list[i+1]:
-                    ys_tuples_list[y-1] = (y, steps[i])       
-                elif y >= years_steps_list[-1]:
-                    ys_tuples_list[y-1] = (y, len(steps)) 
     
     #%% Identifying in which investment step the selected year is
-    for (y,st) in ys_tuples_list:
-        if y==PlotYear:
-            PlotStep = st
+    PlotStep = Schedule(instance).Step(PlotYear)
     
     #%% Series preparation
     pDay = 24/instance.Delta_Time()                       # Periods in a day
@@ -614,28 +558,9 @@ def DispatchPlot3(instance,TimeSeries,PlotScenario3,PlotDate3,PlotTime3,PlotReso
     # PlotDate_text = str(pd.to_datetime(PlotDate).day) + '/' + str(pd.to_datetime(PlotDate).month) + '/' + str(pd.to_datetime(PlotDate).year)
     
     Series = TimeSeries[PlotScenario3][PlotYear].copy()
-
-    #%% Generating years-steps tuples list
-    steps = [i for i in range(1, ST+1)]
-    years_steps_list = [1 for i in range(1, ST+1)]
-    s_dur = instance.Step_Duration.value
-    for i in range(1, ST): 
-        years_steps_list[i] = years_steps_list[i-1] + s_dur
-    ys_tuples_list = [[] for i in range(1, Y+1)]
-    for y in range(1, Y+1):  
-        if len(years_steps_list) == 1:
-            ys_tuples_list[y-1] = (y,1)
-        else:
-            for i in range(len(years_steps_list)-1):
-                if y >= years_steps_list[i] and y < years_steps_list[i+1]:
-                    ys_tuples_list[y-1] = (y, steps[i])       
-                elif y >= years_steps_list[-1]:
-                    ys_tuples_list[y-1] = (y, len(steps)) 
     
     #%% Identifying in which investment step the selected year is
-    for (y,st) in ys_tuples_list:
-        if y==PlotYear:
-            PlotStep = st
+    PlotStep = Schedule(instance).Step(PlotYear)
     
     #%% Series preparation
     pDay = 24/instance.Delta_Time()                       # Periods in a day
@@ -797,21 +722,7 @@ def CashFlowPlot(instance,Results,PlotResolution,PlotFormat):
     
     
     #%% Investment cash flows
-    "Generating years-steps tuples list"
-    upgrade_years_list = [1 for i in range(ST)]
-    s_dur = instance.Step_Duration.value
-    for i in range(ST): 
-        upgrade_years_list[i] = upgrade_years_list[i-1] + s_dur  
-    yu_tuples_list = [[] for i in range(1,Y+1)]  
-    for y in range(1,Y+1):      
-        for i in range(len(upgrade_years_list)-1):
-            if y >= upgrade_years_list[i] and y < upgrade_years_list[i+1]:
-                yu_tuples_list[y-1] = (y, [n for n in range(ST)][i+1])          
-            elif y >= upgrade_years_list[-1]:
-                yu_tuples_list[y-1] = (y, ST)            
-    tup_list = [[] for i in range(ST-1)]  
-    for i in range(0, ST-1):
-        tup_list[i] = yu_tuples_list[s_dur*i + s_dur]      
+    Start_Years = Schedule(instance).Start_Years
     
     Investment_BESS = [0 for y in range(Y)]
     Investment_RES = {}
@@ -839,7 +750,7 @@ def CashFlowPlot(instance,Results,PlotResolution,PlotFormat):
                     for g in range(1,G+1):
                         Investment_Gen[Generator_Names[g]][y-1] = Results['Costs'].loc[idx['Investment cost',Generator_Names[g],:,:],'Step 1'].values[0]                
                 if st!=1:
-                    if y==tup_list[st-2][0]:
+                    if y==Start_Years[st-1]:
                         Investment_BESS[y-1] = Results['Costs'].loc[idx['Investment cost','Battery bank',:,:],'Step '+str(st)].values[0]
                         for r in range(1,R+1):
                             Investment_RES[RES_Names[r]][y-1] = Results['Costs'].loc[idx['Investment cost',RES_Names[r],:,:],'Step '+str(st)].values[0]
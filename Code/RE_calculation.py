@@ -1,6 +1,7 @@
 
 import time, sys
 from RE_input_data import *
+from Dat_Parser import Read_Dat
 from Solar_PV_calculation import hourly_solar
 from Typical_year import *
 from Wind_calculation import shear_exp, air_density, wind_lst, P_turb
@@ -15,7 +16,7 @@ def RE_supply():
     #%% Reads .dat file, saves input data and creates the lists of daily and hourly URLs
     
     data_file = "Inputs/RES_data.dat"
-    data_import = open(data_file).readlines()
+    data_import = Read_Dat(data_file)
     (date_start, date_end, lat, lon, lat_ext_1,lon_ext_1, lat_ext_2, lon_ext_2, standard_lon, URL_1_d, URL_2_d ) = URL_creation_d(data_import)
     URL_h = URL_creation_h(data_import)
     URL_list = URL_1_d + URL_2_d + URL_h
@@ -1,39 +1,25 @@
 import pandas as pd, math, numpy as np, re, bisect
 
 
+def Coordinate_Degrees(text):
+    "Splits a coordinate given as '8 91 19 S' into its [degrees, minutes, seconds] integers"
+    return list(map(int, re.findall('-?\d+', text)))
+
 #%% Import URL components for the POWER API by NASA and generate the URL (two different functions depending on time resolution)
 
 def URL_creation_d(Data_import):
-    for value in Data_import:
-        if "param: base_URL" in value:
-            base_URL = value[value.index('=')+1:value.index(';')].replace(' ','')
-        if "param: loc_id" in value:
-            loc_id = '/' + value[value.index('=')+1:value.index(';')].replace(' ','')
-        if "param: parameters_1" in value:
-            parameters_1 = '?parameters=' + (value[value.index('=')+1:value.index(';')].replace(' ',''))
-        if "param: parameters_2" in value:
-            parameters_2 = '?parameters=' + (value[value.index('=')+1:value.index(';')].replace(' ',''))
-        if "param: date_start" in value:
-            date_start = (('&start=' + str(value[value.index('=')+1:value.index(';')])).replace(' ','')).replace("'","")
-        if "param: date_end" in value:
-            date_end = (('&end=' + str(value[value.index('=')+1:value.index(';')])).replace(' ','')).replace("'","")
-        if "param: community" in value:
-            community = '&community=' + value[value.index('=')+1:value.index(';')].replace(' ','')
-        if "param: temp_res_1" in value:
-            temp_res =  value[value.index('=')+1:value.index(';')].replace(' ','')
-        if "param: output_format" in value:
-            output_format = '&format' + value[value.index('=')+1:value.index(';')].replace(' ','')
-        if "param: lat" in value:
-            lat = value[value.index('=')+1:value.index(';')]
-            numbers = re.compile('-?\d+')
-            lat = list(map(int, numbers.findall(lat)))
-        if "param: lon" in value:
-            lon = value[value.index('=')+1:value.index(';')]
-            numbers = re.compile('-?\d+')
-            lon = list(map(int, numbers.findall(lon)))
-        if "param: time_zone" in value:
-            time_zone = int(value[value.index('=')+1:value.index(';')].replace(' ',''))
-            standard_lon = 15*time_zone
+    base_URL = Data_import.Text('base_URL').replace(' ','')
+    loc_id = '/' + Data_import.Text('loc_id').replace(' ','')
+    parameters_1 = '?parameters=' + Data_import.Text('parameters_1').replace(' ','')
+    parameters_2 = '?parameters=' + Data_import.Text('parameters_2').replace(' ','')
+    date_start = '&start=' + Data_import.Text('date_start').replace(' ','')
+    date_end = '&end=' + Data_import.Text('date_end').replace(' ','')
+    community = '&community=' + Data_import.Text('community').replace(' ','')
+    temp_res = Data_import.Text('temp_res_1').replace(' ','')
+    output_format = '&format' + Data_import.Text('output_format').replace(' ','')
+    lat = Coordinate_Degrees(Data_import.Text('lat'))
+    lon = Coordinate_Degrees(Data_import.Text('lon'))
+    standard_lon = 15*Data_import.Int('time_zone')
     URL_1 = []
     URL_2 = []
     ''' Converts geographical coordinates in decimals'''       
@@ -67,31 +53,16 @@ def URL_creation_d(Data_import):
     return date_start, date_end, lat, lon, lat_ext_1, lon_ext_1, lat_ext_2, lon_ext_2, standard_lon, URL_1, URL_2
 
 def URL_creation_h(Data_import):
-    for value in Data_import:
-        if "param: base_URL" in value:
-            base_URL = value[value.index('=')+1:value.index(';')].replace(' ','')
-        if "param: loc_id" in value:
-            loc_id = '/' + value[value.index('=')+1:value.index(';')].replace(' ','')
-        if "param: parameters_3" in value:
-            parameters = '?parameters=' + (value[value.index('=')+1:value.index(';')].replace(' ',''))
-        if "param: date_start" in value:
-            date_start = (('&start=' + str(value[value.index('=')+1:value.index(';')])).replace(' ','')).replace("'","")
-        if "param: date_end" in value:
-            date_end = (('&end=' + str(value[value.index('=')+1:value.index(';')])).replace(' ','')).replace("'","")
-        if "param: community" in value:
-            community = '&community=' + value[value.index('=')+1:value.index(';')].replace(' ','')
-        if "param: temp_res_2" in value:
-            temp_res =  value[value.index('=')+1:value.index(';')].replace(' ','')
-        if "param: output_format" in value:
-            output_format = '&format' + value[value.index('=')+1:value.index(';')].replace(' ','')
-        if "param: lat" in value:
-            lat = value[value.index('=')+1:value.index(';')]
-            numbers = re.compile('-?\d+')
-            lat = list(map(int, numbers.findall(lat)))
-        if "param: lon" in value:
-            lon = value[value.index('=')+1:value.index(';')]
-            numbers = re.compile('-?\d+')
-            lon = list(map(int, numbers.findall(lon)))
+    base_URL = Data_import.Text('base_URL').replace(' ','')
+    loc_id = '/' + Data_import.Text('loc_id').replace(' ','')
+    parameters = '?parameters=' + Data_import.Text('parameters_3').replace(' ','')
+    date_start = '&start=' + Data_import.Text('date_start').replace(' ','')
+    date_end = '&end=' + Data_import.Text('date_end').replace(' ','')
+    community = '&community=' + Data_import.Text('community').replace(' ','')
+    temp_res = Data_import.Text('temp_res_2').replace(' ','')
+    output_format = '&format' + Data_import.Text('output_format').replace(' ','')
+    lat = Coordinate_Degrees(Data_import.Text('lat'))
+    lon = Coordinate_Degrees(Data_import.Text('lon'))
     URL = []
     ''' Converts geographical coordinates from in decimal degrees'''
     if float(lat[0])!= 0:    
@@ -120,36 +91,15 @@ def URL_creation_h(Data_import):
 
 # Solar PV parameters
 def solarPV_parameters(Data_import):
-    for value in Data_import:
-        
-        if "param: nom_power" in value:
-            nom_power = float(value[value.index('=')+1:value.index(';')].replace(' ',''))
-        if "param: G_NMOT" in value:
-            G_NMOT = float(value[value.index('=')+1:value.index(';')].replace(' ',''))
-        if "param: T_NMOT" in value:
-            T_NMOT = float(value[value.index('=')+1:value.index(';')].replace(' ',''))
-        if "param: NMOT" in value:
-            NMOT = float(value[value.index('=')+1:value.index(';')].replace(' ',''))
-        if "param: tilt" in value:
-            tilt = float(value[value.index('=')+1:value.index(';')].replace(' ',''))
-        if "param: k_T" in value:
-            k_T = float(value[value.index('=')+1:value.index(';')].replace(' ',''))
-        if "param: azim" in value:
-            azim = float(value[value.index('=')+1:value.index(';')].replace(' ',''))
-        if "param: ro_ground" in value:
-            ro_ground = float(value[value.index('=')+1:value.index(';')].replace(' ',''))
+    (nom_power,tilt,azim,ro_ground, k_T, NMOT, T_NMOT, G_NMOT) = [Data_import.Float(name) for name in ('nom_power','tilt','azim','ro_ground','k_T','NMOT','T_NMOT','G_NMOT')]
     
     return nom_power,tilt,azim,ro_ground, k_T, NMOT, T_NMOT, G_NMOT
 
 # Wind turbine parameters        
 def wind_parameters(Data_import):
-    for value in Data_import:
-        if "param: turbine_type" in value:
-            type_turb = value[value.index('=')+1:value.index(';')].replace(' ','').replace("'","")
-        if "param: turbine_model" in value:
-            turb_model = value[value.index('=')+1:value.index(';')].replace(' ','').replace("'","")  
-        if "param: drivetrain_efficiency" in value:
-            drivetrain_efficiency = float(value[value.index('=')+1:value.index(';')].replace(' ','').replace("'",""))
+    type_turb = Data_import.Text('turbine_type').replace(' ','')
+    turb_model = Data_import.Text('turbine_model').replace(' ','')
+    drivetrain_efficiency = Data_import.Float('drivetrain_efficiency')
     if type_turb == 'HA':
         skipf = 71-35
         skiprow = 0
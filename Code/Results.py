@@ -1,5 +1,6 @@
 
-import pandas as pd
+import pandas as pd, numpy as np
+from Initialize import Schedule, Year_Representatives, Demand_Ratios
 import warnings; warnings.simplefilter(action='ignore', category=FutureWarning)
 
 
@@ -11,49 +12,11 @@ def ResultsSummary(instance, Optimization_Goal, Brownfield_Investmen, gogle, sen
     Y  = int(instance.Years.extract_values()[None])
     ST = int(instance.Steps_Number.extract_values()[None])
 
-    Discount_Rate = instance.Discount_Rate.value
+    sc = Schedule(instance)
+    ys_tuples_list = sc.Years_Steps
 
-    upgrade_years_list = [1 for i in range(ST)]
-    s_dur = instance.Step_Duration.value
-    for i in range(1, ST): 
-        upgrade_years_list[i] = upgrade_years_list[i-1] + s_dur    
-    yu_tuples_list = [0 for i in range(1,Y+1)]    
-    if ST == 1:    
-        for y in range(1,Y+1):            
-            yu_tuples_list[y-1] = (y, 1)    
-    else:        
-        for y in range(1,Y+1):            
-            for i in range(len(upgrade_years_list)-1):
-                if y >= upgrade_years_list[i] and y < upgrade_years_list[i+1]:
-                    yu_tuples_list[y-1] = (y, [st for st in range(ST)][i+1])                
-                elif y >= upgrade_years_list[-1]:
-                    yu_tuples_list[y-1] = (y, ST)   
-    tup_list = [[] for i in range(ST-1)]  
-    for i in range(0,ST-1):
-        tup_list[i] = yu_tuples_list[s_dur*i + s_dur]      
-  
-    "Generating years-steps tuples list"
-    steps = [i for i in range(1, ST+1)]
-    
-    years_steps_list = [1 for i in range(1, ST+1)]
-    s_dur = instance.Step_Duration.value
-    for i in range(1, ST): 
-        years_steps_list[i] = years_steps_list[i-1] + s_dur
-    ys_tuples_list = [[] for i in range(1, Y+1)]
-    for y in range(1, Y+1):  
-        if len(years_steps_list) == 1:
-            ys_tuples_list[y-1] = (y,1)
-        else:
-            for i in range(len(years_steps_list)-1):
-                if y >= years_steps_list[i] and y < years_steps_list[i+1]:
-                    ys_tuples_list[y-1] = (y, steps[i])       
-                elif y >= years_steps_list[-1]:
-                    ys_tuples_list[y-1] = (y, len(steps)) 
-    
-
-    Electric_Demand = pd.DataFrame.from_dict(instance.Energy_Demand.extract_values(), orient='index') #[Wh]
-    Electric_Demand.index = pd.MultiIndex.from_tuples(list(Electric_Demand.index))
-    Electric_Demand = Electric_Demand.groupby(level=[1], axis=0, sort=False).sum()
+    Period_Weight = instance.Period_Weight.extract_values()                                     # hours of the year each period stands for (Time_Aggregation.py)
+    Electric_Demand = pd.DataFrame((instance.Inputs.Energy_Demand*np.array([Period_Weight[t] for t in instance.periods], dtype=float)).sum(axis=(0,2))) #[Wh] per year, read from the memory-mapped store
     RES_Nominal_Capacity = instance.RES_Nominal_Capacity.extract_values()  
     RES_Units = instance.RES_Units.get_values()  
     RES_Inv_Specific_Cost = instance.RES_Specific_Investment_Cost.extract_values()
@@ -69,7 +32,7 @@ def ResultsSummary(instance, Optimization_Goal, Brownfield_Investmen, gogle, sen
     BESS_Unit_Repl_Cost = instance.Unitary_Battery_Replacement_Cost.value
     Generator_Energy_Production = instance.Generator_Energy_Production.get_values()
     Generator_Marginal_Cost = instance.Generator_Marginal_Cost.extract_values()
-    Net_Present_Demand = sum(Electric_Demand.iloc[i-1,0]/(1+Discount_Rate)**i for i in range(1,(Y+1)))    #[Wh]
+    Net_Present_Demand = sum(Electric_Demand.iloc[i-1,0]/sc.Discount[i] for i in range(1,(Y+1)))    #[Wh]
 
     Investment = round((instance.Investment_Cost.value)/1e3,6)
     Fixed_cost = round((instance.Operation_Maintenance_Cost_Act.value)/1e3,6)
@@ -94,13 +57,17 @@ def ResultsSummary(instance, Optimization_Goal, Brownfield_Investmen, gogle, sen
     
     
     tariff = []
+    representatives = Year_Representatives(instance)                                           # modeled year standing for each year (Representative_Years)
+    ratios = Demand_Ratios(instance)                                                            # the same scaling of the fuel cost as in the model
     for (y,st) in ys_tuples_list:
+        x = representatives[y]
+        scale = ratios[y]
         res_yc = (RES_Units[st,1]*RES_Nominal_Capacity[1]*RES_Inv_Specific_Cost[1]*RES_OM_Specific_Cost[1]/1e3) 
         bess_yc = ( BESS_Nominal_Capacity[st]*BESS_Inv_Specific_Cost*BESS_OM_Specific_Cost/1e3) 
         gen_yc = ( Generator_Nominal_Capacity[st,1]*Generator_Inv_Specific_Cost[1]*Generator_OM_Specific_Cost[1]/1e3) 
-        fuel_yc = (sum(Generator_Energy_Production[(1,y,1,t)] for t in range(1,P+1))*Generator_Marginal_Cost[(1,y,1)]/1e3) 
-        Battery_cost_in = sum(BESS_Inflow[1,y,t]*BESS_Unit_Repl_Cost for t in range(1,P+1))
-        Battery_cost_out = sum(BESS_Outflow[1,y,t]*BESS_Unit_Repl_Cost for t in range(1,P+1))
+        fuel_yc = (sum(Generator_Energy_Production[(1,x,1,t)]*Period_Weight[t] for t in range(1,P+1))*scale*Generator_Marginal_Cost[(1,y,1)]/1e3) 
+        Battery_cost_in = sum(BESS_Inflow[1,x,t]*Period_Weight[t]*BESS_Unit_Repl_Cost for t in range(1,P+1))
+        Battery_cost_out = sum(BESS_Outflow[1,x,t]*Period_Weight[t]*BESS_Unit_Repl_Cost for t in range(1,P+1))
         Battery_Yearly_cost = (Battery_cost_in + Battery_cost_out)/1e3
         tariff_value = res_yc + bess_yc + gen_yc + fuel_yc + Battery_Yearly_cost + 16.25
         tariff.append(tariff_value)
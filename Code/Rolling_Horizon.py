@@ -0,0 +1,209 @@
+''' Rolling-horizon dispatch of a sized microgrid
+
+Rolling_Horizon_Dispatch(instance) takes the sizes (RES_Units, Battery_Nominal_Capacity, Generator_Nominal_Capacity) of
+a solved instance and re-simulates the hourly dispatch of every scenario and year of the project at full resolution,
+without solving the monolithic LP: each year is split into windows (a day, a week, a month or a number of hours) that are
+solved one after the other as small one-year models with the capacities of the year's investment step fixed. Each window
+looks Overlap hours further ahead, and only its first hours are kept: the state of charge at their end is the initial state
+of charge of the next window, and the one at the end of a year starts the next year. Since the windows do not look beyond
+the end of their year, the last ones aim at the state of charge the sizing run had at the end of the year: a shortfall is
+allowed at the price of the dearest energy that would make it up (lost load or generator fuel), so that a window starting
+too low stays feasible.
+
+With Workers > 1 the years are solved in parallel processes. Their starting state of charge is first guessed
+(Battery_Initial_SOC), then the years whose start differs from the end of the previous year are solved again, until the
+links agree (the result is then the same as the sequential one) or Passes is reached.
+
+The windowed dispatch is loaded into a full-resolution instance of the project with the sizes fixed, and its yearly, cost
+and emission variables are computed from it through the equalities defining them, without solving the full LP again;
+Results and Plots read it as any other instance. A window meets Lost_Load_Fraction on its own hours, which is stricter
+than the yearly limit of the full model. The windows do not enforce the Renewable_Penetration or Battery_Independence of
+the sizing run, which hold over a whole year: with the sizes fixed, a window may burn fuel rather than cycle the battery
+(whose throughput has a replacement cost), so the renewable share reached by the dispatch can fall below the one required.
+'''
+
+import contextlib, io
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from pyomo.environ import AbstractModel, Constraint, NonNegativeReals, Objective, Var, minimize, value
+try:
+    from pyomo.core.expr.visitor import identify_variables
+except ImportError:
+    from pyomo.core.expr.current import identify_variables                         # Pyomo 5.5
+from pyomo.util.calc_var_value import calculate_variable_from_constraint
+from Initialize import InputBundle, Schedule, Year_Representatives
+from Matrix_LP import Greenfield_Families, Brownfield_Families
+from Solvers import Create_Solver, Solve, Greenfield_Solver
+
+
+Windows = {'day': 24, 'week': 168, 'month': 730}                                       # hours of the named window lengths
+
+Hourly_Variables = ('Battery_Inflow', 'Battery_Outflow', 'Battery_SOC', 'Generator_Energy_Production', 'RES_Energy_Production',
+                    'Energy_From_Grid', 'Energy_To_Grid', 'Lost_Load', 'Energy_Curtailment', 'FUEL_emission', 'GRID_emission')   # taken from the windows
+
+
+#%% Windows of a year
+
+def Window_Bounds(n_periods, length, overlap):
+    "(first, last kept + 1, last + 1) 0-based hours of the windows of a year: length hours kept, overlap more hours solved"
+    return [(start, min(start+length, n_periods), min(start+length+overlap, n_periods)) for start in range(0, n_periods, length)]
+
+def Window_Inputs(Full, s, y, first, end, initial_soc):
+    "InputBundle of one scenario, one year and the hours first to end-1 of Full, as a one-year, one-step project starting at initial_soc (fraction of the battery capacity)"
+    Model_Data = Full.Model_Data.copy()
+    grid_year = y >= Model_Data.Int('Year_Grid_Connection')
+    Model_Data.update({'Scenarios': 1, 'Scenario_Weight': {1: 1}, 'Years': 1, 'Periods': end - first,
+                       'Step_Duration': 1, 'Min_Last_Step_Duration': 1, 'Year_Grid_Connection': 1 if grid_year else 2,
+                       'Battery_Initial_SOC': initial_soc})
+    Time_Series = {'Energy_Demand': np.asarray(Full.Energy_Demand)[s-1:s,y-1:y,first:end],
+                   'RES_Unit_Energy': np.asarray(Full.RES_Unit_Energy)[s-1:s,:,first:end],
+                   'Grid_Availability': np.asarray(Full.Grid_Availability)[s-1:s,y-1:y,first:end]}
+    return InputBundle(Full.Data_Path, Full.Refresh_Cache, Model_Data, Time_Series)
+
+def Step_Capacities(capacities, ut):
+    "Sizes of investment step ut (Model_Creation.Capacities) as the sizes of the only step of a window model"
+    step = {}
+    for name, values in capacities.items():
+        if name == 'Battery_Nominal_Capacity':
+            step[name] = {1: values[ut]}
+        else:
+            step[name] = {(1,) + index[1:]: size for index, size in values.items() if index[0] == ut}
+    return step
+
+def Shortfall_Price(m):
+    "Price [USD/Wh] of a state of charge below the one aimed at: the dearest energy that would make it up"
+    return max([value(m.Lost_Load_Specific_Cost)] + [value(m.Generator_Marginal_Cost[g]) for g in m.generator_types])
+
+def Dispatch_Instance(Inputs, capacities, options, Matrix_Backend, end_soc=0):
+    "Instance of the project of Inputs with the sizes fixed and the cost objective, aiming at end_soc [Wh] at the end of its last hour when given"
+    from Model_Creation import Model_Creation, Create_Instance, Fix_Capacities
+    if options['Brownfield']:
+        from Model_Resolution_Brownfield import Model_Constraints_Brownfield as Model_Constraints
+        from Constraints_Brownfield import Net_Present_Cost_Obj, Total_Variable_Cost_Obj
+    else:
+        from Model_Resolution_Greenfield import Model_Constraints_Greenfield as Model_Constraints
+        from Constraints_Greenfield import Net_Present_Cost_Obj, Total_Variable_Cost_Obj
+    cost = Net_Present_Cost_Obj if options['Optimization_Goal'] == 'NPC' else Total_Variable_Cost_Obj
+    model = AbstractModel()
+    Model_Creation(model, 0, 0, Inputs, options['Compact'])                            # no yearly renewable share or battery autonomy (see above)
+    Model_Constraints(model, options['Optimization_Goal'], 0, 0, Matrix_Backend)
+    if end_soc > 0:
+        model.YearEnd_Shortfall = Var(within=NonNegativeReals)                           # [Wh] below end_soc
+        model.YearEndSOC = Constraint(rule=lambda m: m.Battery_SOC[1,1,m.Periods] + m.YearEnd_Shortfall >= end_soc)
+        model.ObjectiveFuntion = Objective(rule=lambda m: cost(m) + Shortfall_Price(m)*m.YearEnd_Shortfall, sense=minimize)
+    else:
+        model.ObjectiveFuntion = Objective(rule=cost, sense=minimize)
+    instance = Create_Instance(model)
+    Fix_Capacities(instance, capacities)
+    return instance
+
+def Year_Dispatch(task):
+    """Dispatch of scenario s in year y solved window by window from start_soc [Wh]: ({variable: {full-resolution index: value}}, state of charge at the end of the year).
+    The windows reaching the end of the year aim at end_soc [Wh], for the next year to start from"""
+    Full, s, y, start_soc, end_soc, capacities, options = task
+    opt = Create_Solver(options['Solver'], Brownfield_Families if options['Brownfield'] else Greenfield_Families, options['Matrix_Backend'],
+                        Default=None if options['Brownfield'] else Greenfield_Solver)
+    battery = capacities['Battery_Nominal_Capacity'][1]
+    initial_soc = Full.Model_Data.Float('Battery_Initial_SOC')
+    dispatch, soc = {name: {} for name in Hourly_Variables}, start_soc
+    for first, kept, end in Window_Bounds(Full.Model_Data.Int('Periods'), options['Window'], options['Overlap']):
+        window = Dispatch_Instance(Window_Inputs(Full, s, y, first, end, soc/battery if battery > 0 else initial_soc), capacities, options,
+                                   options['Matrix_Backend'], end_soc if end == Full.Model_Data.Int('Periods') else 0)
+        with contextlib.redirect_stdout(io.StringIO()):                                # the solver log of every window is not printed
+            Solve(opt, window, tee=False)
+        for name in Hourly_Variables:
+            component = getattr(window, name)
+            if component.ctype is not Var:                                             # an expression in a compact model
+                continue
+            for index, x in component.extract_values().items():
+                if index[-1] <= kept - first and x is not None:
+                    dispatch[name][(s, y) + index[2:-1] + (first + index[-1],)] = x
+        soc = value(window.Battery_SOC[1, 1, kept - first])
+    return dispatch, soc
+
+#%% Dispatch of the whole project
+
+def Derive_Values(instance):
+    "Computes the variables of instance defined by an equality constraint from the values already set; returns the constraints left with unknown variables"
+    pending = []
+    for c in instance.component_data_objects(Constraint, active=True):
+        if c.equality:
+            unknown = [x for x in identify_variables(c.body, include_fixed=False) if x.value is None]
+            if unknown:
+                pending.append((c, unknown))
+    while pending:
+        left = []
+        for c, unknown in pending:
+            unknown = [x for x in unknown if x.value is None]
+            if len(unknown) == 1:
+                calculate_variable_from_constraint(unknown[0], c)
+            elif unknown:
+                left.append((c, unknown))
+        if len(left) == len(pending):
+            break
+        pending = left
+    return [c for c, unknown in pending]
+
+def Year_End_SOC(instance, s, y):
+    "State of charge [Wh] of a solved instance at the end of year y (of the modeled year standing for it with Representative_Years)"
+    x = Year_Representatives(instance)[y]
+    aggregation = instance.Inputs.Aggregation
+    if aggregation is None:
+        return value(instance.Battery_SOC[s, x, instance.Periods])
+    last = len(instance.chronological_periods)
+    return value(instance.Battery_SOC_Start[s, x, last] + instance.Battery_SOC[s, x, aggregation.Last[aggregation.Representative(last)-1]])
+
+def Rolling_Horizon_Dispatch(instance, Window='week', Overlap=24, Workers=None, Passes=None, Tolerance=1e-6,
+                             Optimization_Goal='NPC', Brownfield=False, Matrix_Backend=False, Compact=False, Solver=None):
+    """Full-resolution instance with the sizes of instance (solved, also on AggregatedInputs or Representative_Years) and the dispatch solved in windows of Window ('day', 'week', 'month' or hours) plus Overlap hours.
+    Workers > 1 solves the years in parallel processes, repeated at most Passes times (by default until the state of charge at the start of every year matches the end of the previous one within Tolerance of the battery capacity)"""
+    from Model_Creation import Capacities
+    length = Windows.get(Window, Window)
+    if not isinstance(length, int) or length < 1 or Overlap < 0:
+        raise ValueError('Window must be one of ' + ', '.join(Windows) + ' or a number of hours, and Overlap at least 0')
+    Full = getattr(instance.Inputs, 'Full', instance.Inputs)                           # the full time series of AggregatedInputs (Time_Aggregation.py)
+    sc = Schedule(instance)
+    capacities = Capacities(instance)
+    options = {'Window': length, 'Overlap': int(Overlap), 'Optimization_Goal': Optimization_Goal, 'Brownfield': Brownfield,
+               'Matrix_Backend': Matrix_Backend, 'Compact': Compact, 'Solver': Solver}
+    step_capacities = {ut: Step_Capacities(capacities, ut) for ut in range(1, sc.Steps+1)}
+    battery = {y: step_capacities[sc.Step(y)]['Battery_Nominal_Capacity'][1] for y in range(1, sc.Years+1)}
+    DoD = Full.Model_Data.Float('Battery_Depth_of_Discharge')
+    initial_soc = Full.Model_Data.Float('Battery_Initial_SOC')
+    scenarios = range(1, Full.Model_Data.Int('Scenarios')+1)
+    end_soc = {(s,y): min(max(Year_End_SOC(instance, s, y), battery[y+1]*DoD), battery[y]) if y < sc.Years else 0
+               for s in scenarios for y in battery}                                    # the windows do not see the next year: it starts from the state of charge of the sizing run
+    task = lambda s, y, soc: (Full, s, y, soc, end_soc[s,y], step_capacities[sc.Step(y)], options)
+    years = {}                                                                         # (s,y): (dispatch, state of charge at the end of the year)
+    if not Workers or Workers == 1:
+        for s in scenarios:
+            soc = battery[1]*initial_soc
+            for y in range(1, sc.Years+1):
+                years[s,y] = Year_Dispatch(task(s, y, soc))
+                soc = years[s,y][1]
+    else:
+        start = {(s,y): end_soc[s,y-1] if y > 1 else battery[1]*initial_soc for s in scenarios for y in battery}   # first guess of the links between years
+        pending, n_passes = list(start), 0
+        with ProcessPoolExecutor(max_workers=Workers) as executor:
+            while pending and (Passes is None or n_passes < Passes):
+                for key, result in zip(pending, executor.map(Year_Dispatch, [task(s, y, start[s,y]) for (s, y) in pending])):
+                    years[key] = result
+                n_passes += 1
+                pending = []
+                for (s, y) in start:
+                    if y > 1 and abs(years[s,y-1][1] - start[s,y]) > Tolerance*max(battery[y], 1):
+                        start[s,y] = years[s,y-1][1]
+                        pending.append((s,y))
+        if pending:
+            print('Rolling horizon: the state of charge of ' + str(len(pending)) + ' years still differs from the end of the previous year after ' + str(n_passes) + ' passes')
+    full = Dispatch_Instance(Full, capacities, options, True)                          # the hourly constraints are met by the windows
+    for year_dispatch, soc in years.values():
+        for name in Hourly_Variables:
+            component = getattr(full, name)
+            for index, x in year_dispatch[name].items():
+                if index in component:
+                    component[index].value = x
+    undefined = Derive_Values(full)
+    if undefined:
+        print('Rolling horizon: ' + str(len(undefined)) + ' constraints still have variables without a value, e.g. ' + undefined[0].name)
+    return full
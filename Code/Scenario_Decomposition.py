@@ -0,0 +1,233 @@
+''' Scenario decomposition of a multi-scenario sizing run by progressive hedging
+
+The sizes (RES_Units, Battery_Nominal_Capacity, Generator_Nominal_Capacity) are the first-stage decisions shared by all
+scenarios, the dispatch is the second stage of each scenario. Scenario_Decomposition(Inputs) never builds the monolithic
+LP: every scenario is a one-scenario model of its own, kept alive in a worker process (the scenarios are dealt to Workers
+processes) with a persistent solver (Create_Solver(..., Persistent=True)), which re-optimizes it at every iteration
+after updating only the hedging parameters and the objective. The first solve sizes each scenario alone, and the
+probability-weighted sum of these optima is a lower bound of the expected NPC. The following solves add to the objective
+of each scenario the price of its sizes differing from their mean (the weights W) and the proximal term
+rho/2*(x - mean)^2, rho being Rho times the unit investment cost of the size over the initial spread of the scenarios.
+The weights are updated until the mean distance of the scenario sizes to their mean is below Tolerance times the mean
+sizes, or for Max_Iterations. The proximal term is written as its tangents at a
+few deviations around the current spread of the scenarios (Tangents) and at the deviations where it costs twice the
+weight, which keeps every subproblem a bounded LP for any solver: a quadratic objective makes each solve of a full year
+of hours orders of magnitude slower.
+
+Benders cuts are not used: with the sizes of another scenario the dispatch of a scenario is often infeasible (an undersized
+generator cannot serve its demand), while the penalized subproblems always keep sizes of their own. The sizes returned are
+the largest of the scenarios, which every scenario can operate; their expected NPC is evaluated by solving the dispatch of
+each scenario with them fixed. Each scenario meets Renewable_Penetration on its own, which is stricter than the
+probability-weighted share of the monolithic model.
+
+The Capacities of the result can be fixed in a full instance (Model_Resolution_XXfield(..., Capacities=...)) or used by
+Rolling_Horizon.py to re-simulate the dispatch.
+'''
+
+import contextlib, io, traceback
+import multiprocessing
+import numpy as np
+from collections import namedtuple
+from pyomo.environ import AbstractModel, Constraint, NonNegativeReals, Objective, Param, Set, Var, minimize, value
+from pyomo.opt import TerminationCondition
+from Initialize import InputBundle
+from Matrix_LP import Greenfield_Families, Brownfield_Families
+from Solvers import Create_Solver, Solve, Greenfield_Solver
+
+
+Decomposition = namedtuple('Decomposition', 'Capacities NPC Scenario_NPC Lower_Bound Iterations Converged')
+
+Tangents = (-4, -2, -1, -0.5, -0.25, -0.125, 0.125, 0.25, 0.5, 1, 2, 4)                    # deviations from the mean, in spreads of the scenarios, where the proximal term is tangent to the parabola
+
+
+#%% Scenario subproblems
+
+def Scenario_Inputs(Full, s):
+    "InputBundle of scenario s of Full as a one-scenario project"
+    Model_Data = Full.Model_Data.copy()
+    Model_Data.update({'Scenarios': 1, 'Scenario_Weight': {1: 1}})
+    Time_Series = {name: np.asarray(getattr(Full, name))[s-1:s] for name in ('Energy_Demand', 'RES_Unit_Energy', 'Grid_Availability')}
+    return InputBundle(Full.Data_Path, Full.Refresh_Cache, Model_Data, Time_Series)
+
+def Unit_Investment_Cost(instance, name, index):
+    "Investment cost [USD] of one unit of capacity variable name[index]"
+    if name == 'RES_Units':
+        return value(instance.RES_Nominal_Capacity[index[-1]]*instance.RES_Specific_Investment_Cost[index[-1]])
+    if name == 'Battery_Nominal_Capacity':
+        return value(instance.Battery_Specific_Investment_Cost)
+    return value(instance.Generator_Specific_Investment_Cost[index[-1]])
+
+class Scenario_Subproblem:
+    "Model of one scenario, solved first on its own, then with the hedging terms of the progressive hedging iterations"
+
+    def __init__(self, Full, s, options):
+        from Model_Creation import Model_Creation, Capacity_Variables
+        if options['Brownfield']:
+            from Model_Resolution_Brownfield import Model_Resolution_Brownfield as Model_Resolution
+        else:
+            from Model_Resolution_Greenfield import Model_Resolution_Greenfield as Model_Resolution
+        families = Brownfield_Families if options['Brownfield'] else Greenfield_Families
+        self.Solver = Create_Solver(options['Solver'], families, options['Matrix_Backend'], Persistent=True,
+                                    Default=None if options['Brownfield'] else Greenfield_Solver)   # keeps the instance: the iterations only change the hedging parameters and the objective
+        model = AbstractModel()
+        Model_Creation(model, options['Renewable_Penetration'], options['Battery_Independence'], Scenario_Inputs(Full, s),
+                       options['Compact'], options['Representative_Years'])
+        with contextlib.redirect_stdout(io.StringIO()):                                # the solver log of every scenario is not printed
+            self.instance = Model_Resolution(model, options['Optimization_Goal'], 'no', 0, options['Renewable_Penetration'],
+                                             options['Battery_Independence'], Matrix_Backend=options['Matrix_Backend'], Solver=self.Solver)
+        instance = self.instance
+        self.Positions = [(name, index) for name in Capacity_Variables for index in sorted(getattr(instance, name).keys())]
+        self.Variables = [getattr(instance, name)[index] for name, index in self.Positions]
+        self.Unit_Cost = np.array([Unit_Investment_Cost(instance, name, index) for name, index in self.Positions])
+        self.NPC = value(instance.ObjectiveFuntion)
+        instance.hedging_positions = Set(initialize=range(len(self.Positions)), ordered=True)
+        instance.Hedging_Weight  = Param(instance.hedging_positions, initialize=0, mutable=True)   # W [USD/unit]
+        instance.Hedging_Mean    = Param(instance.hedging_positions, initialize=0, mutable=True)   # mean size of the scenarios [unit]
+        instance.Hedging_Penalty = Param(instance.hedging_positions, initialize=0, mutable=True)   # rho [USD/unit^2]
+        instance.hedging_tangents = Set(initialize=range(len(Tangents)+2), ordered=True)
+        instance.Hedging_Tangent = Param(instance.hedging_positions, instance.hedging_tangents, initialize=0, mutable=True)   # deviations from the mean where the proximal term is tangent to rho/2*(x - mean)^2 [unit]
+        instance.Hedging_Proximal = Var(instance.hedging_positions, within=NonNegativeReals)        # proximal term [USD]
+        instance.HedgingProximal = Constraint(instance.hedging_positions, instance.hedging_tangents, rule=lambda m, i, k:
+            m.Hedging_Proximal[i] >= m.Hedging_Penalty[i]*m.Hedging_Tangent[i,k]*(self.Variables[i] - m.Hedging_Mean[i] - m.Hedging_Tangent[i,k]/2))
+        instance.HedgingObjective = Objective(sense=minimize, expr=instance.ObjectiveFuntion.expr
+            + sum(instance.Hedging_Weight[i]*x + instance.Hedging_Proximal[i] for i, x in enumerate(self.Variables)))
+        instance.HedgingProximal.deactivate()
+        instance.HedgingObjective.deactivate()
+
+    def Sizes(self):
+        return np.array([value(x) for x in self.Variables])
+
+    def Solve(self):
+        results = Solve(self.Solver, self.instance, tee=False)
+        if results.solver.termination_condition != TerminationCondition.optimal:
+            raise RuntimeError('Scenario decomposition: a scenario subproblem was not solved to optimality (' + str(results.solver.termination_condition) + ')')
+
+    def Hedge(self, weights, mean, penalty, spread):
+        "Sizes minimizing the objective plus the hedging terms"
+        instance = self.instance
+        for i in instance.hedging_positions:
+            instance.Hedging_Weight[i], instance.Hedging_Mean[i], instance.Hedging_Penalty[i] = weights[i], mean[i], penalty[i]
+            reach = 2*abs(weights[i])/penalty[i] if penalty[i] > 0 else 0               # the proximal term grows faster than the weight beyond it
+            for k, deviation in enumerate(tuple(t*spread[i] for t in Tangents) + (-reach, reach)):
+                instance.Hedging_Tangent[i,k] = deviation
+        instance.ObjectiveFuntion.deactivate()
+        instance.HedgingObjective.activate()
+        instance.HedgingProximal.activate()
+        self.Solve()
+        return self.Sizes()
+
+    def Evaluate(self, sizes):
+        "Objective of the dispatch with the sizes fixed"
+        for x, size in zip(self.Variables, sizes):
+            x.fix(size)
+        self.instance.HedgingObjective.deactivate()
+        self.instance.HedgingProximal.deactivate()
+        self.instance.ObjectiveFuntion.activate()
+        self.Solve()
+        for x in self.Variables:
+            x.unfix()
+        return value(self.instance.ObjectiveFuntion)
+
+def Answer(subproblems, request):
+    if request[0] == 'hedge':
+        weights, mean, penalty, spread = request[1:]
+        return {s: sp.Hedge(weights[s], mean, penalty, spread) for s, sp in subproblems.items()}
+    return {s: sp.Evaluate(request[1]) for s, sp in subproblems.items()}
+
+def Scenario_Worker(connection, Full, scenarios, options):
+    "Keeps the subproblems of scenarios and answers the requests of Scenario_Decomposition until it sends None"
+    try:
+        subproblems = {s: Scenario_Subproblem(Full, s, options) for s in scenarios}
+        connection.send({s: (sp.Sizes(), sp.NPC, sp.Unit_Cost, sp.Positions) for s, sp in subproblems.items()})
+        for request in iter(connection.recv, None):
+            connection.send(Answer(subproblems, request))
+    except Exception as error:
+        connection.send(RuntimeError(str(error) + '\n\nin the scenario worker process:\n' + traceback.format_exc()))   # raised again by Gather
+
+class Local_Worker:
+    "Scenario_Worker in the calling process, with the interface of a pipe"
+
+    def __init__(self, Full, scenarios, options):
+        self.Subproblems = {s: Scenario_Subproblem(Full, s, options) for s in scenarios}
+        self.Answer = {s: (sp.Sizes(), sp.NPC, sp.Unit_Cost, sp.Positions) for s, sp in self.Subproblems.items()}
+
+    def send(self, request):
+        if request is None:
+            return
+        self.Answer = Answer(self.Subproblems, request)
+
+    def recv(self):
+        return self.Answer
+
+#%% Progressive hedging
+
+def Scenario_Decomposition(Inputs=None, Renewable_Penetration=0, Battery_Independence=0, Optimization_Goal='NPC',
+                           Brownfield=False, Matrix_Backend=False, Compact=False, Representative_Years=None,
+                           Workers=None, Rho=0.3, Tolerance=1e-3, Max_Iterations=50, Solver=None):
+    "Sizes of the project of Inputs found by progressive hedging over its scenarios, solved in Workers processes (in this process by default)"
+    Full = Inputs if Inputs is not None else InputBundle()
+    n_scenarios = Full.Model_Data.Int('Scenarios')
+    probability = {s: float(Full.Model_Data['Scenario_Weight'][s]) for s in range(1, n_scenarios+1)}
+    options = {'Renewable_Penetration': Renewable_Penetration, 'Battery_Independence': Battery_Independence,
+               'Optimization_Goal': Optimization_Goal, 'Brownfield': Brownfield, 'Matrix_Backend': Matrix_Backend,
+               'Compact': Compact, 'Representative_Years': Representative_Years, 'Solver': Solver}
+    n_workers = min(Workers or 1, n_scenarios)
+    dealt = [[s for s in probability if s % n_workers == i % n_workers] for i in range(n_workers)]
+    if n_workers == 1:
+        workers, processes = [Local_Worker(Full, dealt[0], options)], []
+    else:
+        workers, processes = [], []
+        for scenarios in dealt:
+            connection, worker_connection = multiprocessing.Pipe()
+            processes.append(multiprocessing.Process(target=Scenario_Worker, args=(worker_connection, Full, scenarios, options), daemon=True))
+            processes[-1].start()
+            worker_connection.close()                                               # recv raises EOFError if the worker dies
+            workers.append(connection)
+    def Gather(request=None):
+        if request is not None:
+            for w, worker in enumerate(workers):
+                worker.send(request(dealt[w]))
+        answer = {}
+        for worker in workers:
+            part = worker.recv()
+            if isinstance(part, Exception):
+                raise part
+            answer.update(part)
+        return answer
+    try:
+        first = Gather()
+        positions, unit_cost = first[1][3], first[1][2]
+        sizes = {s: first[s][0] for s in probability}
+        lower_bound = sum(probability[s]*first[s][1] for s in probability)
+        mean = sum(probability[s]*sizes[s] for s in probability)
+        spread = sum(probability[s]*np.abs(sizes[s] - mean) for s in probability)
+        penalty = Rho*unit_cost/np.maximum(spread, 1)                                   # rho: Rho times the unit investment cost over the initial spread
+        weights = {s: penalty*(sizes[s] - mean) for s in probability}
+        iterations = 0
+        distance = spread.sum()/np.maximum(np.abs(mean), 1).sum()
+        while distance >= Tolerance and iterations < Max_Iterations:                    # mean distance of the scenario sizes to their mean, relative to the mean sizes
+            iterations += 1
+            floor = Tolerance*np.maximum(np.abs(mean), 1)                              # the tangents of sizes that already agree stay apart
+            sizes = Gather(lambda scenarios: ('hedge', {s: weights[s] for s in scenarios}, mean, penalty, np.maximum(spread, floor)))
+            mean = sum(probability[s]*sizes[s] for s in probability)
+            spread = sum(probability[s]*np.abs(sizes[s] - mean) for s in probability)
+            distance = spread.sum()/np.maximum(np.abs(mean), 1).sum()
+            print('Scenario decomposition: iteration ' + str(iterations) + ', distance of the scenario sizes to their mean ' + str(round(distance, 6)))
+            for s in probability:
+                weights[s] = weights[s] + penalty*(sizes[s] - mean)
+        final = np.max([sizes[s] for s in probability], axis=0)                        # sizes every scenario can operate
+        scenario_npc = Gather(lambda scenarios: ('evaluate', final))
+    finally:
+        for worker in workers:
+            with contextlib.suppress(OSError):                                         # a worker that failed has closed its pipe
+                worker.send(None)
+        for process in processes:
+            process.join()
+    capacities = {}
+    for (name, index), size in zip(positions, final):
+        capacities.setdefault(name, {})[index] = float(size)
+    converged = distance < Tolerance
+    if not converged:
+        print('Scenario decomposition: the sizes of the scenarios still differ after ' + str(Max_Iterations) + ' iterations')
+    return Decomposition(capacities, sum(probability[s]*scenario_npc[s] for s in probability), {s: scenario_npc[s] for s in probability},
+                         lower_bound, iterations, converged)
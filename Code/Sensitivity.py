@@ -0,0 +1,170 @@
+''' Sensitivity analysis on one instance
+
+Sensitivity_Analysis({'RES_Specific_Investment_Cost': values}) builds the model once, with the swept parameters declared
+mutable (Model_Creation(..., Mutable=...)), and solves it at the first point. Every following point only changes the
+values of the parameters in the instance (Set_Parameters, which also recomputes Unitary_Battery_Replacement_Cost and
+Generator_Marginal_Cost) and re-solves it with the same persistent solver: the appsi interfaces of Gurobi and HiGHS, or
+Matrix_Solver(..., Persistent=True) with Matrix_Backend, update the changed coefficients and start from the previous
+solution instead of writing and solving the whole LP again. Model_data.dat is never modified.
+
+The swept parameters are the cost parameters of Model_Creation.Sensitive_Parameters. Several parameters can be swept
+together: their sequences of values are taken point by point. A value is a number (the same for every index of an indexed
+parameter) or a dict {index: value}. The results of every point are collected by Results.ResultsSummary and written to
+Results/Results_Sensitivity.xlsx.
+
+Parallel_Sensitivity(Design) solves the points of a design over any parameters of Model_data.dat in Workers processes,
+each point as a model of its own built from the changed Model_data.dat content held in memory and from the time series
+stored once by the calling process (the workers map the same .npy files), with a solver limited to Threads threads, and
+collects the ResultsSummary rows as the points finish. The designs are a full grid of given values (Grid_Design), or n
+points in given (low, high) ranges placed by Latin hypercube (Latin_Hypercube_Design) or by a scrambled Sobol sequence
+(Sobol_Design, which needs scipy 1.7 or later).
+'''
+
+import os, time, itertools, contextlib, io
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pyomo.environ import AbstractModel
+from pandas import ExcelWriter
+from Initialize import InputBundle
+from Model_Creation import Model_Creation, Set_Parameters
+from Matrix_LP import Greenfield_Families, Brownfield_Families
+from Results import ResultsSummary
+from Solvers import Create_Solver, Solve, Solver_Config, Greenfield_Solver
+
+
+Summary_Columns = ['Investment [kUSD]', 'NPC [kUSD]', 'LCOE [USD/kWh]', 'Fixed cost [kUSD]', 'Variable cost [kUSD]', 'totCO2 [ton]', 'PV panel [kW]', 'Battery [kWh]', 'Generator [kWh]']
+
+
+def Point_Data(Model_Data, point):
+    "Model_data.dat content with the parameter values of point, a number being written for every index of an indexed parameter"
+    Model_Data = Model_Data.copy()
+    for name, x in point.items():
+        if isinstance(Model_Data.get(name), dict) and not isinstance(x, dict):
+            x = {index: x for index in Model_Data[name]}
+        Model_Data[name] = x
+    return Model_Data
+
+def Write_Sensitivity(sensitivity_results, TARIFF, index, path='Results/Results_Sensitivity.xlsx'):
+    "Writes the ResultsSummary rows of the points (labelled by index) to the Costs and Tariff sheets of path"
+    SENSITIVITY_RESULTS = pd.DataFrame(sensitivity_results, index=index, columns=Summary_Columns)
+    TARIFF_DF = pd.DataFrame(TARIFF, index=index)
+    with ExcelWriter(path) as Excel:
+        SENSITIVITY_RESULTS.to_excel(Excel, sheet_name='Costs')
+        TARIFF_DF.to_excel(Excel, sheet_name='Tariff')
+    return SENSITIVITY_RESULTS, TARIFF_DF
+
+def Sensitivity_Analysis(Sweep, Inputs=None, Optimization_Goal='NPC', Brownfield=False, Renewable_Penetration=0, Battery_Independence=0,
+                         Matrix_Backend=False, Compact=False, Solver=None, Output='Results/Results_Sensitivity.xlsx'):
+    """Solves the project of Inputs (an InputBundle, by default the one of Inputs/Model_data.dat) at every point of Sweep ({parameter: sequence of values}, taken point by point) on one instance.
+    Returns the Costs and Tariff tables written to Output (None to write nothing), indexed by the values of the first parameter"""
+    if Brownfield:
+        from Model_Resolution_Brownfield import Model_Resolution_Brownfield as Model_Resolution
+    else:
+        from Model_Resolution_Greenfield import Model_Resolution_Greenfield as Model_Resolution
+    Full = Inputs if Inputs is not None else InputBundle()
+    names = list(Sweep)
+    points = [dict(zip(names, values)) for values in zip(*(Sweep[name] for name in names))]
+    if not points:
+        raise ValueError('The sweep has no points')
+    opt = Create_Solver(Solver, Brownfield_Families if Brownfield else Greenfield_Families, Matrix_Backend, Persistent=True,
+                        Default=None if Brownfield else Greenfield_Solver)
+    sensitivity_results, TARIFF = [], []
+    for i, point in enumerate(points):
+        start = time.time()
+        if i == 0:
+            model = AbstractModel()
+            Model_Creation(model, Renewable_Penetration, Battery_Independence,
+                           Full.With_Data(Point_Data(Full.Model_Data, point)), Compact, Mutable=names)
+            instance = Model_Resolution(model, Optimization_Goal, 'no', 0, Renewable_Penetration, Battery_Independence,
+                                        Matrix_Backend=Matrix_Backend, Solver=opt)
+        else:
+            Set_Parameters(instance, point)
+            print('Calling solver...')
+            Solve(opt, instance)                                                      # re-optimized from the previous point
+            print('Instance solved')
+        ResultsSummary(instance, Optimization_Goal, Brownfield, point[names[0]], sensitivity_results, TARIFF)
+        print('\n\nPoint ' + str(i+1) + ' of ' + str(len(points)) + ' complete (' + str(round(time.time()-start, 1)) + ' s)\n')
+    index = [point[names[0]] for point in points]
+    if Output is None:
+        return pd.DataFrame(sensitivity_results, index=index, columns=Summary_Columns), pd.DataFrame(TARIFF, index=index)
+    return Write_Sensitivity(sensitivity_results, TARIFF, index, Output)
+
+
+#%% Designs over several parameters
+
+def Grid_Design(Values):
+    "Every combination of the values of {parameter: sequence of values}, as {parameter: sequence of values} taken point by point"
+    names = list(Values)
+    points = list(itertools.product(*(Values[name] for name in names)))
+    return {name: [point[i] for point in points] for i, name in enumerate(names)}
+
+def Scaled_Design(Ranges, unit):
+    "{parameter: values} of the points of unit (n, parameters) in [0, 1), scaled to the (low, high) Ranges"
+    return {name: [float(low + x*(high - low)) for x in unit[:,i]] for i, (name, (low, high)) in enumerate(Ranges.items())}
+
+def Latin_Hypercube_Design(Ranges, n, seed=None):
+    "n points in the (low, high) Ranges of {parameter: (low, high)}, one in each of the n strata of every parameter"
+    rng = np.random.default_rng(seed)
+    unit = np.column_stack([(rng.permutation(n) + rng.random(n))/n for name in Ranges]).reshape(n, len(Ranges))
+    return Scaled_Design(Ranges, unit)
+
+def Sobol_Design(Ranges, n, seed=None):
+    "n points of a scrambled Sobol sequence in the (low, high) Ranges of {parameter: (low, high)} (n a power of 2 keeps its balance)"
+    try:
+        from scipy.stats import qmc
+    except ImportError:
+        raise ImportError('Sobol_Design needs scipy 1.7 or later, which needs Python 3.7 (the environments of mgp_mac.yml and '
+                          'mgp_win.yml have scipy 1.5.4): use Latin_Hypercube_Design there') from None
+    return Scaled_Design(Ranges, qmc.Sobol(d=len(Ranges), scramble=True, seed=seed).random(n))
+
+#%% Points solved in parallel processes
+
+def Sweep_Point(task):
+    "ResultsSummary row and tariffs of one point, solved as a model of its own"
+    Inputs, options = task
+    if options['Brownfield']:
+        from Model_Resolution_Brownfield import Model_Resolution_Brownfield as Model_Resolution
+    else:
+        from Model_Resolution_Greenfield import Model_Resolution_Greenfield as Model_Resolution
+    model = AbstractModel()
+    Model_Creation(model, options['Renewable_Penetration'], options['Battery_Independence'], Inputs, options['Compact'])
+    with contextlib.redirect_stdout(io.StringIO()):                                    # the solver log of every point is not printed
+        instance = Model_Resolution(model, options['Optimization_Goal'], 'no', 0, options['Renewable_Penetration'], options['Battery_Independence'],
+                                    Matrix_Backend=options['Matrix_Backend'], Solver=options['Solver'])
+    sensitivity_results, TARIFF = [], []
+    ResultsSummary(instance, options['Optimization_Goal'], options['Brownfield'], None, sensitivity_results, TARIFF)
+    return sensitivity_results[0], TARIFF[0]
+
+def Parallel_Sensitivity(Design, Inputs=None, Optimization_Goal='NPC', Brownfield=False, Renewable_Penetration=0, Battery_Independence=0,
+                         Matrix_Backend=False, Compact=False, Solver=None, Workers=None, Threads=1, Output='Results/Results_Sensitivity.xlsx'):
+    """Solves the project of Inputs at every point of Design ({parameter of Model_data.dat: sequence of values}, taken point by point, e.g. from Grid_Design) in Workers processes
+    (by default as many as the cores allow with Threads solver threads each). Returns the Costs and Tariff tables, indexed by the parameter values of the points, written to Output (None to write nothing)"""
+    Full = Inputs if Inputs is not None else InputBundle()
+    names = list(Design)
+    points = [dict(zip(names, values)) for values in zip(*(Design[name] for name in names))]
+    if not points:
+        raise ValueError('The design has no points')
+    unknown = [name for name in names if name not in Full.Model_Data]
+    if unknown:
+        raise ValueError('Unknown parameters of ' + Full.Data_Path + ': ' + ', '.join(unknown))
+    if hasattr(Solver, 'solve'):
+        raise ValueError('Parallel_Sensitivity takes a Solver_Config: each worker process creates its own solver')
+    Solver = (Solver or (Solver_Config() if Brownfield else Greenfield_Solver))._replace(Threads=Threads)
+    options = {'Optimization_Goal': Optimization_Goal, 'Brownfield': Brownfield, 'Renewable_Penetration': Renewable_Penetration,
+               'Battery_Independence': Battery_Independence, 'Matrix_Backend': Matrix_Backend, 'Compact': Compact, 'Solver': Solver}
+    Workers = Workers or max(1, (os.cpu_count() or 1)//max(Threads, 1))
+    bundles = [Full.With_Data(Point_Data(Full.Model_Data, point)) for point in points]     # the time series are stored once here and sent as the paths of their memory maps
+    rows = {}
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=Workers) as executor:
+        pending = {executor.submit(Sweep_Point, (bundle, options)): i for i, bundle in enumerate(bundles)}
+        for future in as_completed(pending):
+            rows[pending[future]] = future.result()
+            print('Sensitivity: ' + str(len(rows)) + ' of ' + str(len(points)) + ' points solved (' + str(round(time.time()-start, 1)) + ' s)')
+    labels = [tuple(str(x) if isinstance(x, dict) else x for x in point.values()) for point in points]
+    index = pd.MultiIndex.from_tuples(labels, names=names) if len(names) > 1 else pd.Index([label[0] for label in labels], name=names[0])
+    sensitivity_results, TARIFF = [rows[i][0] for i in range(len(points))], [rows[i][1] for i in range(len(points))]
+    if Output is None:
+        return pd.DataFrame(sensitivity_results, index=index, columns=Summary_Columns), pd.DataFrame(TARIFF, index=index)
+    return Write_Sensitivity(sensitivity_results, TARIFF, index, Output)
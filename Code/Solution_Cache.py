@@ -0,0 +1,97 @@
+''' On-disk store of solved instances
+
+Save_Solution writes the values of every variable of a solved instance to a compressed .npz file, and Load_Solution puts
+them back into another instance of the same model, which Results and Plots then read as if it had been solved. Case_Key
+names a case by the SHA-256 hash of everything its solution depends on: the Model_data.dat content, the time series
+(the memory-mapped arrays of Time_Series_Store.py are already named after the hash of their content), the representative
+periods, the components declared in the model, the formulation options (Compact, Representative_Years, Matrix_Backend)
+and the solver configuration.
+
+Model_Resolution_Greenfield/Brownfield(..., Cache=folder) go through Solve_Cached: the first run of a case solves it and
+stores its solution as folder/<case>.npz, every later run of the same case (the same inputs, objective, fixed
+capacities, formulation and solver configuration) loads it into the new instance instead of solving, so that Results
+and Plots work as after a solve. Only optimal solutions are stored; a changed input gives another case and is solved again.
+'''
+
+import os, hashlib, json, numpy as np
+from pyomo.environ import Var, value
+from pyomo.opt import TerminationCondition
+from Dat_Parser import Read_Dat
+from Initialize import Time_Series_Names
+from Solvers import Solve
+
+
+def Array_Key(array):
+    "Name of a stored time series, or the hash of the content of an array held in memory"
+    path = getattr(array, 'filename', None)
+    if path:
+        return os.path.basename(path)
+    array = np.ascontiguousarray(array)
+    return hashlib.sha256(str((array.shape, array.dtype.str)).encode() + array.tobytes()).hexdigest()
+
+def Canonical(x):
+    "Text of x that does not depend on the order of its dictionaries"
+    if isinstance(x, dict):
+        return '{' + ', '.join(repr(k) + ': ' + Canonical(v) for k, v in sorted(x.items(), key=lambda item: repr(item[0]))) + '}'
+    if isinstance(x, (list, tuple)):
+        return '[' + ', '.join(Canonical(v) for v in x) + ']'
+    return repr(x)
+
+def Solver_Key(Solver):
+    "Solver_Config of a run, or the class, name and options of a solver already created"
+    if hasattr(Solver, 'solve'):
+        return (type(Solver).__name__, getattr(Solver, 'name', None), dict(getattr(Solver, 'options', None) or {}))
+    return Solver
+
+def Case_Key(model, *options, datapath=None, Matrix_Backend=False, Solver=None):
+    "Hash of the inputs and formulation of model, of the solver configuration and of options"
+    Inputs = model.Inputs
+    sha = hashlib.sha256()
+    sha.update(Canonical(dict(Read_Dat(datapath) if datapath is not None else Inputs.Model_Data)).encode())
+    for name in Time_Series_Names:
+        sha.update(Array_Key(getattr(Inputs, name)).encode())
+    sha.update(repr(Inputs.Aggregation).encode())
+    sha.update(Canonical(sorted(c.name for c in model.component_objects(descend_into=True))).encode())
+    sha.update(Canonical([getattr(model, name, None) for name in ('Renewable_Penetration', 'Battery_Independence', 'Compact', 'Representative_Years', 'Mutable')]).encode())
+    sha.update(Canonical([Matrix_Backend, Solver_Key(Solver)]).encode())
+    sha.update(Canonical(options).encode())
+    return sha.hexdigest()[:24]
+
+#%% Variable values
+
+def Save_Solution(instance, path, **meta):
+    "Writes the values of the variables of instance (nan where unset) to path, with the JSON-serializable meta data"
+    arrays = {}
+    for var in instance.component_objects(Var, active=True, descend_into=True):
+        arrays[var.name] = np.array([np.nan if v.value is None else v.value for v in var.values()], dtype=float)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp = path[:-4] + '.' + str(os.getpid()) + '.tmp.npz'
+    np.savez_compressed(temp, _meta=json.dumps(meta), **arrays)
+    os.replace(temp, path)                                              # atomic, so that a parallel run never loads a half-written file
+
+def Load_Solution(instance, path):
+    "Puts the variable values stored in path into instance (a new instance of the model they were saved from) and returns the meta data"
+    with np.load(path, allow_pickle=False) as stored:
+        for var in instance.component_objects(Var, active=True, descend_into=True):
+            values = stored[var.name]
+            if len(values) != len(var):
+                raise ValueError('The solution in ' + path + ' was not saved from this model (' + var.name + ')')
+            for v, x in zip(var.values(), values.tolist()):
+                v.value = None if np.isnan(x) else x
+        return json.loads(str(stored['_meta']))
+
+#%% Memoized solve
+
+def Solve_Cached(model, instance, opt, Cache, *options, datapath=None, Matrix_Backend=False, Solver=None):
+    "Solves instance with opt, or loads the solution stored in Cache for the same case (Case_Key); returns instance"
+    path = os.path.join(Cache, Case_Key(model, *options, datapath=datapath, Matrix_Backend=Matrix_Backend, Solver=Solver) + '.npz')
+    if os.path.exists(path):
+        meta = Load_Solution(instance, path)
+        print('Solution loaded from ' + path + ' (objective ' + str(meta['Objective']) + ')')
+        return instance
+    print('Calling solver...')
+    results = Solve(opt, instance)
+    print('Instance solved')
+    if results.solver.termination_condition == TerminationCondition.optimal:
+        Save_Solution(instance, path, Objective=value(instance.ObjectiveFuntion))
+    return instance
@@ -0,0 +1,109 @@
+''' Solver selection and option profiles
+
+Model_Resolution_Greenfield/Brownfield(..., Solver=Solver_Config(...)) solve the instance with the solver named in the
+configuration instead of a hard-coded Gurobi:
+
+    Solver_Config()                                          Gurobi, barrier without crossover (the former brownfield default)
+    Greenfield_Solver                                        the same with BarHomogeneous=1, the former greenfield default
+    Solver_Config('highs', 'ipm', Threads=4)                 HiGHS interior point, no crossover, 4 threads
+    Solver_Config('cbc', 'simplex', Time_Limit=3600)         CBC dual simplex, stopped after an hour
+    Solver_Config('auto')                                    first available of Gurobi, CPLEX, HiGHS, CBC, GLPK
+    Solver_Config('glpk', Options={'nopresol': ''})          raw options, passed to the solver after the profile
+
+A profile is a set of solver options for one LP algorithm: 'barrier' (interior point without crossover and with loose
+tolerances, the fastest for the large multi-year LPs) or 'simplex' (dual simplex, exact vertex solutions, better for
+warm-started re-solves); 'default' leaves the solver's own settings. Threads and Time_Limit are written with the option
+names of each solver, and Options overrides everything else. Without a configuration each model keeps the options it
+was solved with before (Solver_Config() for the brownfield model, Greenfield_Solver for the greenfield one). With Matrix_Backend the LP is solved by HiGHS through
+Matrix_LP.py, with the options of the HiGHS profile (and the raw Options when Name is 'highs'), or with the HiGHS defaults
+when no configuration is given. Create_Solver(..., Persistent=True) returns the solvers that keep the instance between
+solves and only update what changed (the appsi interfaces of Gurobi and HiGHS, Matrix_Solver(..., Persistent=True)).
+These and Matrix_Solver load the solution into the instance themselves: Solve(opt, instance) loads it from the results
+only for the other solvers. The appsi interfaces need Pyomo 6: with the Pyomo 5 of mgp_mac.yml and mgp_win.yml HiGHS is
+only reached through Matrix_Backend, and the persistent solvers are the usual ones, which solve again from scratch.
+'''
+
+from collections import namedtuple
+from pyomo.opt import SolverFactory
+try:
+    from pyomo.contrib.appsi.base import LegacySolverInterface                               # Pyomo 6 and later
+except ImportError:
+    LegacySolverInterface = None
+
+
+Solver_Config = namedtuple('Solver_Config', 'Name Profile Threads Time_Limit Options')
+Solver_Config.__new__.__defaults__ = ('gurobi', 'barrier', None, None, None)
+
+Pyomo_Names = {'gurobi': 'gurobi', 'cplex': 'cplex', 'highs': 'appsi_highs' if LegacySolverInterface else 'highs', 'cbc': 'cbc', 'glpk': 'glpk'}
+Persistent_Names = {'gurobi': 'appsi_gurobi', 'highs': 'appsi_highs'} if LegacySolverInterface else {}   # keep the model in the solver and update only the changed parameters between solves
+Preference  = ('gurobi', 'cplex', 'highs', 'cbc', 'glpk')                                  # order in which Solver_Config('auto') looks for an installed solver
+
+Profiles = {
+    'gurobi': {'barrier': {'Method': 2, 'Crossover': 0, 'BarConvTol': 1e-4, 'OptimalityTol': 1e-4, 'FeasibilityTol': 1e-4, 'IterationLimit': 1000},
+               'simplex': {'Method': 1, 'OptimalityTol': 1e-6, 'FeasibilityTol': 1e-6}},
+    'cplex':  {'barrier': {'lpmethod': 4, 'barrier_crossover': -1, 'barrier_convergetol': 1e-4, 'simplex_tolerances_optimality': 1e-4, 'simplex_tolerances_feasibility': 1e-4},
+               'simplex': {'lpmethod': 2}},
+    'highs':  {'barrier': {'solver': 'ipm', 'run_crossover': 'off', 'ipm_optimality_tolerance': 1e-4, 'primal_feasibility_tolerance': 1e-4, 'dual_feasibility_tolerance': 1e-4},
+               'simplex': {'solver': 'simplex', 'simplex_strategy': 1}},
+    'cbc':    {'barrier': {'barrier': '', 'primalT': 1e-4, 'dualT': 1e-4},
+               'simplex': {'dualSimplex': ''}},
+    'glpk':   {'barrier': {'interior': ''},
+               'simplex': {'dual': ''}},
+}
+Profiles['highs']['ipm'] = Profiles['highs']['barrier']
+
+Greenfield_Solver = Solver_Config(Options={'BarHomogeneous': 1})
+
+Thread_Options = {'gurobi': 'Threads', 'cplex': 'threads', 'highs': 'threads', 'cbc': 'threads', 'glpk': None}     # glpsol runs on one thread
+Time_Options   = {'gurobi': 'TimeLimit', 'cplex': 'timelimit', 'highs': 'time_limit', 'cbc': 'sec', 'glpk': 'tmlim'}
+
+
+def Solver_Name(config):
+    "Name of the solver of config, the first installed one of Preference for 'auto'"
+    name = config.Name.lower()
+    if name == 'auto':
+        for name in Preference:
+            if SolverFactory(Pyomo_Names[name]).available(exception_flag=False):
+                return name
+        raise RuntimeError('None of the solvers ' + ', '.join(Preference) + ' is available')
+    if name not in Pyomo_Names:
+        raise ValueError('Unknown solver ' + config.Name + ', the options are: auto, ' + ', '.join(Pyomo_Names))
+    return name
+
+def Solver_Options(config, name=None):
+    "Options of the profile, threads, time limit and raw options of config, with the option names of solver name (by default the one of config)"
+    name = name or Solver_Name(config)
+    if config.Profile != 'default' and config.Profile not in Profiles[name]:
+        raise ValueError('Unknown profile ' + str(config.Profile) + ' for ' + name + ', the options are: default, ' + ', '.join(Profiles[name]))
+    options = dict(Profiles[name].get(config.Profile, {}))
+    if config.Threads is not None and Thread_Options[name] is not None:
+        options[Thread_Options[name]] = int(config.Threads)
+    if config.Time_Limit is not None:
+        options[Time_Options[name]] = config.Time_Limit
+    if config.Name.lower() in (name, 'auto'):
+        options.update(config.Options or {})
+    return options
+
+def Create_Solver(config=None, Families=None, Matrix_Backend=False, Persistent=False, Default=None):
+    """Solver of config (Default, or Solver_Config(), when None) with its options set, a Matrix_Solver of the hourly Families with Matrix_Backend (with the HiGHS defaults when config is None).
+    Persistent asks for a solver that re-optimizes the same instance from its previous solution (Persistent_Names, the others solve it again from scratch).
+    A solver already created is returned as it is, so that the caller can keep it between several Model_Resolution_XXfield runs"""
+    if hasattr(config, 'solve'):
+        return config
+    if Matrix_Backend:
+        from Matrix_LP import Matrix_Solver
+        return Matrix_Solver(Families, Options=Solver_Options(config, 'highs') if config is not None else None, Persistent=Persistent)
+    config = config or Default or Solver_Config()
+    name = Solver_Name(config)
+    opt = SolverFactory(Persistent_Names.get(name, Pyomo_Names[name]) if Persistent else Pyomo_Names[name])
+    for option, setting in Solver_Options(config, name).items():
+        opt.options[option] = setting
+    return opt
+
+def Solve(opt, instance, tee=True):
+    "Solves instance with opt and loads the solution into it"
+    from Matrix_LP import Matrix_Solver
+    results = opt.solve(instance, tee=tee)
+    if not isinstance(opt, Matrix_Solver) and not (LegacySolverInterface and isinstance(opt, LegacySolverInterface)):   # these load it themselves
+        instance.solutions.load_from(results)
+    return results
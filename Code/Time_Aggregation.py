@@ -0,0 +1,192 @@
+''' Representative-period aggregation of the hourly time series for faster sizing runs
+
+Aggregate(Inputs, k) splits the year into chronological periods of Period_Length hours (days by default), clusters them
+on their demand, RES and grid-availability profiles (the same periods for every scenario and year) and returns an
+AggregatedInputs bundle holding only the k representative (medoid) periods. Passed to Model_Creation in place of the
+full InputBundle, it gives a model with Periods = k*Period_Length in which:
+- every yearly sum weights an hour by the number of chronological periods its cluster stands for (Period_Weight);
+- Battery_SOC is the change of state of charge since the start of the representative period, and Battery_SOC_Start
+  carries the state of charge through the chronological sequence of periods, so that energy can still be shifted
+  across days and years (storage linking of Kotzur et al., 2018, with the intra-period extremes bounding every hour).
+
+By default the period with the highest demand is kept as a representative standing only for itself (Peak_Period),
+so that the generator and battery sized on the representative periods still cover the peak load.
+The hours after the last complete period (e.g. the last 24 of 8760 hours in weekly periods) are kept as one more
+representative period of their own. With k equal to the number of periods the aggregated model is the full one.
+
+Full_Resolution_Dispatch(instance) solves the full-resolution dispatch again with the capacities of the sized instance fixed,
+and with its Renewable_Penetration and Battery_Independence: left free, the dispatch could burn fuel rather than cycle the
+battery, whose throughput has a replacement cost. With the sizes fixed these can make the full-resolution model infeasible
+when the representative periods understate the need for them.
+'''
+
+import numpy as np
+from collections import namedtuple
+from Initialize import InputBundle, Memoized
+
+
+#%% Clustering
+
+def Period_Bounds(n_periods, period_length):
+    "(first, last+1) 0-based hours of the chronological periods of a year; the hours after the last complete period form a shorter one"
+    bounds = [(start, start+period_length) for start in range(0, n_periods - period_length + 1, period_length)]
+    if bounds[-1][1] < n_periods:
+        bounds.append((bounds[-1][1], n_periods))
+    return bounds
+
+def Period_Features(Inputs, n_full, period_length):
+    "One row per complete period: its demand, RES and grid-availability profiles, each (scenario, year) or (scenario, source) series scaled by its maximum"
+    features = []
+    for name in ('Energy_Demand', 'RES_Unit_Energy', 'Grid_Availability'):
+        series = np.asarray(getattr(Inputs, name), dtype=float)
+        series = series[:,:,:n_full*period_length]
+        peak = series.max(axis=2, keepdims=True)
+        series = np.divide(series, peak, out=np.zeros_like(series), where=peak > 0)
+        features.append(series.reshape(series.shape[0]*series.shape[1], n_full, period_length).transpose(1, 0, 2).reshape(n_full, -1))
+    return np.hstack(features)
+
+def K_Medoids(distances, k, max_iterations=100):
+    "Cluster label of every item and the medoid of every cluster: greedy build of the k medoids, then alternate assignment and medoid update"
+    medoids = [int(distances.sum(axis=1).argmin())]
+    nearest = distances[medoids[0]].copy()
+    while len(medoids) < k:
+        gain = np.maximum(nearest[None,:] - distances, 0).sum(axis=1)         # decrease of the total distance if each item was added
+        gain[medoids] = -1
+        medoids.append(int(gain.argmax()))
+        nearest = np.minimum(nearest, distances[medoids[-1]])
+    medoids = np.array(medoids)
+    for _ in range(max_iterations):
+        labels = distances[:, medoids].argmin(axis=1)
+        updated = medoids.copy()
+        for c in range(k):
+            members = np.flatnonzero(labels == c)
+            if len(members):
+                updated[c] = members[distances[np.ix_(members, members)].sum(axis=1).argmin()]
+        if (updated == medoids).all():
+            break
+        medoids = updated
+    return distances[:, medoids].argmin(axis=1), medoids
+
+def Hierarchical(features, distances, k):
+    "Cluster labels of Ward's agglomerative clustering cut at k clusters, and the medoid of every cluster"
+    try:
+        from scipy.cluster.hierarchy import linkage, fcluster
+    except ImportError:
+        raise ImportError("Method='hierarchical' needs scipy (declared in mgp_mac.yml and mgp_win.yml), Method='kmedoids' does not") from None
+    labels = np.unique(fcluster(linkage(features, method='ward'), k, criterion='maxclust'), return_inverse=True)[1]
+    medoids = np.array([members[distances[np.ix_(members, members)].sum(axis=1).argmin()]
+                        for members in (np.flatnonzero(labels == c) for c in range(labels.max()+1))])
+    return labels, medoids
+
+Methods = {'kmedoids': lambda features, distances, k: K_Medoids(distances, k),
+           'hierarchical': Hierarchical}
+
+
+#%% Aggregation
+
+class Aggregation(namedtuple('Aggregation', 'Year_Periods Bounds Sequence Medoids First Last Weights Hour_Period')):
+    """Chronological periods of a year (Bounds, 0-based hours), the representative period standing for each of them (Sequence)
+    and the chronological period chosen as each representative (Medoids), with the first and last hour (1-based) of every
+    representative period in the aggregated year, the number of periods it stands for and the representative period of every hour"""
+    __slots__ = ()
+
+    @classmethod
+    def From_Clusters(cls, year_periods, bounds, sequence, medoids):
+        lengths = [bounds[m][1] - bounds[m][0] for m in medoids]
+        last = tuple(int(h) for h in np.cumsum(lengths))
+        first = tuple(h - n + 1 for h, n in zip(last, lengths))
+        weights = tuple(int(n) for n in np.bincount(np.array(sequence)-1, minlength=len(medoids)))
+        hour_period = tuple(c for c, n in enumerate(lengths, 1) for _ in range(n))
+        return cls(year_periods, tuple(bounds), tuple(sequence), tuple(medoids), first, last, weights, hour_period)
+
+    def Period(self, t):
+        "Representative period of hour t of the aggregated year"
+        return self.Hour_Period[t-1]
+
+    def Representative(self, d):
+        "Representative period of chronological period d"
+        return self.Sequence[d-1]
+
+    def Hour_Weights(self):
+        "Weight of every hour of the aggregated year: the number of chronological periods its representative period stands for"
+        return [self.Weights[c-1] for c in self.Hour_Period]
+
+    def Hours(self):
+        "0-based hours of the full year making up the aggregated year"
+        return np.concatenate([np.arange(*self.Bounds[m]) for m in self.Medoids])
+
+def Aggregate(Inputs, k, Period_Length=24, Method='kmedoids', Peak_Period=True):
+    """AggregatedInputs of k representative periods of Period_Length hours chosen among the periods of Inputs (an InputBundle) with Method ('kmedoids' or 'hierarchical').
+    With Peak_Period the period holding the highest demand is one of them, standing only for itself, so that the sizes cover the peak load"""
+    if Method not in Methods:
+        raise ValueError('Method must be one of ' + ', '.join(Methods))
+    n_periods = Inputs.Model_Data.Int('Periods')
+    if not 0 < Period_Length <= n_periods:
+        raise ValueError('Period_Length must be between 1 and Periods (' + str(n_periods) + ')')
+    bounds = Period_Bounds(n_periods, Period_Length)
+    n_full = n_periods // Period_Length
+    k = min(int(k), n_full)
+    if k < 1 + bool(Peak_Period):
+        raise ValueError('k must be at least ' + str(1 + bool(Peak_Period)))
+    features = Period_Features(Inputs, n_full, Period_Length)
+    squared = (features**2).sum(axis=1)
+    distances = np.sqrt(np.maximum(squared[:,None] + squared[None,:] - 2*features @ features.T, 0))
+    clustered = np.arange(n_full)
+    if Peak_Period:
+        demand = np.asarray(Inputs.Energy_Demand)[:,:,:n_full*Period_Length]
+        peak = int(demand.reshape(demand.shape[0], demand.shape[1], n_full, Period_Length).max(axis=(0,1,3)).argmax())
+        clustered = clustered[clustered != peak]
+        k -= 1
+    labels, medoids = Methods[Method](features[clustered], distances[np.ix_(clustered, clustered)], k)
+    medoids = clustered[medoids]
+    if Peak_Period:
+        labels = np.insert(labels, peak, len(medoids))
+        medoids = np.append(medoids, peak)
+    order = np.argsort(medoids)                                                         # representative periods in chronological order
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    sequence, medoids = list(rank[labels] + 1), list(medoids[order])
+    if len(bounds) > n_full:                                                            # the shorter last period represents itself
+        sequence.append(len(medoids) + 1)
+        medoids.append(n_full)
+    aggregation = Aggregation.From_Clusters(n_periods, bounds, [int(c) for c in sequence], [int(m) for m in medoids])
+    return AggregatedInputs(Inputs, aggregation)
+
+class AggregatedInputs(InputBundle):
+    "InputBundle of the representative periods of a full one (Full): same Model_data.dat content with Periods = hours of the representative periods"
+
+    def __init__(self, Full, Aggregation):
+        hours = Aggregation.Hours()
+        Model_Data = Full.Model_Data.copy()
+        Model_Data['Periods'] = len(hours)
+        Time_Series = {name: np.asarray(getattr(Full, name))[:,:,hours] for name in ('Energy_Demand', 'RES_Unit_Energy', 'Grid_Availability')}
+        InputBundle.__init__(self, Full.Data_Path, Full.Refresh_Cache, Model_Data, Time_Series)
+        self.Full = Full
+        self.Aggregation = Aggregation
+
+    @Memoized
+    def Cumulative_Demand(self):
+        "Running total of the full-resolution demand, so that the battery autonomy (Battery_Independence) is sized on the real sequence of days"
+        return self.Full.Cumulative_Demand
+
+
+#%% Dispatch at full resolution
+
+def Full_Resolution_Dispatch(instance, Optimization_Goal='NPC', Brownfield=False, Matrix_Backend=False, Compact=False, Solver=None,
+                             Renewable_Penetration=None, Battery_Independence=None):
+    """Instance of the full-resolution model solved with the capacities of instance (solved on AggregatedInputs) fixed: only the hourly dispatch is optimized.
+    Renewable_Penetration and Battery_Independence are by default those of the sizing run, so that the dispatch still meets them"""
+    from pyomo.environ import AbstractModel
+    from Model_Creation import Model_Creation, Capacities
+    if Renewable_Penetration is None:
+        Renewable_Penetration = getattr(instance, 'Renewable_Penetration', 0)
+    if Battery_Independence is None:
+        Battery_Independence = getattr(instance, 'Battery_Independence', 0)
+    model = AbstractModel()
+    Model_Creation(model, Renewable_Penetration, Battery_Independence, instance.Inputs.Full, Compact)
+    if Brownfield:
+        from Model_Resolution_Brownfield import Model_Resolution_Brownfield as Model_Resolution
+    else:
+        from Model_Resolution_Greenfield import Model_Resolution_Greenfield as Model_Resolution
+    return Model_Resolution(model, Optimization_Goal, 'no', 0, Renewable_Penetration, Battery_Independence, Matrix_Backend=Matrix_Backend,
+                            Capacities=Capacities(instance), Solver=Solver)
@@ -0,0 +1,46 @@
+''' On-disk store of the hourly time series of the model (Energy_Demand, RES_Unit_Energy, Grid_Availability)
+
+Each (scenario, year or source, period) array is saved once as Inputs/Time_Series/<name>-<hash>.npy, named after
+the hash of its content, and then opened as a read-only memory map. Every InputBundle, Results and worker process
+using the same inputs reads the same pages, so memory use does not grow with the number of copies.
+Demand and RES production are stored as float32, the grid availability as uint8.
+
+Run "python Time_Series_Store.py --clear [folder]" to delete the stored arrays of a folder (default: Inputs/Time_Series).
+'''
+
+import os, sys, glob, hashlib, numpy as np
+
+Store_Types = {'Energy_Demand': np.float32, 'RES_Unit_Energy': np.float32, 'Grid_Availability': np.uint8}
+
+def Store_Array(folder, name, array):
+    "Saves array in folder (unless an identical one is already there) and returns it as a read-only memory map"
+    stored = np.ascontiguousarray(array, dtype=Store_Types[name])
+    if stored.dtype.kind == 'u' and not np.array_equal(stored, array):
+        raise ValueError(name + ' must contain only 0 and 1')
+    key = hashlib.sha256(str(stored.shape).encode() + stored.tobytes()).hexdigest()[:16]
+    path = os.path.join(folder, name + '-' + key + '.npy')
+    if not os.path.exists(path):
+        os.makedirs(folder, exist_ok=True)
+        temp = path[:-4] + '.' + str(os.getpid()) + '.tmp.npy'
+        np.save(temp, stored)
+        os.replace(temp, path)                                          # atomic, so that parallel runs never map a half-written file
+    return Open_Array(path)
+
+def Open_Array(path):
+    return np.load(path, mmap_mode='r')
+
+def Clear_Store(folder=os.path.join('Inputs', 'Time_Series')):
+    "Deletes the stored arrays of folder and returns their paths"
+    removed = glob.glob(os.path.join(folder, '*.npy'))
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--clear':
+        folder = sys.argv[2] if len(sys.argv) > 2 else os.path.join('Inputs', 'Time_Series')
+        for path in Clear_Store(folder):
+            print('Removed ' + path)
+    else:
+        print(__doc__)